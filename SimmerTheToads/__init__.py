@@ -1,6 +1,7 @@
 """Entrypoint to flask full-stack application."""
 
 import logging
+import os
 import secrets
 from pathlib import Path
 
@@ -9,6 +10,9 @@ from flask import Flask
 from flask_cors import CORS
 from flask_session import Session
 
+from .sessions import SqliteSessionInterface
+from .store import SqliteStore
+
 load_dotenv()
 
 LINE = "=" * 80
@@ -26,14 +30,40 @@ static_dir = template_dir / "static/"
 logger.info("Template directory: %s", template_dir.absolute())
 logger.info("Static directory: %s", static_dir.absolute())
 
+# The build is served by frontend_bp, see `static`.
 app = Flask(
     __name__,
     template_folder=str(template_dir.absolute()),
-    static_folder=str(static_dir.absolute()),
+    static_folder=None,
 )
 app.config["SECRET_KEY"] = secrets.token_hex()
-app.config["SESSION_TYPE"] = "filesystem"
-app.config["SESSION_FILE_DIR"] = "./.flask_session"
+
+# Session backend, one of:
+#   sqlite:     Local file shared by all workers on this host (default).
+#   redis:      Any redis protocol server, see SESSION_REDIS_URL.
+#   filesystem: One pickle per session in SESSION_FILE_DIR.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite").lower()
+if SESSION_BACKEND == "sqlite":
+    app.config["SESSION_TYPE"] = "custom"
+    app.session_interface = SqliteSessionInterface(
+        SqliteStore(
+            os.getenv("SESSION_SQLITE_PATH", "./.flask_session.sqlite3"),
+            table="sessions",
+        )
+    )
+elif SESSION_BACKEND == "redis":
+    from redis import Redis
+
+    app.config["SESSION_TYPE"] = "redis"
+    app.config["SESSION_REDIS"] = Redis.from_url(
+        os.getenv("SESSION_REDIS_URL", "redis://127.0.0.1:6379")
+    )
+elif SESSION_BACKEND == "filesystem":
+    app.config["SESSION_TYPE"] = "filesystem"
+    app.config["SESSION_FILE_DIR"] = "./.flask_session"
+else:
+    raise ValueError(f"Unknown SESSION_BACKEND: {SESSION_BACKEND}")
+
 app.config["SESSION_COOKIE_HTTPONLY"] = True
 app.config["REMEMBER_COOKIE_HTTPONLY"] = True
 app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
@@ -0,0 +1,157 @@
+"""Columnar on-disk format of playlists, to work on them without Spotify.
+
+A playlist is saved as a directory:
+
+    playlist.json           Metadata of the playlist and of each of its
+                            tracks, the index and order of the columns of the
+                            frame, and the values of its non-numeric columns.
+    columns/<n>.npy         Values of the n-th numeric column of the frame.
+    features.npy            Raw values of the FeatureMatrix.
+    analysis/<kind>.npy     Analysis arrays of every track of one kind (see
+                            `Track.analysis_arrays`), one after another.
+    analysis/<kind>.offsets.npy
+                            Row where the arrays of each track start, and
+                            where the last one ends.
+
+Arrays are memory mapped when loaded. The feature matrix and the analysis of
+the tracks are used in place, without being read or computed up front; only
+the numeric columns of the frame are copied.
+"""
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
+
+import numpy as np
+import pandas as pd
+from spotipy import Spotify
+
+from .features import FeatureMatrix
+
+if TYPE_CHECKING:
+    from .engine import Playlist
+
+FORMAT_VERSION = 3
+
+ANALYSIS_KINDS = ("sections", "bars", "beats", "tatums")
+
+
+def save(playlist: "Playlist", path: Union[str, Path]) -> None:
+    """Save a playlist, see the module documentation for the format.
+
+    :param playlist: Playlist to save.
+    :param path: Directory to save it in, created if missing.
+    """
+    from .engine import Track
+
+    path = Path(path)
+    (path / "columns").mkdir(parents=True, exist_ok=True)
+    (path / "analysis").mkdir(exist_ok=True)
+
+    df = playlist.df
+    columns = []
+    text = {}
+    for k, name in enumerate(df.columns):
+        if pd.api.types.is_numeric_dtype(df[name]):
+            columns.append({"name": name, "kind": "numeric", "file": k})
+            np.save(path / "columns" / f"{k}.npy", df[name].to_numpy())
+        else:
+            columns.append({"name": name, "kind": "text"})
+            text[name] = df[name].tolist()
+
+    # Every track once, even if it is repeated in the playlist.
+    tracks = [playlist.tracks[i] for i in dict.fromkeys(df["id"])]
+    analysed = [i.has_analysis for i in tracks]
+    track_arrays = [
+        i.analysis_arrays() if a else None for i, a in zip(tracks, analysed)
+    ]
+    for kind in ANALYSIS_KINDS:
+        empty = np.empty((0, len(Track.SECTION_COLUMNS) if kind == "sections" else 1))
+        arrays = [empty if i is None else i[kind] for i in track_arrays]
+        offsets = np.cumsum([0] + [len(i) for i in arrays])
+        np.save(path / "analysis" / f"{kind}.npy", np.concatenate(arrays + [empty]))
+        np.save(path / "analysis" / f"{kind}.offsets.npy", offsets)
+
+    features = playlist.features
+    np.save(path / "features.npy", features.raw)
+
+    sidecar = {
+        "format": FORMAT_VERSION,
+        "id": playlist.id,
+        "metadata": playlist.metadata,
+        "remote_ids": getattr(playlist, "remote_ids", None),
+        "snapshot_id": getattr(playlist, "snapshot_id", None),
+        "index": df.index.tolist(),
+        "columns": columns,
+        "text": text,
+        "features": {
+            "columns": list(features.columns),
+            "index": features.index.tolist(),
+        },
+        "tracks": [i.metadata for i in tracks],
+        "analysed": analysed,
+    }
+    with open(path / "playlist.json", "w") as f:
+        json.dump(sidecar, f)
+
+
+def load(path: Union[str, Path], spotify: Optional[Spotify] = None) -> "Playlist":
+    """Load a playlist saved with `save`, without any calls to Spotify.
+
+    :param path: Directory the playlist was saved in.
+    :param spotify: Client for anything that needs Spotify afterwards, such as
+                    suggestions or writing the playlist back.
+    """
+    from .engine import Playlist, Track
+
+    path = Path(path)
+    with open(path / "playlist.json") as f:
+        sidecar = json.load(f)
+    if sidecar.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported playlist format {sidecar.get('format')}")
+
+    index = pd.Index(sidecar["index"])
+    data = {}
+    for column in sidecar["columns"]:
+        name = column["name"]
+        if column["kind"] == "numeric":
+            data[name] = np.load(
+                path / "columns" / f"{column['file']}.npy", mmap_mode="r"
+            )
+        elif column["kind"] == "text":
+            data[name] = sidecar["text"][name]
+    df = pd.DataFrame(data, index=index)
+
+    analysis = {}
+    for kind in ANALYSIS_KINDS:
+        values = np.load(path / "analysis" / f"{kind}.npy", mmap_mode="r")
+        offsets = np.load(path / "analysis" / f"{kind}.offsets.npy")
+        analysis[kind] = (values, offsets)
+
+    rows = df.drop_duplicates("id").to_dict("records")
+    tracks = {}
+    for k, (metadata, features, analysed) in enumerate(
+        zip(sidecar["tracks"], rows, sidecar["analysed"])
+    ):
+        track = Track(spotify, metadata, features, get_analysis=False)
+        if analysed:
+            arrays = {
+                kind: values[offsets[k] : offsets[k + 1]]
+                for kind, (values, offsets) in analysis.items()
+            }
+            track._set_analysis_arrays(arrays)
+        tracks[features["id"]] = track
+
+    p = Playlist.__new__(Playlist)
+    p.id = sidecar["id"]
+    p.metadata = sidecar["metadata"]
+    p.df = df
+    p.tracks = tracks
+    p.remote_ids = sidecar["remote_ids"]
+    p.snapshot_id = sidecar["snapshot_id"]
+    p._spotify = spotify
+    p._features = FeatureMatrix.from_raw(
+        np.load(path / "features.npy", mmap_mode="r"),
+        sidecar["features"]["columns"],
+        pd.Index(sidecar["features"]["index"]),
+    )
+    return p
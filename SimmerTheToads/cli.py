@@ -0,0 +1,275 @@
+"""Simmer many playlists at once, from the command line.
+
+    $ simmer 2CPPiUTAtfvaeAEyWApOSE 3engsNaAr6Q9cTT85gKCGd -o results
+    $ simmer --ids-file playlists.txt --evaluators tsp,clustering -o results
+    $ simmer saved/abbey-road saved/the-big-bach -o results
+
+Every playlist is given either as its Spotify ID, or as the directory it was
+saved in with `Playlist.save`. Playlists given by ID are fetched together:
+their tracks are pooled, and the features and analysis of every track are
+fetched once, however many of the playlists it is in. The evaluators then run
+on a pool of processes, every playlist and evaluator a task of its own.
+
+One `<playlist id>.json` is written to the output directory per playlist,
+with the order every evaluator put it in (see `compare_evaluators`), along
+with `timings.json`, which also lists the playlists that could not be fetched
+or ordered; the others are written all the same. Nothing is written back to
+Spotify.
+
+The client is set up from the same environment as the web application:
+`CLIENT_ID`, `CLIENT_SECRET` and `REDIRECT_URI` to log in (once, the token is
+cached), or `SPOTIFY_ACCESS_TOKEN` and `SPOTIFY_API_PREFIX` for the local
+stand-in of the WebAPI (see `fake_spotify`).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, Type
+
+from spotipy import Spotify
+from spotipy.oauth2 import SpotifyOAuth
+
+from .engine import (ChaosEvaluator, ClusteringEvaluator, Playlist,
+                     PlaylistEvaluatorBase, TSPEvaluator, compare_evaluators)
+from .ingest import CONCURRENCY, ingest_playlists
+from .pool import new_pool
+from .ratelimit import RateLimitedSpotify
+
+logger = logging.getLogger("SimmerTheToads")
+
+EVALUATORS = {
+    "clustering": ClusteringEvaluator,
+    "tsp": TSPEvaluator,
+    "chaos": ChaosEvaluator,
+}
+
+OAUTH_SCOPES = ["playlist-read-private", "playlist-read-collaborative"]
+
+
+def spotify_client() -> Spotify:
+    """Get a client from the environment, see the module documentation."""
+    token = os.getenv("SPOTIFY_ACCESS_TOKEN")
+    if token:
+        spotify = RateLimitedSpotify(auth=token)
+    else:
+        spotify = RateLimitedSpotify(
+            auth_manager=SpotifyOAuth(
+                scope=" ".join(OAUTH_SCOPES),
+                client_id=os.getenv("CLIENT_ID"),
+                client_secret=os.getenv("CLIENT_SECRET"),
+                redirect_uri=os.getenv("REDIRECT_URI"),
+            )
+        )
+    prefix = os.getenv("SPOTIFY_API_PREFIX")
+    if prefix:
+        spotify.prefix = prefix
+    return spotify
+
+
+def fetch_playlists(
+    spotify: Spotify, ids: Sequence[str], concurrency: int = CONCURRENCY
+) -> Tuple[List[Playlist], dict, List[str]]:
+    """Fetch several playlists, and every track of theirs only once.
+
+    A playlist that cannot be fetched (e.g. it is private, or gone), or has no
+    tracks, is left out, and the others are fetched all the same.
+
+    :param spotify: Client to fetch the playlists with.
+    :param ids: Spotify IDs of the playlists.
+    :param concurrency: Most calls to have in flight at once.
+    :returns: The playlists, counts of the tracks in all of them ("tracks")
+              and of the tracks fetched ("unique_tracks"), and the IDs of the
+              playlists left out.
+    """
+    playlists, tracks = asyncio.run(
+        ingest_playlists(spotify, ids, concurrency, return_exceptions=True)
+    )
+    result = []
+    failed = []
+    n_tracks = 0
+    for id, fetched in zip(ids, playlists):
+        try:
+            if isinstance(fetched, Exception):
+                raise fetched
+            metadata, items = fetched
+            playlist_tracks = [tracks[i["track"]["id"]] for i in items]
+            for track in playlist_tracks:
+                if isinstance(track, Exception):
+                    raise track
+            result.append(Playlist.from_tracks(spotify, id, metadata, playlist_tracks))
+            n_tracks += len(items)
+        except Exception:
+            logger.exception("Failed to fetch playlist %s", id)
+            failed.append(id)
+
+    counts = {"tracks": n_tracks, "unique_tracks": len(tracks)}
+    return result, counts, failed
+
+
+def order_playlists(
+    playlists: Sequence[Playlist],
+    evaluators: Dict[str, Type[PlaylistEvaluatorBase]],
+    executor: Executor,
+    threads: int,
+) -> Dict[str, dict]:
+    """Order every playlist with every evaluator on a pool.
+
+    :param threads: Most playlists to have queued on the pool at once.
+    :returns: For each playlist ID, the result of `compare_evaluators`, or
+              the exception it raised.
+    """
+
+    def order(p: Playlist):
+        try:
+            return compare_evaluators(p, evaluators, executor)
+        except Exception as e:
+            logger.exception("Failed to order playlist %s", p.id)
+            return e
+
+    # A thread per playlist waits on its evaluators, so that the tasks of
+    # several playlists are queued on the pool together.
+    with ThreadPoolExecutor(max(min(len(playlists), threads), 1)) as pool:
+        results = pool.map(order, playlists)
+        return {p.id: r for p, r in zip(playlists, results)}
+
+
+def read_ids(args) -> List[str]:
+    """Get the playlists given on the command line, and in any files of IDs."""
+    ids = list(args.playlists)
+    for path in args.ids_files or []:
+        for line in Path(path).read_text().splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                ids.append(line)
+    return list(dict.fromkeys(ids))
+
+
+def main(argv=None):
+    """Simmer playlists from the command line, see the module documentation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "playlists",
+        nargs="*",
+        metavar="PLAYLIST",
+        help="Spotify ID of a playlist, or a directory it was saved in",
+    )
+    parser.add_argument(
+        "--ids-file",
+        dest="ids_files",
+        action="append",
+        metavar="PATH",
+        help="File of playlists, one per line",
+    )
+    parser.add_argument(
+        "--evaluators",
+        default=",".join(EVALUATORS),
+        type=lambda x: x.lower().split(","),
+        help="Comma separated evaluators (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, required=True, help="Directory for results"
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes to order playlists with (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save",
+        type=Path,
+        metavar="DIR",
+        help="Also save every fetched playlist in DIR, to run again offline",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+    logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    unknown = [i for i in args.evaluators if i not in EVALUATORS]
+    if unknown:
+        parser.error(f"Unknown evaluators: {', '.join(unknown)}")
+    evaluators = {k: EVALUATORS[k] for k in args.evaluators}
+    ids = read_ids(args)
+    if not ids:
+        parser.error("No playlists given")
+
+    saved = [i for i in ids if Path(i).is_dir()]
+    remote = [i for i in ids if i not in saved]
+    start = time.perf_counter()
+    playlists = [Playlist.load(i) for i in saved]
+    counts = {"tracks": sum(len(p) for p in playlists), "unique_tracks": 0}
+    failed = []
+    if remote:
+        spotify = spotify_client()
+        fetched, fetched_counts, failed = fetch_playlists(spotify, remote)
+        playlists.extend(fetched)
+        counts["tracks"] += fetched_counts["tracks"]
+        counts["unique_tracks"] = fetched_counts["unique_tracks"]
+        if args.save:
+            for p in fetched:
+                p.save(args.save / p.id)
+    fetch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    workers = max(args.workers, 1)
+    executor = new_pool(workers)
+    try:
+        results = order_playlists(playlists, evaluators, executor, 2 * workers)
+    finally:
+        executor.shutdown()
+    order_seconds = time.perf_counter() - start
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    timings = {}
+    for p in playlists:
+        result = results[p.id]
+        if isinstance(result, Exception):
+            failed.append(p.id)
+            continue
+        timings[p.id] = {k: v["seconds"] for k, v in result.items()}
+        body = {
+            "id": p.id,
+            "name": p.metadata.get("name"),
+            "snapshot_id": p.snapshot_id,
+            "ids": list(p.df["id"]),
+            "orderings": result,
+        }
+        (args.output / f"{p.id}.json").write_text(json.dumps(body, indent=2))
+
+    summary = {
+        "playlists": len(playlists),
+        **counts,
+        "workers": args.workers,
+        "fetch_seconds": fetch_seconds,
+        "order_seconds": order_seconds,
+        "evaluator_seconds": timings,
+        "failed": failed,
+    }
+    (args.output / "timings.json").write_text(json.dumps(summary, indent=2))
+    logger.info(
+        "Simmered %d playlists (%d tracks, %d fetched) in %.1fs + %.1fs",
+        len(playlists),
+        counts["tracks"],
+        counts["unique_tracks"],
+        fetch_seconds,
+        order_seconds,
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
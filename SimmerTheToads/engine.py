@@ -1,33 +1,55 @@
-"""Primary playlist manipulation module."""
+"""Primary playlist manipulation module.
+
+Only numpy and pandas are imported up front. scipy, networkx and scikit-learn
+are imported by the functions that need them, so that importing this
+module (and booting a web worker) stays cheap. Plotting lives in `plotting`.
+"""
+import asyncio
+import collections
+import contextvars
+import functools
 import heapq
+import importlib
 import itertools
 import logging
+import numbers
 import os
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Type
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Type
 
-import matplotlib.pyplot as plt
-import networkx as nx
 import numpy as np
 import pandas as pd
-import scipy
-import seaborn as sns
-from joblib import Parallel, delayed
-from matplotlib.axes import Axes
-from matplotlib.figure import Figure
-from sklearn.cluster import AgglomerativeClustering
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import LabelEncoder, MinMaxScaler, RobustScaler
 from spotipy.client import Spotify
 
+from .features import FeatureMatrix
+from .metrics import REGISTRY, in_stage, stage
+from .scoring import score
+
 logger = logging.getLogger("SimmerTheToads")
 
-pd.set_option("display.max_columns", None)
-pd.set_option("display.max_rows", None)
-pd.set_option("display.width", None)
-np.set_printoptions(suppress=True)
-plt.style.use("seaborn-v0_8-paper")
+
+# Everything the evaluators import lazily.
+HEAVY_MODULES = (
+    "networkx",
+    "scipy.spatial",
+    "sklearn.cluster",
+    "sklearn.decomposition",
+    "sklearn.preprocessing",
+)
+
+
+def warm_imports() -> None:
+    """Import everything the evaluators need ahead of time.
+
+    Called by the gunicorn master before forking workers, so that the imported
+    modules are shared copy-on-write. CPU pools import them in their fork
+    server instead, see `pool.new_pool`.
+    """
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
 
 
 def grouper(iterable, n):
@@ -59,13 +81,125 @@ def pairwise(iterable):
     return zip(a, b)
 
 
+def split_means(values: np.ndarray, n: int) -> np.ndarray:
+    """Get the column means of `n` consecutive groups of rows.
+
+    Rows are grouped like `np.array_split`, and NaN is ignored like
+    `pd.Series.mean` does.
+
+    :param values: 2D array of shape (rows, columns), with at least n rows.
+    :returns: Array of shape (n, columns).
+    """
+    size, extra = divmod(len(values), n)
+    sizes = np.full(n, size)
+    sizes[:extra] += 1
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    missing = np.isnan(values)
+    sums = np.add.reduceat(np.where(missing, 0, values), starts, axis=0)
+    counts = np.add.reduceat(~missing, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def analysis_feature_names(counts: dict) -> List[str]:
+    """Get the names of the analysis features, see `analysis_features`."""
+    names = []
+    for k, n in counts.items():
+        if k == "sections":
+            prefix, columns = "section", Track.SECTION_COLUMNS
+        else:
+            prefix, columns = k, ["start"]
+        names.extend(f"{prefix}_{c}_{i}" for i in range(n) for c in columns)
+    return names
+
+
+def analysis_features(arrays: dict, counts: dict) -> dict:
+    """Summarize the analysis of a track as a fixed number of features.
+
+    The intervals of each kind are split in `counts[kind]` consecutive groups,
+    and the mean of each group is a feature. Every track of a playlist is
+    summarized with the same counts, the smallest number of intervals of any
+    of them, so that they have the same features.
+
+    :param arrays: Raw values, see `Track.analysis_arrays`.
+    :param counts: Number of groups of "sections", "bars", "beats" and
+                   "tatums". Kinds with a count of zero are skipped.
+    """
+    return dict(zip(analysis_feature_names(counts), _analysis_vector(arrays, counts)))
+
+
+def _analysis_vector(arrays: dict, counts: dict) -> np.ndarray:
+    values = [split_means(arrays[k], n).ravel() for k, n in counts.items() if n]
+    return np.concatenate(values) if values else np.empty(0)
+
+
+class GrowingMatrix:
+    """Float matrix that rows are appended to, preallocated in growing chunks.
+
+    Capacity doubles whenever it runs out, so appending n rows costs O(n)
+    copies overall.
+    """
+
+    def __init__(self, n_columns: int, capacity: int = 64):
+        self._data = np.empty((capacity, n_columns))
+        self._n = 0
+
+    def append(self, row) -> None:
+        """Add a row to the end of the matrix."""
+        if self._n == len(self._data):
+            grown = np.empty((2 * len(self._data), self._data.shape[1]))
+            grown[: self._n] = self._data[: self._n]
+            self._data = grown
+        self._data[self._n] = row
+        self._n += 1
+
+    @property
+    def array(self) -> np.ndarray:
+        """Get a view of the rows appended so far."""
+        return self._data[: self._n]
+
+    def __len__(self) -> int:
+        """Get the number of rows appended so far."""
+        return self._n
+
+
 class Track:
-    """Represent a single Spotify track."""
+    """Represent a single Spotify track.
 
-    _metadata: dict
-    _features: dict
-    _analysis: dict
-    _spotify: Spotify
+    Only what the engine uses is kept: a few fields of the metadata, the
+    audio features, and the raw values of the confident intervals of the
+    analysis (see `analysis_arrays`). The full analysis, segments included,
+    is only kept if asked for.
+    """
+
+    # Columns of the analysis sections summarized by the analysis features.
+    SECTION_COLUMNS = [
+        "start",
+        "loudness",
+        "tempo",
+        "key",
+        "mode",
+        "time_signature",
+    ]
+
+    # Metadata kept of a track, and of its artists and album.
+    METADATA_KEYS = ("id", "name", "uri", "duration_ms", "artists", "album")
+    NESTED_METADATA_KEYS = ("id", "name")
+
+    # Intervals of the analysis with a lower confidence are ignored.
+    MIN_CONFIDENCE = 0.7
+
+    # Fingerprints in the analysis of the whole track, never used.
+    TRACK_REMOVE_KEYS = (
+        "codestring",
+        "code_version",
+        "echoprintstring",
+        "synchstring",
+        "synch_version",
+        "rythmstring",
+        "rythm_version",
+    )
 
     analysis_df_names = (
         "bars",
@@ -75,52 +209,68 @@ class Track:
         "tatums",
     )
 
+    __slots__ = ("_metadata", "_features", "_arrays", "_analysis")
+
     def __init__(
         self,
         spotify: Spotify,
         metadata: dict,
         features: dict,
         get_analysis=True,
+        segments=False,
     ):
-        self._metadata = metadata
+        """Keep the parts of a track the engine uses.
+
+        :param spotify: Client to fetch the analysis with.
+        :param metadata: Track object of the WebAPI.
+        :param features: Audio features of the track.
+        :param get_analysis: Fetch the audio analysis.
+        :param segments: Keep the full analysis, see `analysis`.
+        """
+        self._metadata = _slim_metadata(metadata)
         self._features = features
-        self._features["track"] = self
-        self._spotify = spotify
-        self._analysis = {}
+        self._arrays: Optional[dict] = None
+        self._analysis: Optional[dict] = None
 
         if get_analysis:
-            self._get_analysis()
-
-    def _get_analysis(self) -> None:
-        track_remove_keys = (
-            "codestring",
-            "code_version",
-            "echoprintstring",
-            "synchstring",
-            "synch_version",
-            "rythmstring",
-            "rythm_version",
-        )
-
-        # TODO: This is somewhat slow since there are so many API calls.
-        #       Maybe do this lazily/async?
-        analysis = self._spotify.audio_analysis(self.id)
+            # One call per track, see ingest for making these concurrently.
+            self._set_analysis(spotify.audio_analysis(self.id), segments)
 
-        # Remove unused track attributes
-        for i in track_remove_keys:
-            analysis["track"].pop(i, None)
-        self._analysis["track"] = analysis["track"]
-
-        for i in self.analysis_df_names:
-            self._analysis[i] = pd.DataFrame(analysis[i])
-            self._analysis[i] = self._analysis[i].query("confidence > 0.7")
+    def _set_analysis(self, analysis: dict, segments: bool = False) -> None:
+        confident = {
+            k: [i for i in analysis.get(k, []) if self._confident(i)]
+            for k in self.analysis_df_names
+        }
+        self._arrays = {
+            "sections": _rows(confident["sections"], self.SECTION_COLUMNS),
+        }
+        for k in ("bars", "beats", "tatums"):
+            self._arrays[k] = _rows(confident[k], ["start"])
+
+        self._analysis = None
+        if segments:
+            self._analysis = {k: pd.DataFrame(v) for k, v in confident.items()}
+            self._analysis["track"] = {
+                k: v
+                for k, v in analysis.get("track", {}).items()
+                if k not in self.TRACK_REMOVE_KEYS
+            }
+
+    @classmethod
+    def _confident(cls, interval: dict) -> bool:
+        confidence = interval.get("confidence")
+        return confidence is not None and confidence > cls.MIN_CONFIDENCE
+
+    def _set_analysis_arrays(self, arrays: dict) -> None:
+        """Set the analysis from its raw values, see `analysis_arrays`."""
+        self._arrays = arrays
+        self._analysis = None
 
     def plot(self) -> None:
         """Show plots based on Spotify's own analysis."""
-        for i in self.analysis_df_names:
-            self.analysis[i].plot(x="start")
+        from .plotting import plot_track
 
-        plt.show()
+        plot_track(self)
 
     @property
     def id(self) -> str:
@@ -129,7 +279,7 @@ class Track:
 
     @property
     def metadata(self) -> dict:
-        """Get the raw metadata about this track."""
+        """Get the metadata kept about this track, see METADATA_KEYS."""
         return self._metadata
 
     @property
@@ -137,13 +287,21 @@ class Track:
         """Get the audio features about this track."""
         return self._features
 
+    @property
+    def has_analysis(self) -> bool:
+        """Check whether the analysis of this track is known."""
+        return self._arrays is not None
+
     @property
     def analysis(self) -> dict:
-        """Get the audio analysis about this track.
+        """Get the confident intervals of the audio analysis about this track.
+
+        Unless the track was created with `segments`, this is built from
+        `analysis_arrays` on every call, with only those columns, and without
+        segments or the analysis of the whole track.
 
         Data follows the following form.
         {
-          meta: {...},
           track: {...},
           bars: pd.DataFrame(columns=["start", "duration", "confidence"]),
           beats: pd.DataFrame(columns=["start", "duration", "confidence"]),
@@ -171,32 +329,46 @@ class Track:
           tatums: pd.DataFrame(columns=["start", "duration", "confidence"]),
         }
         """
-        return self._analysis
+        if self._analysis is not None:
+            return self._analysis
+        if self._arrays is None:
+            return {}
+
+        analysis = {
+            "track": {},
+            "sections": pd.DataFrame(
+                self._arrays["sections"], columns=self.SECTION_COLUMNS
+            ),
+            "segments": pd.DataFrame(),
+        }
+        for k in ("bars", "beats", "tatums"):
+            analysis[k] = pd.DataFrame(self._arrays[k], columns=["start"])
+        return analysis
 
     @property
     def num_bars(self) -> int:
         """Get the number of bars."""
-        return len(self.analysis["bars"])
+        return len(self.analysis_arrays()["bars"])
 
     @property
     def num_beats(self) -> int:
         """Get the number of beats."""
-        return len(self.analysis["beats"])
+        return len(self.analysis_arrays()["beats"])
 
     @property
     def num_sections(self) -> int:
         """Get the number of sections."""
-        return len(self.analysis["sections"])
+        return len(self.analysis_arrays()["sections"])
 
     @property
     def num_segments(self) -> int:
-        """Get the number of segments."""
+        """Get the number of segments, zero unless they were kept."""
         return len(self.analysis["segments"])
 
     @property
     def num_tatums(self) -> int:
         """Get the number of tatums."""
-        return len(self.analysis["tatums"])
+        return len(self.analysis_arrays()["tatums"])
 
     def get_analysis_features(
         self,
@@ -206,49 +378,32 @@ class Track:
         num_tatums: int,
     ) -> dict:
         """Get a Dataframe of all features used for analysis/clustering."""
-        base_features = self.features
-        analysis = self.analysis
+        base_features = dict(self.features)
 
         try:
             base_features["artist"] = self.metadata["artists"][0]["name"]
         except KeyError:
             base_features["artist"] = None
 
-        rel_section_columns = [
-            "start",
-            "loudness",
-            "tempo",
-            "key",
-            "mode",
-            "time_signature",
-        ]
-
-        # Mean of groups of sections
-        sections = analysis["sections"]
-        sections = sections[rel_section_columns]
-        sections = np.array_split(sections, num_sections)
-        for i, v in enumerate(sections):
-            for column in v.columns:
-                base_features[f"section_{column}_{i}"] = v[column].mean()
-
-        types = {
+        counts = {
+            "sections": num_sections,
             "bars": num_bars,
             "beats": num_beats,
             "tatums": num_tatums,
         }
-        for k, v in types.items():
-            if v == 0:
-                # Skip empty fields
-                continue
-            data = analysis[k]
-            data = data[["start"]]
-            splits = np.array_split(data, v)
-            for i, split in enumerate(splits):
-                for column in split.columns:
-                    base_features[f"{k}_{column}_{i}"] = split[column].mean()
-
+        base_features.update(analysis_features(self.analysis_arrays(), counts))
         return base_features
 
+    def analysis_arrays(self) -> dict:
+        """Get the raw values the analysis features are computed from.
+
+        Sections are an array of the SECTION_COLUMNS, bars, beats and tatums an
+        array of their start times, each with one row per confident interval.
+        """
+        if self._arrays is None:
+            raise ValueError(f"The analysis of track {self.id} is not known")
+        return self._arrays
+
     def __repr__(self) -> str:
         """Represent a track as 'name', 'artist'."""
         name = self.metadata["name"]
@@ -256,6 +411,186 @@ class Track:
         return f"{name}, {artist}"
 
 
+def _slim_metadata(metadata: dict) -> dict:
+    """Keep only the METADATA_KEYS of a track object of the WebAPI."""
+    slim = {k: metadata[k] for k in Track.METADATA_KEYS if k in metadata}
+    nested = Track.NESTED_METADATA_KEYS
+    if "artists" in slim:
+        slim["artists"] = [{k: i[k] for k in nested if k in i} for i in slim["artists"]]
+    if isinstance(slim.get("album"), dict):
+        slim["album"] = {k: slim["album"][k] for k in nested if k in slim["album"]}
+    return slim
+
+
+def _rows(intervals: List[dict], columns: List[str]) -> np.ndarray:
+    """Get the given columns of intervals of the analysis as a float array."""
+    # Missing values (None) become NaN.
+    values = [[i.get(k) for k in columns] for i in intervals]
+    return np.array(values, dtype=float).reshape(len(intervals), len(columns))
+
+
+def _playlist_pages(spotify: Spotify, id: str) -> Iterator[List[dict]]:
+    """Yield the items of a playlist, one page at a time."""
+    with stage("playlist_fetch"):
+        result = spotify.user_playlist_tracks(playlist_id=id)
+    yield result["items"]
+    while result["next"]:
+        with stage("playlist_fetch"):
+            result = spotify.next(result)
+        yield result["items"]
+
+
+def _with_features(
+    spotify: Spotify,
+    pages: Iterable[List[dict]],
+) -> Iterator[Tuple[dict, dict]]:
+    """Yield every playlist item along with its audio features."""
+    for items in pages:
+        # Pages are at most as large as the batches of the features API.
+        for chunk in batched(items, 100):
+            ids = [i["track"]["id"] for i in chunk]
+            with stage("feature_fetch"):
+                features = spotify.audio_features(ids)
+            yield from zip(chunk, features)
+
+
+def _analysed(
+    spotify: Spotify,
+    items: Iterable[Tuple[dict, dict]],
+    parallel_fetch: bool,
+) -> Iterator[Track]:
+    """Yield a Track, with its analysis, for every playlist item."""
+    if not parallel_fetch:
+        for item, features in items:
+            with stage("analysis"):
+                track = Track(spotify, item["track"], features)
+            yield track
+        return
+
+    # Keep a bounded number of analyses in flight ahead of the consumer.
+    # Each runs in a copy of the caller's context, e.g. a Flask request, and
+    # is timed on its own thread.
+    n_threads = os.cpu_count() or 1
+    pending = collections.deque()
+    with ThreadPoolExecutor(n_threads, thread_name_prefix="analysis") as executor:
+        for item, features in items:
+            task = functools.partial(
+                in_stage, "analysis", Track, spotify, item["track"], features
+            )
+            pending.append(executor.submit(contextvars.copy_context().run, task))
+            if len(pending) >= 2 * n_threads:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def stream_tracks(
+    spotify: Spotify,
+    id: str,
+    parallel_fetch: bool = True,
+) -> Iterator[Track]:
+    """Yield the tracks of a playlist in order, with features and analysis.
+
+    A pipeline of generators (pages, then feature batches, then analyses), so
+    that each track can be processed as soon as it is fetched, while the rest
+    of the playlist is still to come.
+
+    :param parallel_fetch: Fetch several analyses at once with threads.
+    """
+    pages = _playlist_pages(spotify, id)
+    return _analysed(spotify, _with_features(spotify, pages), parallel_fetch)
+
+
+class _FeatureRows:
+    """Accumulate the feature frame of a playlist as its tracks arrive.
+
+    Numeric audio features are appended to a GrowingMatrix as each track
+    arrives, along with the raw values of its analysis. The analysis features
+    depend on every track (see `analysis_features`), so they are computed
+    once the last track is in.
+    """
+
+    DROPPED_COLUMNS = ("type", "analysis_url")
+    ANALYSIS_KINDS = ("sections", "bars", "beats", "tatums")
+
+    def __init__(self):
+        self.tracks: List[Track] = []
+        self._columns: Optional[List[str]] = None
+        self._numeric: Dict[str, int] = {}
+        self._integer: Set[str] = set()
+        self._text: Dict[str, list] = {}
+        self._matrix: Optional[GrowingMatrix] = None
+        self._artists = []
+        self._analyses = []
+        self._counts = {k: None for k in self.ANALYSIS_KINDS}
+
+    def _init_columns(self, features: dict) -> None:
+        self._columns = [k for k in features if k not in self.DROPPED_COLUMNS]
+        for k in self._columns:
+            v = features[k]
+            if isinstance(v, numbers.Real) and not isinstance(v, bool):
+                self._numeric[k] = len(self._numeric)
+                if isinstance(v, numbers.Integral):
+                    self._integer.add(k)
+            else:
+                self._text[k] = []
+        self._matrix = GrowingMatrix(len(self._numeric))
+
+    def append(self, track: Track) -> None:
+        """Add the next track of the playlist."""
+        features = track.features
+        if self._columns is None:
+            self._init_columns(features)
+
+        row = np.full(len(self._numeric), np.nan)
+        for k, i in self._numeric.items():
+            v = features.get(k)
+            if v is not None:
+                row[i] = v
+            if not isinstance(v, numbers.Integral):
+                self._integer.discard(k)
+        self._matrix.append(row)
+        for k, values in self._text.items():
+            values.append(features.get(k))
+
+        try:
+            self._artists.append(track.metadata["artists"][0]["name"])
+        except KeyError:
+            self._artists.append(None)
+
+        arrays = track.analysis_arrays()
+        self._analyses.append(arrays)
+        for k, n in self._counts.items():
+            count = len(arrays[k])
+            self._counts[k] = count if n is None else min(n, count)
+        self.tracks.append(track)
+
+    def frame(self) -> pd.DataFrame:
+        """Get the feature frame of every track appended."""
+        numeric = self._matrix.array
+        data = {}
+        for k in self._columns:
+            if k in self._numeric:
+                column = numeric[:, self._numeric[k]]
+                data[k] = column.astype(np.int64) if k in self._integer else column
+            else:
+                data[k] = self._text[k]
+        data["artist"] = self._artists
+        base = pd.DataFrame(data)
+
+        counts = {k: self._counts[k] or 0 for k in self.ANALYSIS_KINDS}
+        names = analysis_feature_names(counts)
+        analysis = np.empty((len(self.tracks), len(names)))
+        for i, arrays in enumerate(self._analyses):
+            analysis[i] = _analysis_vector(arrays, counts)
+
+        return pd.concat([base, pd.DataFrame(analysis, columns=names)], axis=1)
+
+    def __len__(self) -> int:
+        """Get the number of tracks appended."""
+        return len(self.tracks)
+
+
 class Playlist:
     """Represent a Spotify playlist."""
 
@@ -263,6 +598,9 @@ class Playlist:
     id: str
     name: Optional[str]
     df: pd.DataFrame
+    tracks: Dict[str, Track]
+    remote_ids: List[str]
+    snapshot_id: Optional[str]
     _spotify: Spotify
 
     FEATURE_COLUMNS = [
@@ -282,158 +620,177 @@ class Playlist:
         "time_signature",
         "track_href",
         "valence",
-        "track",
     ]
 
-    def __init__(self, spotify: Spotify, id: str, parallel_fetch=True):
+    def __init__(
+        self,
+        spotify: Spotify,
+        id: str,
+        parallel_fetch=True,
+        async_fetch=False,
+    ):
+        """Fetch a playlist and the features of all of its tracks.
+
+        :param spotify: Client to fetch the playlist with.
+        :param id: Spotify ID of the playlist.
+        :param parallel_fetch: Fetch the audio analyses with a thread pool.
+        :param async_fetch: Make every call concurrently, see `ingest`. Takes
+                            precedence over `parallel_fetch`.
+        """
         self.id = id
         self._spotify = spotify
-        self.metadata = self._spotify.playlist(id)
-
-        # Retrieve all the tracks within the playlist
-        # Handle the pagination
-        track_items = []
-        result = self._spotify.user_playlist_tracks(playlist_id=self.id)
-        track_items.extend(result["items"])
-        while result["next"]:
-            result = self._spotify.next(result)
-            track_items.extend(result["items"])
-
-        track_ids = [i["track"]["id"] for i in track_items]
-
-        # Get all the features of each track within the playlist.
-        # Do this outside of the Track class to leverage the batched API.
-        features = []
-        for chunk in batched(track_ids, min(len(track_ids), 100)):
-            features.extend(self._spotify.audio_features(list(chunk)))
-
-        if parallel_fetch:
-            # TODO: Repair this for flask requests.
-            results = Parallel(n_jobs=os.cpu_count(), prefer="threads")(
-                delayed(Track)(self._spotify, m["track"], f)
-                for m, f in zip(track_items, features)
-            )
+
+        rows = _FeatureRows()
+        if async_fetch:
+            from .ingest import ingest_playlist
+
+            # The wall time of it all. Its calls are timed on the threads
+            # making them, under their own stages.
+            with stage("ingest"):
+                self.metadata, _ = asyncio.run(
+                    ingest_playlist(spotify, id, on_track=rows.append)
+                )
         else:
-            results = [
-                Track(self._spotify, m["track"], f)
-                for m, f in zip(track_items, features)
-            ]
-        if not results:
-            raise ValueError("Cannot construt empty playlist")
+            with stage("playlist_fetch"):
+                self.metadata = self._spotify.playlist(id)
+            for track in stream_tracks(spotify, id, parallel_fetch):
+                rows.append(track)
+        self._set_rows(rows)
+
+    @classmethod
+    def from_tracks(
+        cls,
+        spotify: Optional[Spotify],
+        id: str,
+        metadata: dict,
+        tracks: Iterable[Track],
+    ) -> "Playlist":
+        """Make a playlist of tracks that were already fetched.
 
-        analysis_params = {
-            "num_bars": 0,
-            "num_beats": 0,
-            "num_sections": 0,
-            "num_tatums": 0,
-        }
-        for i in analysis_params.keys():
-            analysis_params[i] = getattr(
-                min(results, key=lambda x: getattr(x, i)),
-                i,
-            )
+        Tracks can be shared by several playlists, e.g. when fetching many
+        playlists at once, see `cli`.
 
-        rows = [i.get_analysis_features(**analysis_params) for i in results]
-        self.df = pd.DataFrame(rows)
-        self.df = self.df.drop(
-            labels=["type", "analysis_url"],
-            axis=1,
-            errors="ignore",
-        )
+        :param spotify: Client for suggestions and writing back, if needed.
+        :param id: Spotify ID of the playlist.
+        :param metadata: Metadata of the playlist, as from `Spotify.playlist`.
+        :param tracks: Tracks of the playlist, in order, with their analysis.
+        """
+        p = cls.__new__(cls)
+        p.id = id
+        p._spotify = spotify
+        p.metadata = metadata
+        rows = _FeatureRows()
+        for track in tracks:
+            rows.append(track)
+        p._set_rows(rows)
+        return p
+
+    def _set_rows(self, rows: "_FeatureRows"):
+        if not rows:
+            raise ValueError("Cannot construt empty playlist")
 
-        # Move track column to beginning for ease of reading output
-        self.df.insert(0, "track", self.df.pop("track"))
+        self.df = rows.frame()
+        # Kept out of the frame, which only holds numbers and strings.
+        self.tracks = dict(zip(self.df["id"], rows.tracks))
+        # The order on Spotify and its snapshot, which changes are made to.
+        self.remote_ids = list(self.df["id"])
+        self.snapshot_id = self.metadata.get("snapshot_id")
 
     def to_disk(self, path: Path):
         """Dump the metadata to a JSON file on disk."""
-        # Drop the track object reference
-        serializeable_df = self.df.drop(["track"], axis=1)
-        serializeable_df.to_json(path, orient="records", indent=4)
+        self.df.to_json(path, orient="records", indent=4)
+
+    def save(self, path: Path):
+        """Save the playlist, tracks and features included, see `archive`."""
+        from .archive import save
+
+        save(self, path)
+
+    @classmethod
+    def load(cls, path: Path, spotify: Optional[Spotify] = None) -> "Playlist":
+        """Load a playlist saved with `save`, without calling Spotify.
+
+        :param path: Directory the playlist was saved in.
+        :param spotify: Client for suggestions and writing back, if needed.
+        """
+        from .archive import load
+
+        return load(path, spotify)
 
     def to_spotify(self):
-        """Write the playlist back to spotify."""
+        """Write the playlist back to spotify, changing as little as possible."""
+        from .writeback import write_back
+
         new_tracks = list(self.df["id"])
-        self._spotify.playlist_replace_items(self.id, new_tracks)
+        self.snapshot_id = write_back(
+            self._spotify, self.id, self.remote_ids, new_tracks, self.snapshot_id
+        )
+        self.remote_ids = new_tracks
 
     def reorder_by_feature(self, feature):
         """Reorder the playlist by a single feature."""
         self.df = self.df.sort_values(by=feature)
         self.df = self.df.reset_index()
 
-    def corr_matrix(self, fmt_title=None) -> (Figure, Axes):
+    def corr_matrix(self, fmt_title=None):
         """Generate a correlation matrix of the data features."""
-        fig, ax = plt.subplots()
-        matrix = self.df.corr(numeric_only=True)
-        sns.heatmap(matrix, annot=True, ax=ax)
+        from .plotting import corr_matrix
 
-        if fmt_title is None:
-            title = f"{self.metadata['name']}: Correlation Matrix"
-        else:
-            title = fmt_title.format(name=self.metadata["name"])
-        ax.set_title(title)
-
-        return fig, ax
+        return corr_matrix(self, fmt_title)
 
     def plot(self, fmt_title=None):
         """Show some simple statistics about this playlist."""
-        nrows = 4
-        ncols = 3
-        lineplots_fig, lineplots_axes = plt.subplots(
-            nrows=nrows, ncols=ncols, figsize=(16, 12)
-        )
-        distplots_fig, distplots_axes = plt.subplots(
-            nrows=nrows, ncols=ncols, figsize=(16, 12)
-        )
-        relevant_cols = [
-            "acousticness",
-            "danceability",
-            "duration_ms",
-            "energy",
-            "instrumentalness",
-            "key",
-            "liveness",
-            "loudness",
-            "mode",
-            "speechiness",
-            "tempo",
-            "time_signature",
-        ]
+        from .plotting import plot_playlist
 
-        for i, v in enumerate(relevant_cols):
-            sns.lineplot(
-                data=self.df,
-                x=self.df.index,
-                y=v,
-                ax=lineplots_axes[i % (ncols + 1)][i // nrows],
-                markers=True,
-                hue=None,
-            )
-            sns.histplot(
-                data=self.df,
-                x=v,
-                ax=distplots_axes[i % (ncols + 1)][i // nrows],
-                hue=None,
-            )
+        plot_playlist(self, fmt_title)
 
-        if fmt_title is None:
-            title = f"{self.metadata['name']}"
-        else:
-            title = fmt_title.format(name=self.metadata["name"])
+    def ordered_tracks(self) -> List[Track]:
+        """Get the tracks of the playlist, in the order of the frame."""
+        return [self.tracks[i] for i in self.df["id"]]
 
-        lineplots_fig.suptitle(title)
-        lineplots_fig.tight_layout()
+    @property
+    def features(self) -> FeatureMatrix:
+        """Get the feature matrix of the tracks, computed once and shared.
 
-        distplots_fig.suptitle(title)
-        distplots_fig.tight_layout()
+        It is only recomputed when tracks it does not cover are added.
+        """
+        matrix = getattr(self, "_features", None)
+        if matrix is None or not matrix.covers(self.df.index):
+            matrix = self._features = FeatureMatrix(self.df)
+        return matrix
 
     def __len__(self):
         """Get the number of tracks within this playlist."""
         return len(self.df)
 
 
+def _ranks(path: Sequence[int]) -> np.ndarray:
+    """Get the position of every node within a path through all of them.
+
+    Sorting by the result puts the nodes in the order of the path.
+    """
+    ranks = np.empty(len(path), dtype=int)
+    ranks[np.asarray(path, dtype=int)] = np.arange(len(path))
+    return ranks
+
+
 class PlaylistEvaluatorBase(ABC):
     """Abstract base class for playlist raters."""
 
+    # Whether the evaluator makes the distance between consecutive songs as
+    # large as possible, rather than as small.
+    maximize = False
+
+    # Views of the FeatureMatrix that `reorder` uses, along with "raw". They
+    # are shared with the process running it rather than computed there, see
+    # `SharedFeatures`.
+    views: Tuple[str, ...] = ()
+
+    # Whether the order is a path through the distances between songs, which
+    # `reorder_from` can update. Orders made otherwise (e.g. by cluster) would
+    # be replaced by such a path instead, so they are simmered in full.
+    incremental = False
+
     @abstractmethod
     def __init__(self, playlist: Playlist):
         self._playlist = playlist
@@ -443,9 +800,69 @@ class PlaylistEvaluatorBase(ABC):
         """Reorder the songs within the existing playlist."""
         pass
 
+    def reorder_from(self, previous: Sequence[str]):
+        """Reorder the songs by changing an earlier order as little as possible.
+
+        Songs no longer in the playlist are left out of the earlier order, and
+        new songs are inserted where they add the least distance (the most,
+        for evaluators that maximize it). Only the songs around those changes
+        are then reordered, see `solver.repair`, so that the time taken grows
+        with the size of the change rather than of the playlist.
+
+        :param previous: Track IDs in the earlier order.
+        :raises NotImplementedError: If the evaluator is not `incremental`.
+        """
+        from .solver import cheapest_insertion, repair
+
+        if not self.incremental:
+            raise NotImplementedError(
+                f"{type(self).__name__} cannot reorder incrementally"
+            )
+
+        df = self._playlist.df
+        labels: Dict[str, collections.deque] = {}
+        for k, id in enumerate(df["id"]):
+            labels.setdefault(id, collections.deque()).append(k)
+
+        # Rows of the frame in the earlier order, and the ones next to a song
+        # that was removed.
+        path = []
+        touched = set()
+        gap = False
+        for id in previous:
+            if labels.get(id):
+                path.append(labels[id].popleft())
+                if gap:
+                    touched.add(path[-1])
+                    gap = False
+            else:
+                if path:
+                    touched.add(path[-1])
+                gap = True
+        added = [k for rows in labels.values() for k in rows]
+
+        with stage("preprocess"):
+            feature_matrix = self._preprocess_features()
+        path = cheapest_insertion(feature_matrix, path, added, self.maximize)
+        touched.update(added)
+        positions = [k for k, row in enumerate(path) if row in touched]
+        path = repair(feature_matrix, path, positions, self.maximize)
+
+        logger.info(
+            "Playlist: %s reordered from an earlier order, %d songs added and "
+            "%d removed",
+            self._playlist.id,
+            len(added),
+            len(previous) - (len(path) - len(added)),
+        )
+        df["sort_1"] = _ranks(path)
+
     @abstractmethod
     def suggest(self):
         """Suggest songs to add in the playlist."""
+        import networkx as nx
+        import scipy.spatial
+
         df = self._playlist.df
         sort_cols = [i for i in df.columns if i.startswith("sort_")]
         largest_sort_col = max(sort_cols, key=lambda x: int(x.split("_")[1]))
@@ -458,24 +875,17 @@ class PlaylistEvaluatorBase(ABC):
         # Preprocess
         # Up to 1/4 of the songs in the final playlist can be suggestions.
         max_suggestions = len(df) // 4
-        rows = list(df.iterrows())
-        cols_to_remove = [
-            "track",
-            "artist",
-            "id",
-            "uri",
-            "track_href",
-        ]
+        features = self._playlist.features.raw
 
         # Determine where we need to suggest new songs.
         #
         # Slide along the playlist in pairs ((a[0], a[1]), (a[1], a[2]), etc.),
         # and find the two songs with the greatest distance.
+        ordered = df.sort_values(by=sort_cols, kind="stable").index
+        positions = self._playlist.features.positions(ordered)
         distances = {}
-        for (i, first), (j, second) in pairwise(rows):
-            first = first.drop(cols_to_remove).to_numpy()
-            second = second.drop(cols_to_remove).to_numpy()
-            dist = scipy.spatial.distance.hamming(first, second)
+        for (a, i), (b, j) in pairwise(zip(positions, ordered)):
+            dist = scipy.spatial.distance.hamming(features[a], features[b])
             distances[(i, j)] = dist
 
         suggestion_locs = heapq.nlargest(
@@ -497,8 +907,8 @@ class PlaylistEvaluatorBase(ABC):
         ]
         # Get the actual suggestions and their locations
         for i, j in suggestion_locs:
-            first = df.iloc[i]
-            second = df.iloc[j]
+            first = df.loc[i]
+            second = df.loc[j]
 
             first_id = first.id
             second_id = second.id
@@ -560,6 +970,10 @@ class PlaylistEvaluatorBase(ABC):
             _, suggestion_index, _ = nx.algorithms.shortest_path(
                 G, source=first_index, target=second_index
             )
+            track = tracks[suggestion_index - 1]
+            self._playlist.tracks.setdefault(
+                suggestion_df.loc[suggestion_index, "id"], track
+            )
             ins_key = len(df)
             df.loc[ins_key] = suggestion_df.loc[suggestion_index]
             # Copy all the positional information of the song track before me.
@@ -572,6 +986,32 @@ class PlaylistEvaluatorBase(ABC):
         """Get the playlist being evaluated."""
         return self._playlist
 
+    def _features(self, view: str, labels: Optional[pd.Index] = None) -> np.ndarray:
+        """Get a view of the playlist's FeatureMatrix.
+
+        :param view: Name of the view, e.g. "raw" or "minmax".
+        :param labels: Rows to get, all rows of the frame in order by default.
+        """
+        matrix = self._playlist.features
+        values = getattr(matrix, view)
+        if labels is None:
+            labels = self._playlist.df.index
+            if labels.equals(matrix.index):
+                return values
+        return values[matrix.positions(labels)]
+
+    def _distances(self) -> np.ndarray:
+        """Get the distances between the tracks, see `FeatureMatrix.distances`.
+
+        Rows and columns are in the order of the frame.
+        """
+        matrix = self._playlist.features
+        labels = self._playlist.df.index
+        if labels.equals(matrix.index):
+            return matrix.distances
+        positions = matrix.positions(labels)
+        return matrix.distances[np.ix_(positions, positions)]
+
 
 class TSPEvaluator(PlaylistEvaluatorBase):
     """Evaluate playlists only using TSP.
@@ -582,6 +1022,9 @@ class TSPEvaluator(PlaylistEvaluatorBase):
     etc.
     """
 
+    views = ("minmax", "distances")
+    incremental = True
+
     def __init__(self, playlist: Playlist):
         super().__init__(playlist)
 
@@ -589,31 +1032,16 @@ class TSPEvaluator(PlaylistEvaluatorBase):
         self,
         df: Optional[pd.DataFrame] = None,
     ) -> np.array:
-        if df is None:
-            df = self._playlist.df
-
-        # Ordinal encode the artists
-        le = LabelEncoder()
-        artist = le.fit_transform(df["artist"])
-        artist = np.atleast_2d(artist).T
-        df["artist_ord"] = artist
-
-        # Assume all numeric features are valid input features
-        numeric_df = df.select_dtypes(include=[np.number])
-
-        mm_scaler = MinMaxScaler()
-        numeric_df[:] = mm_scaler.fit_transform(numeric_df)
-        scaled = numeric_df.to_numpy()
-
-        return scaled
+        if df is not None:
+            return FeatureMatrix(df).minmax
+        return self._features("minmax")
 
     def reorder(self):
         """Reorder the songs within the existing playlist."""
-        feature_matrix = self._preprocess_features()
-        distance_matrix = scipy.spatial.distance_matrix(
-            feature_matrix,
-            feature_matrix,
-        )
+        import networkx as nx
+
+        with stage("distance"):
+            distance_matrix = self._distances()
 
         G = nx.from_numpy_array(distance_matrix)
         path = nx.approximation.traveling_salesman_problem(
@@ -630,7 +1058,7 @@ class TSPEvaluator(PlaylistEvaluatorBase):
             )
             path = list(dict.fromkeys(path))
 
-        self._playlist.df["sort_1"] = path
+        self._playlist.df["sort_1"] = _ranks(path)
 
     def suggest(self):
         """Suggest songs to add in the playlist."""
@@ -645,6 +1073,8 @@ class ClusteringEvaluator(PlaylistEvaluatorBase):
     minimizing the distance of TSP tour through the playlist.
     """
 
+    views = ("pca",)
+
     def __init__(self, playlist: Playlist):
         super().__init__(playlist)
 
@@ -653,46 +1083,17 @@ class ClusteringEvaluator(PlaylistEvaluatorBase):
         df: Optional[pd.DataFrame] = None,
         scale: bool = True,
     ) -> np.array:
-        if df is None:
-            df = self._playlist.df
-
-        # Ordinal encode the artists
-        le = LabelEncoder()
-        artist = le.fit_transform(df["artist"])
-        artist = np.atleast_2d(artist).T
-        df["artist_ord"] = artist
-
-        # Assume all numeric features are valid input features
-        numeric_df = df.select_dtypes(include=[np.number])
-        if not scale:
-            return numeric_df.to_numpy()
-
-        r_scaler = RobustScaler()
-        mm_scaler = MinMaxScaler()
-
-        # Exclude categorical features from scaling
-        artist = numeric_df["artist_ord"]
-        numeric_df = numeric_df.drop(labels=["artist_ord"], axis=1)
-        # TODO: Investigate the deprecation warning
-        numeric_df[:] = r_scaler.fit_transform(numeric_df)
-        numeric_df[:] = mm_scaler.fit_transform(numeric_df)
-        numeric_df["artist_ord"] = artist
-        scaled = numeric_df.to_numpy()
-
-        # Principle component analysis
-        try:
-            pca = PCA(n_components=10)
-            scaled = pca.fit_transform(scaled)
-        except ValueError:
-            # Very few tracks or features.
-            pca = PCA(n_components=min(*numeric_df.shape))
-            scaled = pca.fit_transform(scaled)
-
-        return scaled
+        view = "pca" if scale else "raw"
+        if df is not None:
+            return getattr(FeatureMatrix(df), view)
+        return self._features(view)
 
     def _cluster(self):
         """Reorder playlist using agglomerative clustering."""
-        feature_matrix = self._preprocess_features()
+        from sklearn.cluster import AgglomerativeClustering
+
+        with stage("preprocess"):
+            feature_matrix = self._preprocess_features()
         if len(feature_matrix) <= 1:
             labels = list(range(len(feature_matrix)))
         else:
@@ -701,7 +1102,8 @@ class ClusteringEvaluator(PlaylistEvaluatorBase):
                 distance_threshold=3,
                 linkage="ward",
             )
-            labels = clustering.fit_predict(feature_matrix)
+            with stage("clustering"):
+                labels = clustering.fit_predict(feature_matrix)
         self._playlist.df["sort_1"] = labels
         logger.info(
             "Playlist: %s with %d songs has %d clusters",
@@ -711,6 +1113,9 @@ class ClusteringEvaluator(PlaylistEvaluatorBase):
         )
 
     def _subcluster_opt(self):
+        import networkx as nx
+        import scipy.spatial
+
         self._playlist.df["sort_2"] = 0
         for cluster in self._playlist.df["sort_1"].unique():
             df = self._playlist.df.query("sort_1 == @cluster")
@@ -719,14 +1124,7 @@ class ClusteringEvaluator(PlaylistEvaluatorBase):
                 continue
 
             # Compute distance of all the features within the matrix
-            feature_matrix = df.select_dtypes(include=[np.number])
-            to_drop = [i for i in feature_matrix.columns if i.startswith("sort_")]
-            feature_matrix = feature_matrix.drop(
-                labels=to_drop,
-                axis=1,
-                errors="ignore",
-            )
-            feature_matrix = feature_matrix.to_numpy()
+            feature_matrix = self._features("raw", df.index)
             distance_matrix = scipy.spatial.distance_matrix(
                 feature_matrix, feature_matrix
             )
@@ -748,40 +1146,29 @@ class ClusteringEvaluator(PlaylistEvaluatorBase):
             self._playlist.df.loc[
                 self._playlist.df.eval("sort_1 == @cluster"),
                 "sort_2",
-            ] = path
+            ] = _ranks(path)
 
     def _order_clusters(self):
         """Reorder the clusters to minimize TSP across them."""
+        import networkx as nx
+        import scipy.spatial
+
         clusters = self._playlist.df["sort_1"].unique()
         n_clusters = len(clusters)
         if n_clusters <= 1:
             return
 
-        distance_matrix = np.zeros((n_clusters, n_clusters))
-
-        df = self._playlist.df.select_dtypes(include=[np.number])
-        for i, src in enumerate(clusters):
-            src_df = df.query("sort_1 == @src")
-            src_df = src_df.set_index("sort_2")
-            # Last node from every cluster connects to first node within every
-            # other node.
-            src_node = src_df.iloc[-1]
-            src_node = src_node.drop(
-                labels=["sort_1", "sort_2"],
-                errors="ignore",
+        # Last node from every cluster connects to first node within every
+        # other node.
+        in_order = self._playlist.df.sort_values(by="sort_2", kind="stable")
+        labels = in_order.groupby("sort_1", sort=False).groups
+        firsts = [labels[i][0] for i in clusters]
+        lasts = [labels[i][-1] for i in clusters]
+        with stage("distance"):
+            distance_matrix = scipy.spatial.distance.cdist(
+                self._features("raw", pd.Index(lasts)),
+                self._features("raw", pd.Index(firsts)),
             )
-            src_node = np.atleast_2d(src_node.to_numpy())
-            for j, dst in enumerate(clusters):
-                dst_df = df.query("sort_1 == @dst")
-                dst_df = dst_df.set_index("sort_2")
-                dst_node = dst_df.iloc[0]
-                dst_node = dst_node.drop(
-                    labels=["sort_1", "sort_2"],
-                    errors="ignore",
-                )
-                dst_node = np.atleast_2d(dst_node.to_numpy())
-                distance = scipy.spatial.distance.cdist(src_node, dst_node)
-                distance_matrix[i, j] = distance
 
         G = nx.from_numpy_array(distance_matrix)
         tsp = nx.approximation.traveling_salesman_problem
@@ -789,13 +1176,12 @@ class ClusteringEvaluator(PlaylistEvaluatorBase):
         # Ensure the path contains no duplicates, but also preserve the order.
         path = list(dict.fromkeys(path))
 
-        # Generate the new resulting dataframe
-        # TODO: There may be a more performant way to do this.
-        result = pd.DataFrame()
-        for i in path:
-            result = pd.concat([result, self._playlist.df.query("sort_1 == @i")])
-
-        self._playlist.df = result
+        # Number the clusters in the order of the path, so that sorting by
+        # them keeps it.
+        ranks = dict(zip(clusters[path], range(n_clusters)))
+        df = self._playlist.df
+        df["sort_1"] = df["sort_1"].map(ranks)
+        self._playlist.df = df.sort_values(by=["sort_1", "sort_2"], kind="stable")
 
     def reorder(self):
         """Reorder playlist combining several techniques."""
@@ -814,72 +1200,148 @@ class ChaosEvaluator(PlaylistEvaluatorBase):
     Same as the TSPEvaluator, but maximize the distance instead.
     """
 
+    maximize = True
+    views = ("minmax", "distances")
+    incremental = True
+
     def __init__(self, playlist: Playlist):
         super().__init__(playlist)
 
     def _preprocess_features(self, df: Optional[pd.DataFrame] = None):
-        if df is None:
-            df = self._playlist.df
+        if df is not None:
+            return FeatureMatrix(df).minmax
+        return self._features("minmax")
 
-        # Ordinal encode the artists
-        # Ordinal encode the artists
-        le = LabelEncoder()
-        artist = le.fit_transform(df["artist"])
-        artist = np.atleast_2d(artist).T
-        df["artist_ord"] = artist
+    def reorder(self):
+        """Reorder the songs within the existing playlist.
 
-        # Assume all numeric features are valid input features
-        numeric_df = df.select_dtypes(include=[np.number])
+        Inverse TSP problem, solved directly on the distance matrix: farthest
+        neighbour construction improved by 2-opt, see `solver.max_dispersion`.
+        """
+        from .solver import max_dispersion
 
-        mm_scaler = MinMaxScaler()
-        numeric_df[:] = mm_scaler.fit_transform(numeric_df)
-        scaled = numeric_df.to_numpy()
+        with stage("distance"):
+            distance_matrix = self._distances()
+        path = max_dispersion(distance_matrix)
+        self._playlist.df["sort_1"] = _ranks(path)
 
-        return scaled
+    def suggest(self):
+        """Suggest songs to be added into the playlist."""
+        return super().suggest()
 
-    def reorder(self):
-        """Reorder the songs within the existing playlist.
 
-        Inverse TSP problem.
-        """
-        feature_matrix = self._preprocess_features()
-        distance_matrix = scipy.spatial.distance_matrix(
-            feature_matrix,
-            feature_matrix,
-        )
-        distance_matrix *= -1
+def _shared_views(evaluators: Iterable[Type[PlaylistEvaluatorBase]]) -> List[str]:
+    """Get the views of the FeatureMatrix to share with a pool of evaluators.
 
-        offset = abs(np.min(distance_matrix)) + 10
-        distance_matrix += offset
-        np.fill_diagonal(distance_matrix, 0)
+    The distances take time and memory quadratic in the number of tracks, so
+    they are only computed up front if several evaluators use them, and left
+    to the worker otherwise.
+    """
+    counts = collections.Counter(v for e in evaluators for v in e.views)
+    return [v for v, n in counts.items() if v != "distances" or n > 1]
 
-        G = nx.from_numpy_array(distance_matrix)
-        path = nx.approximation.traveling_salesman_problem(
-            G,
-            weight="weight",
-            nodes=set(G.nodes),
-            cycle=False,
-        )
 
-        if len(path) != len(distance_matrix):
-            logger.warning(
-                "Path length does not match distance matrix size (%d != %d)",
-                len(path),
-                len(distance_matrix),
-            )
-            path = list(dict.fromkeys(path))
+def _reorder_detached(
+    id: str,
+    df: pd.DataFrame,
+    evaluator: Type[PlaylistEvaluatorBase],
+    features: Optional[FeatureMatrix] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Run `evaluator.reorder` on a playlist without a Spotify client.
+
+    Used to run the ordering in another process. Evaluators only order by the
+    FeatureMatrix, so `df` only needs the index and sort columns of the frame,
+    and the FeatureMatrix is sent as a SharedFeatures, mapped rather than
+    copied. Only the order comes back.
+
+    :param features: FeatureMatrix of the playlist, computed from the full
+                     frame if missing.
+    :returns: The rows of `df` in the order the evaluator left the frame in,
+              and the values of its sort columns, in that order.
+    """
+    p = Playlist.__new__(Playlist)
+    p.id = id
+    p.metadata = {}
+    p.df = df
+    p.tracks = {}
+    p._spotify = None
+    p._features = features
+    evaluator(p).reorder()
+    sort_columns = [i for i in df.columns if i.startswith("sort_")]
+    return df.index.get_indexer(p.df.index), p.df[sort_columns].to_numpy()
+
+
+def _order_detached(
+    id: str,
+    df: pd.DataFrame,
+    evaluator: Type[PlaylistEvaluatorBase],
+    features: Optional[FeatureMatrix] = None,
+) -> Tuple[np.ndarray, float]:
+    """Get the order `evaluator` puts a playlist in, without suggestions.
 
-        self._playlist.df["sort_1"] = path
+    :returns: The rows of `df` in order, and the seconds it took.
+    """
+    start = time.perf_counter()
+    rows, values = _reorder_detached(
+        id, df.assign(sort_1=0, sort_2=0), evaluator, features
+    )
+    # Stable, like sorting the frame by its sort columns.
+    order = rows[np.lexsort(values.T[::-1])]
+    return order, time.perf_counter() - start
 
-    def suggest(self):
-        """Suggest songs to be added into the playlist."""
-        return super().suggest()
+
+def compare_evaluators(
+    p: Playlist,
+    evaluators: Dict[str, Type[PlaylistEvaluatorBase]],
+    executor: Optional[Executor] = None,
+) -> Dict[str, dict]:
+    """Order a playlist with several evaluators, at once if given a pool.
+
+    Nothing is suggested, and the playlist itself is left as is. Every order
+    is scored in the same feature space, whatever the evaluator optimizes in.
+
+    :param p: Playlist to order.
+    :param evaluators: Evaluators to use, by name.
+    :param executor: Process pool to run the evaluators in, rather than one
+                     after another in the calling thread.
+    :returns: For each evaluator, the track IDs in order ("ids"), the total
+              distance between consecutive tracks ("cost"), the full score of
+              the order ("score", see `scoring.score`), and the seconds spent
+              ordering ("seconds").
+    """
+    df = p.df[[]]
+    features = p.features
+    if executor is None:
+        results = {
+            k: _order_detached(p.id, df, e, features) for k, e in evaluators.items()
+        }
+    else:
+        with features.share(_shared_views(evaluators.values())) as shared:
+            futures = {
+                k: executor.submit(_order_detached, p.id, df, e, shared)
+                for k, e in evaluators.items()
+            }
+            results = {k: f.result() for k, f in futures.items()}
+
+    comparison = {}
+    for k, (rows, seconds) in results.items():
+        order = df.index[rows]
+        scored = score(p, order, features=features)
+        comparison[k] = {
+            "ids": p.df["id"].to_numpy()[rows].tolist(),
+            "cost": scored["total"],
+            "score": scored,
+            "seconds": seconds,
+        }
+    return comparison
 
 
 def simmer_playlist(
     p: Playlist,
     evaluator: Type[PlaylistEvaluatorBase],
     to_spotify: Optional[bool] = False,
+    executor: Optional[Executor] = None,
+    previous: Optional[Sequence[str]] = None,
 ) -> List[Track]:
     """Reorder / add songs to playlist for simmering.
 
@@ -890,29 +1352,61 @@ def simmer_playlist(
     :param p: Playlist to be reordered.
     :param evaluator: Engine to use for the evaluation.
     :param to_spotify: Whether to write the modified playlist back to spotify.
+    :param executor: Process pool to run the ordering in, rather than in the
+                     calling thread.
+    :param previous: Track IDs in the order the playlist was last simmered in.
+                     If given, that order is only updated for the songs added
+                     and removed since (see `reorder_from`), and no songs are
+                     suggested. Only for `incremental` evaluators.
     """
+    start = time.perf_counter()
     p.df["sort_1"] = 0
     p.df["sort_2"] = 0
 
     e = evaluator(p)
-    e.reorder()
-    e.suggest()
+    with stage("ordering"):
+        if previous is not None:
+            e.reorder_from(previous)
+        elif executor is None:
+            e.reorder()
+        else:
+            sort_columns = ["sort_1", "sort_2"]
+            with p.features.share(_shared_views([evaluator])) as features:
+                future = executor.submit(
+                    _reorder_detached, p.id, p.df[sort_columns], evaluator, features
+                )
+                rows, values = future.result()
+            p.df = p.df.iloc[rows]
+            p.df[sort_columns] = values
+    if previous is None:
+        with stage("suggestion"):
+            e.suggest()
 
     sort_columns = [i for i in p.df.columns if i.startswith("sort_")]
     p.df = p.df.sort_values(by=sort_columns)
 
     # Propogate local changes back to spotify playlist
     if to_spotify:
-        p.to_spotify()
-
-    cols_to_print = ["track", *sort_columns]
-    print(p.df[cols_to_print])
+        with stage("write_back"):
+            p.to_spotify()
+
+    REGISTRY.observe(
+        "simmer_seconds",
+        "Time to reorder a playlist, excluding ingestion",
+        time.perf_counter() - start,
+        evaluator=evaluator.__name__,
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        cols_to_print = ["id", "artist", *sort_columns]
+        logger.debug("Simmered playlist %s:\n%s", p.id, p.df[cols_to_print])
 
-    return list(p.df["track"])
+    return p.ordered_tracks()
 
 
 if __name__ == "__main__":
     # For the sake of testing without spinning up the entire web application.
+    import contextlib
+
     import spotipy
     from dotenv import load_dotenv
     from spotipy.oauth2 import SpotifyOAuth
@@ -923,6 +1417,11 @@ if __name__ == "__main__":
     logger = logging.getLogger("SimmerTheToads")
     logger.setLevel(LOG_LEVEL)
 
+    pd.set_option("display.max_columns", None)
+    pd.set_option("display.max_rows", None)
+    pd.set_option("display.width", None)
+    np.set_printoptions(suppress=True)
+
     load_dotenv()
 
     CLIENT_ID = os.getenv("CLIENT_ID")
@@ -962,11 +1461,23 @@ if __name__ == "__main__":
         "Bring it on back copy": "5uelnwP0VJbVGgw8SsyTOZ",
     }
 
-    cache_path = Path("./playlist.pickle")
-    p = Playlist(spotify, playlists["Bring it on back copy"])
+    # Set SIMMER_PROFILE=1 to save a pstats dump of this run.
+    profile = contextlib.nullcontext()
+    if os.getenv("SIMMER_PROFILE"):
+        from SimmerTheToads.profiling import profiled
 
-    simmer_playlist(
-        p,
-        ClusteringEvaluator,
-        to_spotify=False,
-    )
+        profile = profiled(f"main-{int(time.time())}")
+
+    cache_path = Path("./playlist")
+    with profile:
+        if cache_path.exists():
+            p = Playlist.load(cache_path, spotify)
+        else:
+            p = Playlist(spotify, playlists["Bring it on back copy"])
+            p.save(cache_path)
+
+        simmer_playlist(
+            p,
+            ClusteringEvaluator,
+            to_spotify=False,
+        )
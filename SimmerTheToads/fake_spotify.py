@@ -0,0 +1,665 @@
+"""Local stand-in for the parts of the Spotify WebAPI used by Simmer The Toads.
+
+The backend serves playlists, tracks, audio features, audio analysis and
+recommendations from either synthetic data or a recording of the real API.
+Latency and 429 responses can be injected to exercise the rate limiter and
+measure throughput without touching Spotify at all.
+
+There are two ways to talk to it:
+
+    # In-process, a drop-in replacement for spotipy.Spotify.
+    backend = FakeSpotifyBackend.synthetic(n_tracks=500)
+    p = Playlist(FakeSpotify(backend), backend.playlist_ids[0])
+
+    # Over HTTP, for the Flask API or any other client.
+    $ python -m SimmerTheToads.fake_spotify --port 8888 --tracks 500
+    $ SPOTIFY_API_PREFIX=http://127.0.0.1:8888/v1/ SPOTIFY_ACCESS_TOKEN=fake \\
+        flask --app SimmerTheToads run
+"""
+import argparse
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+from spotipy.client import Spotify
+from spotipy.exceptions import SpotifyException
+
+from .engine import batched
+
+logger = logging.getLogger("SimmerTheToads")
+
+DEFAULT_PREFIX = "https://api.spotify.com/v1/"
+
+# Most items a single playlist write may add, replace or remove.
+MAX_WRITE_ITEMS = 100
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# Features that can be targeted through the recommendations endpoint.
+TARGET_FEATURES = (
+    "acousticness",
+    "danceability",
+    "energy",
+    "instrumentalness",
+    "liveness",
+    "loudness",
+    "speechiness",
+    "tempo",
+    "valence",
+)
+
+Response = Tuple[int, Dict[str, str], Optional[Union[dict, list]]]
+
+
+def _random_id(rng: np.random.Generator) -> str:
+    return "".join(rng.choice(list(BASE62), 22))
+
+
+def _synthetic_features(rng: np.random.Generator, id: str, genre: dict) -> dict:
+    """Draw audio features roughly following Spotify's published histograms."""
+
+    def unit(x):
+        return float(np.clip(x, 0, 1))
+
+    return {
+        "acousticness": unit(rng.beta(0.5, 1.5) + genre["acousticness"]),
+        "danceability": unit(rng.normal(genre["danceability"], 0.12)),
+        "duration_ms": int(np.clip(rng.normal(215_000, 45_000), 60_000, 600_000)),
+        "energy": unit(rng.normal(genre["energy"], 0.15)),
+        "instrumentalness": unit(rng.beta(0.2, 2.0) * genre["instrumentalness"]),
+        "key": int(rng.integers(0, 12)),
+        "liveness": unit(rng.beta(1.5, 8.0)),
+        "loudness": float(np.clip(rng.normal(genre["loudness"], 2.5), -40, 0)),
+        "mode": int(rng.random() < 0.65),
+        "speechiness": unit(rng.beta(1.0, 12.0) + genre["speechiness"]),
+        "tempo": float(np.clip(rng.normal(genre["tempo"], 15), 50, 220)),
+        "time_signature": int(rng.choice([3, 4, 4, 4, 4, 4, 5])),
+        "valence": unit(rng.normal(genre["valence"], 0.18)),
+        "id": id,
+        "uri": f"spotify:track:{id}",
+        "track_href": f"{DEFAULT_PREFIX}tracks/{id}",
+        "analysis_url": f"{DEFAULT_PREFIX}audio-analysis/{id}",
+        "type": "audio_features",
+    }
+
+
+def _synthetic_genre(rng: np.random.Generator) -> dict:
+    return {
+        "acousticness": rng.uniform(-0.3, 0.5),
+        "danceability": rng.uniform(0.3, 0.8),
+        "energy": rng.uniform(0.2, 0.9),
+        "instrumentalness": rng.uniform(0, 1),
+        "loudness": rng.uniform(-14, -4),
+        "speechiness": rng.uniform(0, 0.2),
+        "tempo": rng.uniform(80, 160),
+        "valence": rng.uniform(0.2, 0.8),
+    }
+
+
+def synthetic_analysis(features: dict, detail: float = 1.0) -> dict:
+    """Generate a deterministic audio analysis consistent with the features.
+
+    :param features: Audio features of the track.
+    :param detail: Scale the number of bars, beats, etc. Lower values keep
+                   very large synthetic playlists cheap to analyse.
+    """
+    rng = np.random.default_rng(zlib.crc32(features["id"].encode()))
+    duration = features["duration_ms"] / 1000
+    tempo = features["tempo"]
+    beat = 60 / tempo
+
+    def intervals(length, confidence_mean=0.75, confidence_std=0.2, scale=detail):
+        n = max(int(duration / length * scale), 1)
+        step = duration / n
+        starts = np.arange(n) * step
+        confidence = np.clip(rng.normal(confidence_mean, confidence_std, n), 0, 1)
+        return [
+            {"start": float(s), "duration": step, "confidence": float(c)}
+            for s, c in zip(starts, confidence)
+        ]
+
+    sections = []
+    # Sections are few and confident, whatever the level of detail.
+    for i in intervals(duration / rng.integers(6, 12), 0.95, 0.03, scale=1):
+        sections.append(
+            {
+                **i,
+                "loudness": features["loudness"] + float(rng.normal(0, 2)),
+                "tempo": tempo + float(rng.normal(0, 1)),
+                "tempo_confidence": float(rng.random()),
+                "key": features["key"],
+                "key_confidence": float(rng.random()),
+                "mode": features["mode"],
+                "mode_confidence": float(rng.random()),
+                "time_signature": features["time_signature"],
+                "time_signature_confidence": float(rng.random()),
+            }
+        )
+
+    segments = []
+    for i in intervals(0.5):
+        segments.append(
+            {
+                **i,
+                "loudness_start": features["loudness"] - 10,
+                "loudness_max": features["loudness"],
+                "loudness_max_time": 0.05,
+                "loudness_end": 0,
+                "pitches": rng.random(12).round(3).tolist(),
+                "timbre": rng.normal(0, 50, 12).round(3).tolist(),
+            }
+        )
+
+    return {
+        "meta": {"analyzer_version": "4.0.0", "status_code": 0},
+        "track": {
+            "duration": duration,
+            "loudness": features["loudness"],
+            "tempo": tempo,
+            "tempo_confidence": 0.8,
+            "time_signature": features["time_signature"],
+            "time_signature_confidence": 0.9,
+            "key": features["key"],
+            "key_confidence": 0.5,
+            "mode": features["mode"],
+            "mode_confidence": 0.5,
+        },
+        "bars": intervals(beat * features["time_signature"]),
+        "beats": intervals(beat),
+        "sections": sections,
+        "segments": segments,
+        "tatums": intervals(beat / 2),
+    }
+
+
+class FakeSpotifyBackend:
+    """Serve WebAPI responses from an in-memory catalog.
+
+    :param tracks: Track objects, by ID.
+    :param features: Audio features, by track ID.
+    :param playlists: Playlist objects by ID, with the track IDs of the
+                      playlist stored under "track_ids".
+    :param analyses: Recorded audio analysis, by track ID. Missing analysis is
+                     generated on demand.
+    :param user: The user object returned by /me.
+    :param latency: Seconds to wait before answering any call.
+    :param jitter: Random extra latency, as a fraction of `latency`.
+    :param throttle: Probability of answering any call with 429.
+    :param retry_after: `Retry-After` of injected 429 responses, in seconds.
+    :param analysis_detail: Passed to synthetic_analysis.
+    :param seed: Seed for the latency and 429 injection.
+    """
+
+    def __init__(
+        self,
+        tracks: Dict[str, dict],
+        features: Dict[str, dict],
+        playlists: Dict[str, dict],
+        analyses: Optional[Dict[str, dict]] = None,
+        user: Optional[dict] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        throttle: float = 0.0,
+        retry_after: int = 1,
+        analysis_detail: float = 1.0,
+        seed: int = 0,
+    ):
+        self.tracks = tracks
+        self.features = features
+        self.playlists = playlists
+        self.analyses = {} if analyses is None else analyses
+        self.user = user or {"id": "toad", "display_name": "Toad", "type": "user"}
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.analysis_detail = analysis_detail
+
+        self.calls: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def synthetic(
+        cls,
+        n_tracks: int = 100,
+        n_playlists: int = 1,
+        n_catalog: int = 200,
+        n_artists: Optional[int] = None,
+        n_genres: int = 8,
+        seed: int = 0,
+        **kwargs,
+    ) -> "FakeSpotifyBackend":
+        """Generate a catalog of random tracks grouped into genres.
+
+        :param n_tracks: Number of tracks in each playlist.
+        :param n_playlists: Number of playlists owned by the user.
+        :param n_catalog: Extra tracks only reachable via recommendations.
+        :param n_artists: Number of distinct artists, defaults to n_tracks / 5.
+        :param n_genres: Number of clusters the features are drawn around.
+        :param seed: Seed for the catalog, the same seed gives the same IDs.
+        :param kwargs: Passed to FakeSpotifyBackend.
+        """
+        rng = np.random.default_rng(seed)
+        genres = [_synthetic_genre(rng) for _ in range(n_genres)]
+        if n_artists is None:
+            n_artists = max(n_tracks // 5, 1)
+        artists = [
+            {
+                "id": _random_id(rng),
+                "name": f"Artist {i}",
+                "type": "artist",
+                "genre": int(rng.integers(0, n_genres)),
+            }
+            for i in range(n_artists)
+        ]
+
+        tracks = {}
+        features = {}
+        for i in range(n_tracks * n_playlists + n_catalog):
+            id = _random_id(rng)
+            artist = artists[int(rng.integers(0, n_artists))]
+            features[id] = _synthetic_features(rng, id, genres[artist["genre"]])
+            tracks[id] = {
+                "id": id,
+                "name": f"Track {i}",
+                "type": "track",
+                "uri": f"spotify:track:{id}",
+                "artists": [
+                    {k: v for k, v in artist.items() if k != "genre"},
+                ],
+                "album": {
+                    "id": _random_id(rng),
+                    "name": f"Album {i}",
+                    "images": [],
+                    "available_markets": ["US"],
+                },
+                "available_markets": ["US"],
+                "duration_ms": features[id]["duration_ms"],
+                "explicit": False,
+                "popularity": int(rng.integers(0, 100)),
+                "preview_url": None,
+                "external_urls": {"spotify": f"https://open.spotify.com/track/{id}"},
+            }
+
+        track_ids = list(tracks)
+        playlists = {}
+        for i, chunk in enumerate(
+            batched(track_ids[: n_tracks * n_playlists], n_tracks)
+        ):
+            id = _random_id(rng)
+            playlists[id] = {
+                "id": id,
+                "name": f"Synthetic playlist {i}",
+                "description": "",
+                "collaborative": False,
+                "public": True,
+                "images": [],
+                "type": "playlist",
+                "uri": f"spotify:playlist:{id}",
+                "track_ids": list(chunk),
+            }
+
+        return cls(tracks, features, playlists, **kwargs)
+
+    @classmethod
+    def record(
+        cls,
+        spotify: Spotify,
+        playlist_ids: List[str],
+        with_analysis: bool = True,
+        **kwargs,
+    ) -> "FakeSpotifyBackend":
+        """Capture playlists (and everything needed to simmer them).
+
+        :param spotify: Authenticated client for the real WebAPI.
+        :param playlist_ids: Playlists to record.
+        :param with_analysis: Whether to record the audio analysis, instead of
+                              synthesizing it when replaying.
+        :param kwargs: Passed to FakeSpotifyBackend.
+        """
+        tracks = {}
+        playlists = {}
+        for id in playlist_ids:
+            metadata = spotify.playlist(id)
+            metadata.pop("tracks", None)
+            result = spotify.user_playlist_tracks(playlist_id=id)
+            items = result["items"]
+            while result["next"]:
+                result = spotify.next(result)
+                items.extend(result["items"])
+
+            metadata["track_ids"] = []
+            for i in items:
+                if i["track"] is None or i["track"]["id"] is None:
+                    continue
+                tracks[i["track"]["id"]] = i["track"]
+                metadata["track_ids"].append(i["track"]["id"])
+            playlists[id] = metadata
+
+        features = {}
+        for chunk in batched(tracks, 100):
+            for f in spotify.audio_features(list(chunk)):
+                if f is not None:
+                    features[f["id"]] = f
+
+        analyses = {}
+        if with_analysis:
+            for id in tracks:
+                analyses[id] = spotify.audio_analysis(id)
+
+        return cls(tracks, features, playlists, analyses, spotify.me(), **kwargs)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], **kwargs) -> "FakeSpotifyBackend":
+        """Load a recording saved with FakeSpotifyBackend.save."""
+        with gzip.open(path, "rt") as f:
+            data = json.load(f)
+        return cls(**data, **kwargs)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Save the catalog as gzipped JSON."""
+        data = {
+            "tracks": self.tracks,
+            "features": self.features,
+            "playlists": self.playlists,
+            "analyses": self.analyses,
+            "user": self.user,
+        }
+        with gzip.open(path, "wt") as f:
+            json.dump(data, f)
+
+    @property
+    def playlist_ids(self) -> List[str]:
+        """Get the IDs of every playlist in the catalog."""
+        return list(self.playlists)
+
+    def _playlist_object(self, id: str, prefix: str) -> dict:
+        playlist = self.playlists[id]
+        result = {k: v for k, v in playlist.items() if k != "track_ids"}
+        result["owner"] = self.user
+        result["snapshot_id"] = f"{id}-{playlist.get('version', 0)}"
+        result["tracks"] = self._tracks_page(id, prefix, 0, 100)
+        return result
+
+    def _tracks_page(self, id: str, prefix: str, offset: int, limit: int) -> dict:
+        track_ids = self.playlists[id]["track_ids"]
+        href = f"{prefix}playlists/{id}/tracks"
+        end = offset + limit
+        return {
+            "href": f"{href}?offset={offset}&limit={limit}",
+            "items": [
+                {"added_at": None, "is_local": False, "track": self.tracks[i]}
+                for i in track_ids[offset:end]
+            ],
+            "limit": limit,
+            "next": f"{href}?offset={end}&limit={limit}"
+            if end < len(track_ids)
+            else None,
+            "offset": offset,
+            "previous": None,
+            "total": len(track_ids),
+        }
+
+    def _analysis(self, id: str) -> dict:
+        analysis = self.analyses.get(id)
+        if analysis is None:
+            analysis = synthetic_analysis(self.features[id], self.analysis_detail)
+        return analysis
+
+    def _recommendations(self, params: dict) -> dict:
+        seeds = set(params.get("seed_tracks", "").split(","))
+        limit = int(params.get("limit", 20))
+        targets = {
+            k: float(params[f"target_{k}"])
+            for k in TARGET_FEATURES
+            if f"target_{k}" in params
+        }
+
+        def distance(id):
+            f = self.features[id]
+            return sum((f[k] - v) ** 2 for k, v in targets.items())
+
+        candidates = [i for i in self.features if i not in seeds]
+        best = sorted(candidates, key=distance)[:limit]
+        return {"seeds": [], "tracks": [self.tracks[i] for i in best]}
+
+    def _write(self, method: str, id: str, params: dict, payload) -> dict:
+        playlist = self.playlists[id]
+        track_ids = playlist["track_ids"]
+        if not isinstance(payload, dict):
+            payload = {"uris": payload}
+
+        snapshot_id = f"{id}-{playlist.get('version', 0)}"
+        if payload.get("snapshot_id", snapshot_id) != snapshot_id:
+            # Stricter than Spotify, which merges changes made to an older
+            # snapshot, so that writes which are not chained are caught.
+            raise ValueError(f"Stale snapshot {payload['snapshot_id']}")
+        items = payload.get("uris", payload.get("tracks", []))
+        if len(items) > MAX_WRITE_ITEMS:
+            raise ValueError(f"Too many items, at most {MAX_WRITE_ITEMS} are allowed")
+
+        if method == "POST":
+            position = int(params.get("position", len(track_ids)))
+            position = payload.get("position", position)
+            ids = [i.rsplit(":", 1)[-1] for i in payload["uris"]]
+            track_ids[position:position] = ids
+        elif method == "PUT" and "uris" in payload:
+            track_ids[:] = [i.rsplit(":", 1)[-1] for i in payload["uris"]]
+        elif method == "PUT":
+            start = payload["range_start"]
+            length = payload.get("range_length", 1)
+            before = payload["insert_before"]
+            moved = track_ids[start : start + length]
+            if before > start:
+                before -= length
+            del track_ids[start : start + length]
+            track_ids[before:before] = moved
+        elif method == "DELETE":
+            remove = set()
+            for t in payload["tracks"]:
+                id_ = t["uri"].rsplit(":", 1)[-1]
+                positions = t.get("positions")
+                if positions is None:
+                    positions = [i for i, v in enumerate(track_ids) if v == id_]
+                remove.update(positions)
+            track_ids[:] = [v for i, v in enumerate(track_ids) if i not in remove]
+
+        playlist["version"] = playlist.get("version", 0) + 1
+        return {"snapshot_id": f"{id}-{playlist['version']}"}
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        params: dict,
+        payload=None,
+        prefix: str = DEFAULT_PREFIX,
+    ) -> Response:
+        """Answer a single WebAPI call.
+
+        :param method: HTTP method.
+        :param path: Path relative to the API root, e.g. "audio-analysis/ID".
+        :param params: Query parameters.
+        :param payload: Decoded JSON body, if any.
+        :param prefix: API root to use within paging links.
+        :returns: Status code, headers, and the JSON body.
+        """
+        with self._lock:
+            throttled = self._rng.random() < self.throttle
+            delay = self.latency * (1 + self.jitter * self._rng.random())
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            headers = {"Retry-After": str(self.retry_after)}
+            return (
+                429,
+                headers,
+                {"error": {"status": 429, "message": "API rate limit exceeded"}},
+            )
+
+        parts = [i for i in path.split("/") if i]
+        key = "/".join(i for i in parts[:1] + parts[2:3])
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+        ids = [i for i in params.get("ids", "").split(",") if i]
+        try:
+            if parts == ["me"]:
+                return 200, {}, self.user
+            if parts == ["me", "playlists"]:
+                items = [self._playlist_object(i, prefix) for i in self.playlists]
+                return 200, {}, {"items": items, "next": None, "total": len(items)}
+            if parts == ["audio-features"]:
+                return 200, {}, {"audio_features": [self.features.get(i) for i in ids]}
+            if len(parts) == 2 and parts[0] == "audio-analysis":
+                return 200, {}, self._analysis(parts[1])
+            if parts == ["tracks"]:
+                return 200, {}, {"tracks": [self.tracks.get(i) for i in ids]}
+            if parts == ["recommendations"]:
+                return 200, {}, self._recommendations(params)
+            if len(parts) == 2 and parts[0] == "playlists":
+                return 200, {}, self._playlist_object(parts[1], prefix)
+            if len(parts) == 3 and parts[0] == "playlists" and parts[2] == "tracks":
+                if method == "GET":
+                    offset = int(params.get("offset", 0))
+                    limit = int(params.get("limit", 100))
+                    page = self._tracks_page(parts[1], prefix, offset, limit)
+                    return 200, {}, page
+                return 200, {}, self._write(method, parts[1], params, payload)
+        except KeyError as e:
+            return 404, {}, {"error": {"status": 404, "message": f"Not found: {e}"}}
+        except ValueError as e:
+            return 400, {}, {"error": {"status": 400, "message": str(e)}}
+
+        return 404, {}, {"error": {"status": 404, "message": f"Unknown path {path}"}}
+
+
+def _split_url(url: str, prefix: str) -> (str, dict):
+    if url.startswith(prefix):
+        url = url[len(prefix) :]
+    parts = urlsplit(url)
+    path = parts.path
+    if parts.scheme:
+        # Absolute URL from a paging object, strip the API root.
+        path = path.split("/v1/", 1)[-1]
+    return path, dict(parse_qsl(parts.query))
+
+
+class FakeSpotify(Spotify):
+    """spotipy.Spotify answering every call from a FakeSpotifyBackend."""
+
+    def __init__(self, backend: FakeSpotifyBackend, **kwargs):
+        super().__init__(auth="fake", requests_session=False, **kwargs)
+        self.backend = backend
+
+    def _internal_call(self, method, url, payload, params):
+        path, query = _split_url(url, self.prefix)
+        query.update({k: str(v) for k, v in params.items() if v is not None})
+        status, headers, body = self.backend.handle(
+            method, path, query, payload, prefix=self.prefix
+        )
+        if status >= 400:
+            raise SpotifyException(status, -1, f"{path}:\n {body}", headers=headers)
+        return body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    backend: FakeSpotifyBackend
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length)) if length else None
+
+        host, port = self.server.server_address[:2]
+        prefix = f"http://{host}:{port}/v1/"
+        path, query = _split_url(self.path, "/v1/")
+        status, headers, body = self.backend.handle(
+            self.command, path.lstrip("/"), query, payload, prefix=prefix
+        )
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        logger.debug("fake spotify: " + format, *args)
+
+
+def serve(
+    backend: FakeSpotifyBackend,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> ThreadingHTTPServer:
+    """Serve a backend over HTTP from a background thread.
+
+    :param port: Port to listen on, 0 picks a free one.
+    :returns: The running server. The API root is
+              f"http://{host}:{server.server_port}/v1/".
+    """
+    handler = type("Handler", (_Handler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    """Run the stand-in from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--recording", type=Path, help="Replay a saved recording")
+    parser.add_argument("--tracks", type=int, default=100, help="Tracks per playlist")
+    parser.add_argument("--playlists", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--throttle", type=float, default=0.0, help="429 probability")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    options = dict(
+        latency=args.latency,
+        jitter=args.jitter,
+        throttle=args.throttle,
+        retry_after=args.retry_after,
+    )
+    if args.recording:
+        backend = FakeSpotifyBackend.load(args.recording, **options)
+    else:
+        backend = FakeSpotifyBackend.synthetic(
+            n_tracks=args.tracks,
+            n_playlists=args.playlists,
+            seed=args.seed,
+            **options,
+        )
+
+    server = serve(backend, args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_port}/v1/")
+    for id, playlist in backend.playlists.items():
+        print(f"  {id}: {playlist['name']} ({len(playlist['track_ids'])} tracks)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
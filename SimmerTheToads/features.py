@@ -0,0 +1,233 @@
+"""Numeric features of a playlist, shared by every evaluator and stage.
+
+A FeatureMatrix is computed once per playlist from its frame. The raw values
+and every scaling of them the evaluators use are computed on first use, then
+kept, as C-contiguous read-only float64 arrays with one row per track. Nothing
+is written back to the frame.
+
+A matrix is sent to the processes of a pool as a SharedFeatures, which maps
+its arrays in every worker rather than copying them.
+"""
+import os
+import shutil
+import tempfile
+from functools import cached_property
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ARTIST_COLUMN = "artist_ord"
+
+# Directory the arrays of a SharedFeatures are written to, the system's
+# temporary directory by default. Point it at a tmpfs (e.g. /dev/shm) with
+# room for the distances of the largest playlist, to keep them off disk.
+SHARED_DIR = os.getenv("SIMMER_SHARED_DIR") or None
+
+
+class FeatureMatrix:
+    """Immutable, lazily scaled feature matrix of a playlist.
+
+    Columns are every numeric column of the frame, except the sort columns of
+    the evaluators, followed by the ordinal encoding of the artist.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        numeric = df.select_dtypes(include=[np.number])
+        numeric = numeric.drop(
+            columns=[
+                i
+                for i in numeric.columns
+                if i.startswith("sort_") or i == ARTIST_COLUMN
+            ]
+        )
+
+        self._columns = tuple(numeric.columns) + (ARTIST_COLUMN,)
+        self._index = df.index.copy()
+
+        raw = np.empty((len(df), len(self._columns)))
+        raw[:, :-1] = numeric.to_numpy(dtype=float)
+        raw[:, -1] = self._encode_artists(df["artist"])
+        self._raw = _frozen(raw)
+        self._distances: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_raw(
+        cls, raw: np.ndarray, columns: Sequence[str], index: pd.Index
+    ) -> "FeatureMatrix":
+        """Rebuild a FeatureMatrix from its raw values, e.g. memory mapped.
+
+        :param raw: Unscaled features, see `raw`. Used in place if it is
+                    already a contiguous float64 array.
+        :param columns: Names of the columns.
+        :param index: Frame index of each row.
+        """
+        matrix = cls.__new__(cls)
+        matrix._columns = tuple(columns)
+        matrix._index = index
+        matrix._raw = _frozen(raw)
+        matrix._distances = None
+        return matrix
+
+    @staticmethod
+    def _encode_artists(artists: pd.Series) -> np.ndarray:
+        from sklearn.preprocessing import LabelEncoder
+
+        # Unknown artists (None, or 0 once filled in) are encoded as a name.
+        return LabelEncoder().fit_transform(artists.astype(str))
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """Get the names of the columns."""
+        return self._columns
+
+    @property
+    def index(self) -> pd.Index:
+        """Get the frame index of each row."""
+        return self._index
+
+    def positions(self, labels: Sequence) -> np.ndarray:
+        """Get the rows of the given frame index labels."""
+        positions = self._index.get_indexer(labels)
+        if (positions < 0).any():
+            raise KeyError("Labels missing from the feature matrix")
+        return positions
+
+    def covers(self, index: pd.Index) -> bool:
+        """Check whether every label of `index` has a row."""
+        return index.difference(self._index).empty
+
+    @property
+    def raw(self) -> np.ndarray:
+        """Get the unscaled features."""
+        return self._raw
+
+    @cached_property
+    def minmax(self) -> np.ndarray:
+        """Get every feature scaled to [0, 1]."""
+        from sklearn.preprocessing import MinMaxScaler
+
+        return _frozen(MinMaxScaler().fit_transform(self._raw))
+
+    @cached_property
+    def robust(self) -> np.ndarray:
+        """Get the features robustly scaled, then scaled to [0, 1].
+
+        The artist is left as is, it is categorical.
+        """
+        from sklearn.preprocessing import MinMaxScaler, RobustScaler
+
+        scaled = self._raw.copy()
+        scaled[:, :-1] = RobustScaler().fit_transform(scaled[:, :-1])
+        scaled[:, :-1] = MinMaxScaler().fit_transform(scaled[:, :-1])
+        return _frozen(scaled)
+
+    @cached_property
+    def pca(self) -> np.ndarray:
+        """Get up to 10 principal components of the robustly scaled features."""
+        from sklearn.decomposition import PCA
+
+        try:
+            components = PCA(n_components=10).fit_transform(self.robust)
+        except ValueError:
+            # Very few tracks or features.
+            pca = PCA(n_components=min(*self.robust.shape))
+            components = pca.fit_transform(self.robust)
+        return _frozen(components)
+
+    @property
+    def distances(self) -> np.ndarray:
+        """Get the Euclidean distance between every two rows of `minmax`.
+
+        Unlike the other views they are not kept, as they take memory
+        quadratic in the number of rows, unless they were shared with this
+        matrix (see `SharedFeatures`).
+        """
+        if self._distances is not None:
+            return self._distances
+        import scipy.spatial
+
+        return _frozen(scipy.spatial.distance_matrix(self.minmax, self.minmax))
+
+    def share(self, views: Sequence[str] = ()) -> "SharedFeatures":
+        """Share this matrix with the processes of a pool, see `SharedFeatures`.
+
+        :param views: Views to share along with `raw`, e.g. "minmax".
+        """
+        return SharedFeatures(self, views)
+
+    def __len__(self) -> int:
+        """Get the number of rows."""
+        return len(self._raw)
+
+
+class SharedFeatures:
+    """A FeatureMatrix for the processes of a pool, mapped rather than copied.
+
+    Arguments of a task on a process pool are pickled and sent to the worker,
+    which for the features of a large playlist, let alone its distances, can
+    take longer than ordering it. The arrays of the matrix are written once
+    to files in `SHARED_DIR` instead. Pickling a SharedFeatures only sends
+    where they are, and it is unpickled as a FeatureMatrix with every array
+    memory mapped, read-only, from the page cache shared by all processes.
+
+    The files are removed by `close`, or at the end of a `with` block, once
+    the tasks using them are done.
+
+    :param matrix: Matrix to share.
+    :param views: Views to share along with `raw`, computed if they were not
+                  yet. The worker computes any other view it uses itself.
+    """
+
+    def __init__(self, matrix: FeatureMatrix, views: Sequence[str] = ()):
+        self._columns = matrix.columns
+        self._index = matrix.index
+        self._views = tuple(dict.fromkeys(("raw", *views)))
+        self._directory = tempfile.mkdtemp(prefix="simmer-features-", dir=SHARED_DIR)
+        try:
+            for view in self._views:
+                np.save(self._path(self._directory, view), getattr(matrix, view))
+        except BaseException:
+            self.close()
+            raise
+
+    @staticmethod
+    def _path(directory: str, view: str) -> Path:
+        return Path(directory) / f"{view}.npy"
+
+    @classmethod
+    def _attach(
+        cls,
+        directory: str,
+        columns: Tuple[str, ...],
+        index: pd.Index,
+        views: Tuple[str, ...],
+    ) -> FeatureMatrix:
+        arrays = {i: np.load(cls._path(directory, i), mmap_mode="r") for i in views}
+        matrix = FeatureMatrix.from_raw(arrays.pop("raw"), columns, index)
+        distances = arrays.pop("distances", None)
+        if distances is not None:
+            matrix._distances = _frozen(distances)
+        # Set as the values of the cached views, so they are not computed.
+        matrix.__dict__.update({k: _frozen(v) for k, v in arrays.items()})
+        return matrix
+
+    def __reduce__(self):
+        return self._attach, (self._directory, self._columns, self._index, self._views)
+
+    def close(self) -> None:
+        """Remove the files, see the class documentation."""
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self) -> "SharedFeatures":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array = np.ascontiguousarray(array, dtype=float)
+    array.flags.writeable = False
+    return array
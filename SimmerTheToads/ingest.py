@@ -0,0 +1,264 @@
+"""Concurrent ingestion of playlists under a single asyncio event loop.
+
+spotipy is synchronous, so every call is run in a thread of a private pool,
+with a semaphore bounding how many are in flight at once. Calls are issued as
+soon as what they depend on is known:
+
+- The playlist metadata and the first page of tracks are requested together.
+- The first page gives the total, so all remaining pages are requested at once.
+- As each page arrives, its feature batch and the audio analysis of each of
+  its tracks are requested, while later pages are still in flight.
+- Tracks are handed over in playlist order as soon as they are complete, so
+  they can be processed while the rest are still being fetched.
+
+The time to ingest a playlist then approaches that of the slowest chain of
+calls (page, then analysis) rather than the sum of every call. Calls still go
+through the client, so the host wide rate limiter applies to each of them.
+
+Several playlists can also be ingested together (`ingest_playlists`): their
+items are fetched first, so that a track in more than one of them is only
+fetched once.
+
+Each call runs in a copy of the caller's context, so request scoped state
+(e.g. the Flask session holding the user's token) is available to it. Each is
+also timed, with the calls it makes, under the stage it is tagged with
+(playlist_fetch, feature_fetch or analysis), see `metrics.in_stage`.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from spotipy.client import Spotify
+
+from .engine import Track, batched
+from .metrics import in_stage
+
+# Most Spotify calls allowed in flight per playlist.
+CONCURRENCY = int(os.getenv("SIMMER_INGEST_CONCURRENCY", "16"))
+
+
+class Ingestion:
+    """Concurrent Spotify calls, bounded by a semaphore, on behalf of a client.
+
+    Must be created and used from within a running event loop.
+    """
+
+    def __init__(self, spotify: Spotify, concurrency: int = CONCURRENCY):
+        self._spotify = spotify
+        self._loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="ingest")
+
+    async def call(self, stage: str, func: Callable, *args, **kwargs):
+        """Run a blocking call in the pool, in a copy of the current context.
+
+        :param stage: Stage to time the call and count its requests under.
+        """
+        async with self._semaphore:
+            context = contextvars.copy_context()
+            return await self._loop.run_in_executor(
+                self._executor,
+                functools.partial(context.run, in_stage, stage, func, *args, **kwargs),
+            )
+
+    async def _items(self, items: List[dict], return_exceptions=False) -> list:
+        """Request the features and analyses of the tracks of playlist items.
+
+        :param return_exceptions: Give the features of the items of a batch
+                                  that failed as the exception it raised.
+        :returns: Each item, with its features and the task of its analysis.
+        """
+        ids = [i["track"]["id"] for i in items]
+        if not ids:
+            return []
+
+        analyses = [
+            asyncio.ensure_future(
+                self.call("analysis", self._spotify.audio_analysis, i)
+            )
+            for i in ids
+        ]
+        batches = await asyncio.gather(
+            *(
+                self.call("feature_fetch", self._spotify.audio_features, list(i))
+                for i in batched(ids, 100)
+            ),
+            return_exceptions=return_exceptions,
+        )
+        features = []
+        for batch, chunk in zip(batches, batched(ids, 100)):
+            failed = isinstance(batch, Exception)
+            features.extend([batch] * len(chunk) if failed else batch)
+        return list(zip(items, features, analyses))
+
+    async def _page(self, page_request: Awaitable[dict]) -> list:
+        """Request the features and analyses of a page of playlist items."""
+        return await self._items((await page_request)["items"])
+
+    def _first_page(self, id: str) -> asyncio.Future:
+        """Request the first page of a playlist, which gives its total."""
+        return asyncio.ensure_future(
+            self.call(
+                "playlist_fetch", self._spotify.user_playlist_tracks, playlist_id=id
+            )
+        )
+
+    def _later_pages(self, id: str, first: dict) -> List[Awaitable[dict]]:
+        """Request every page of a playlist after the first, all at once."""
+        if not first["next"]:
+            return []
+        limit = first["limit"]
+        return [
+            asyncio.ensure_future(
+                self.call(
+                    "playlist_fetch",
+                    self._spotify.user_playlist_tracks,
+                    playlist_id=id,
+                    offset=offset,
+                    limit=limit,
+                )
+            )
+            for offset in range(first["offset"] + limit, first["total"], limit)
+        ]
+
+    async def items(self, id: str) -> List[dict]:
+        """Fetch every item of a playlist, without its features or analyses."""
+        first = await self._first_page(id)
+        pages = await asyncio.gather(*self._later_pages(id, first))
+        return [i for page in (first, *pages) for i in page["items"]]
+
+    async def analysed(self, items: List[dict], return_exceptions=False) -> list:
+        """Fetch the tracks of playlist items, with features and analyses.
+
+        :param return_exceptions: Give a track that could not be fetched as
+                                  the exception raised, rather than raise it.
+        """
+        tracks = []
+        for item, features, analysis in await self._items(items, return_exceptions):
+            try:
+                analysis = await analysis
+                if isinstance(features, Exception):
+                    raise features
+                tracks.append(self._track(item, features, analysis))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                tracks.append(e)
+        return tracks
+
+    def _track(self, item: dict, features: dict, analysis: dict) -> Track:
+        """Build the track of a playlist item from what was fetched for it."""
+        track = Track(self._spotify, item["track"], features, get_analysis=False)
+        track._set_analysis(analysis)
+        return track
+
+    async def tracks(self, id: str) -> AsyncIterator[Track]:
+        """Yield the tracks of a playlist in order, as soon as each is fetched."""
+        first = self._first_page(id)
+        pages = [asyncio.ensure_future(self._page(first))]
+        pages.extend(
+            asyncio.ensure_future(self._page(page))
+            for page in self._later_pages(id, await first)
+        )
+
+        for page in pages:
+            for item, features, analysis in await page:
+                yield self._track(item, features, await analysis)
+
+    def close(self) -> None:
+        """Drop any calls still queued, e.g. after a failure."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def ingest_playlist(
+    spotify: Spotify,
+    id: str,
+    concurrency: int = CONCURRENCY,
+    on_track: Optional[Callable[[Track], None]] = None,
+) -> Tuple[dict, List[Track]]:
+    """Fetch a playlist and all of its tracks, features and analyses.
+
+    :param spotify: Client to make the calls with.
+    :param id: Spotify ID of the playlist.
+    :param concurrency: Most calls to have in flight at once.
+    :param on_track: Called with each track, in playlist order, as soon as it
+                     is fetched. The tracks are then not collected.
+    :returns: The playlist metadata, and its tracks in playlist order.
+    """
+    ingestion = Ingestion(spotify, concurrency)
+    try:
+        metadata = asyncio.ensure_future(
+            ingestion.call("playlist_fetch", spotify.playlist, id)
+        )
+        tracks = []
+        async for track in ingestion.tracks(id):
+            (on_track or tracks.append)(track)
+        return await metadata, tracks
+    finally:
+        ingestion.close()
+
+
+async def ingest_playlists(
+    spotify: Spotify,
+    ids: Sequence[str],
+    concurrency: int = CONCURRENCY,
+    known: Optional[Mapping[str, Track]] = None,
+    return_exceptions: bool = False,
+) -> Tuple[list, Dict[str, Track]]:
+    """Fetch several playlists, and every track of theirs only once.
+
+    The items of every playlist are fetched first, then the features and
+    analysis of each distinct track, all under the same bound on calls.
+
+    :param spotify: Client to make the calls with.
+    :param ids: Spotify IDs of the playlists.
+    :param concurrency: Most calls to have in flight at once.
+    :param known: Tracks fetched before, by ID, which are not fetched again.
+    :param return_exceptions: Give a playlist or track that could not be
+                              fetched as the exception raised, rather than
+                              raise it, so that the others are still fetched.
+    :returns: The metadata and items of every playlist, in the order of
+              `ids`, and every track in any of them by its ID.
+    """
+    known = known or {}
+    ingestion = Ingestion(spotify, concurrency)
+    try:
+        playlists = await asyncio.gather(
+            *(
+                asyncio.gather(
+                    ingestion.call("playlist_fetch", spotify.playlist, i),
+                    ingestion.items(i),
+                )
+                for i in ids
+            ),
+            return_exceptions=return_exceptions,
+        )
+        tracks: Dict[str, Track] = {}
+        unique: Dict[str, dict] = {}
+        for playlist in playlists:
+            if isinstance(playlist, Exception):
+                continue
+            for item in playlist[1]:
+                id = item["track"]["id"]
+                if id in known:
+                    tracks[id] = known[id]
+                else:
+                    unique.setdefault(id, item)
+        analysed = await ingestion.analysed(list(unique.values()), return_exceptions)
+        tracks.update(zip(unique, analysed))
+        return [p if isinstance(p, Exception) else tuple(p) for p in playlists], tracks
+    finally:
+        ingestion.close()
@@ -0,0 +1,260 @@
+"""Lightweight timing instrumentation and Prometheus metrics.
+
+Wrap any step of the pipeline in `stage`:
+
+    with stage("ordering"):
+        e.reorder()
+
+When a Timings object is active (one is activated per API request) the wall
+time of the stage, along with the number and size of Spotify calls made
+during it, are recorded. Stages may be nested, the time of a stage excludes
+the time spent in its children. Outside of an active Timings, `stage` does
+nothing but a context variable lookup.
+
+Stages are nested per thread. Work handed to other threads names its own
+stage with `in_stage`, and is timed there, alongside whatever the thread
+waiting on it is doing; the calls it makes are counted against that stage.
+
+Each worker keeps its own counters and histograms, and publishes them into
+the shared SqliteStore at most every few seconds, so that any worker can
+render the metrics of the whole host.
+"""
+import contextvars
+import os
+import pickle
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+_timings: contextvars.ContextVar = contextvars.ContextVar("timings", default=None)
+
+# Upper bounds of the latency histograms, in seconds.
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Least seconds between two snapshots of a worker in the shared store.
+PUBLISH_INTERVAL = float(os.getenv("SIMMER_METRICS_PUBLISH_INTERVAL", "5"))
+
+
+class Timings:
+    """Wall time, Spotify calls, and response bytes per stage of a request."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> list:
+        """Get the stages running on the current thread, innermost last."""
+        return self._local.__dict__.setdefault("stack", [])
+
+    def _add(self, name: str, seconds: float = 0.0, nbytes: Optional[int] = None):
+        with self._lock:
+            entry = self.stages.setdefault(
+                name, {"seconds": 0.0, "calls": 0, "bytes": 0}
+            )
+            entry["seconds"] += seconds
+            if nbytes is not None:
+                entry["calls"] += 1
+                entry["bytes"] += nbytes
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Get a copy of the stages, safe from threads still recording."""
+        with self._lock:
+            return {k: dict(v) for k, v in self.stages.items()}
+
+    def activate(self) -> contextvars.Token:
+        """Make this the Timings that `stage` records into."""
+        return _timings.set(self)
+
+    @staticmethod
+    def deactivate(token: contextvars.Token) -> None:
+        """Undo `activate`."""
+        _timings.reset(token)
+
+    @property
+    def current_stage(self) -> str:
+        """Get the name of the innermost stage running on this thread."""
+        return self._stack[-1][0] if self._stack else "other"
+
+    def record_call(self, nbytes: int) -> None:
+        """Attribute a Spotify call to the current stage of this thread."""
+        self._add(self.current_stage, nbytes=nbytes)
+
+    def server_timing(self) -> str:
+        """Format the stages as a Server-Timing header."""
+        metrics = []
+        for name, v in self.totals().items():
+            metric = f"{name};dur={v['seconds'] * 1000:.1f}"
+            if v["calls"]:
+                metric += f';desc="{v["calls"]} calls, {v["bytes"]} bytes"'
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the pipeline, if a Timings object is active."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    # [name, time spent in children]
+    frame = [name, 0.0]
+    timings._stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings._stack.pop()
+        timings._add(name, elapsed - frame[1])
+        if timings._stack:
+            timings._stack[-1][1] += elapsed
+
+
+def in_stage(name: str, func: Callable, *args, **kwargs):
+    """Call a function within a stage, e.g. as the task of a worker thread.
+
+    The thread must run in a copy of the context of the request, so that the
+    Timings of the request is active.
+    """
+    with stage(name):
+        return func(*args, **kwargs)
+
+
+def record_spotify_call(nbytes: int) -> None:
+    """Count a Spotify WebAPI response against the current stage."""
+    timings = _timings.get()
+    if timings is not None:
+        timings.record_call(nbytes)
+    REGISTRY.inc("spotify_calls_total", "Spotify WebAPI calls")
+    REGISTRY.inc(
+        "spotify_response_bytes_total", "Spotify WebAPI response bytes", nbytes
+    )
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+    """Counters and histograms of a single worker."""
+
+    def __init__(self):
+        self.help: Dict[str, str] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self.histograms: Dict[Tuple[str, Labels], list] = {}
+        self._lock = threading.Lock()
+        self._published = float("-inf")
+
+    def inc(self, name: str, help: str, value: float = 1, **labels) -> None:
+        """Increment a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.help[name] = help
+            self.counters[key] += value
+
+    def observe(self, name: str, help: str, value: float, **labels) -> None:
+        """Add an observation to a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.help[name] = help
+            # Bucket counts (last is +Inf), then the sum.
+            hist = self.histograms.setdefault(key, [0] * (len(BUCKETS) + 1) + [0.0])
+            hist[bisect_left(BUCKETS, value)] += 1
+            hist[-1] += value
+
+    def observe_timings(self, timings: Timings, **labels) -> None:
+        """Accumulate the stages of a finished request."""
+        for name, v in timings.totals().items():
+            self.inc(
+                "simmer_stage_seconds_total",
+                "Time spent in each stage",
+                v["seconds"],
+                stage=name,
+                **labels,
+            )
+            self.inc(
+                "simmer_stage_spotify_calls_total",
+                "Spotify WebAPI calls made in each stage",
+                v["calls"],
+                stage=name,
+                **labels,
+            )
+            self.inc(
+                "simmer_stage_spotify_bytes_total",
+                "Spotify WebAPI response bytes received in each stage",
+                v["bytes"],
+                stage=name,
+                **labels,
+            )
+
+    def snapshot(self) -> bytes:
+        """Serialize the registry, to be merged by `render`."""
+        with self._lock:
+            return pickle.dumps((self.help, dict(self.counters), dict(self.histograms)))
+
+    def publish(self, store, force: bool = False) -> None:
+        """Save a snapshot of this worker into a shared store.
+
+        :param force: Save it even if one was saved less than
+                      `PUBLISH_INTERVAL` seconds ago.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._published < PUBLISH_INTERVAL:
+                return
+            self._published = now
+        store.set(f"metrics:{os.getpid()}", self.snapshot(), ttl=24 * 3600)
+
+
+REGISTRY = Registry()
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render(snapshots: Iterable[bytes]) -> str:
+    """Merge the snapshots of several workers in Prometheus text format."""
+    help = {}
+    counters = defaultdict(float)
+    histograms = {}
+    for raw in snapshots:
+        h, c, hist = pickle.loads(raw)
+        help.update(h)
+        for k, v in c.items():
+            counters[k] += v
+        for k, v in hist.items():
+            merged = histograms.setdefault(k, [0] * len(v))
+            for i, x in enumerate(v):
+                merged[i] += x
+
+    lines = []
+    for name in sorted(help):
+        metric_counters = {k: v for k, v in counters.items() if k[0] == name}
+        metric_histograms = {k: v for k, v in histograms.items() if k[0] == name}
+        kind = "histogram" if metric_histograms else "counter"
+        lines.append(f"# HELP {name} {help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        for (_, labels), v in sorted(metric_counters.items()):
+            lines.append(f"{name}{_fmt_labels(labels)} {v}")
+
+        for (_, labels), v in sorted(metric_histograms.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), v[:-1]):
+                cumulative += count
+                le = _fmt_labels(labels, ("le", str(bound)))
+                lines.append(f"{name}_bucket{le} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {v[-1]}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {cumulative}")
+
+    return "\n".join(lines) + "\n"
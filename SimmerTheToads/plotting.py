@@ -0,0 +1,97 @@
+"""Plots of tracks and playlists, for use from notebooks.
+
+Importing this module pulls in matplotlib and seaborn, and changes the global
+matplotlib style and pandas display options. The web application never
+imports it.
+"""
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+
+pd.set_option("display.max_columns", None)
+pd.set_option("display.max_rows", None)
+pd.set_option("display.width", None)
+np.set_printoptions(suppress=True)
+plt.style.use("seaborn-v0_8-paper")
+
+
+def plot_track(track) -> None:
+    """Show plots based on Spotify's own analysis of a track."""
+    analysis = track.analysis
+    for i in track.analysis_df_names:
+        if len(analysis.get(i, ())):
+            analysis[i].plot(x="start")
+
+    plt.show()
+
+
+def corr_matrix(playlist, fmt_title=None) -> (Figure, Axes):
+    """Generate a correlation matrix of the data features of a playlist."""
+    fig, ax = plt.subplots()
+    matrix = playlist.df.corr(numeric_only=True)
+    sns.heatmap(matrix, annot=True, ax=ax)
+
+    if fmt_title is None:
+        title = f"{playlist.metadata['name']}: Correlation Matrix"
+    else:
+        title = fmt_title.format(name=playlist.metadata["name"])
+    ax.set_title(title)
+
+    return fig, ax
+
+
+def plot_playlist(playlist, fmt_title=None):
+    """Show some simple statistics about a playlist."""
+    df = playlist.df
+    nrows = 4
+    ncols = 3
+    lineplots_fig, lineplots_axes = plt.subplots(
+        nrows=nrows, ncols=ncols, figsize=(16, 12)
+    )
+    distplots_fig, distplots_axes = plt.subplots(
+        nrows=nrows, ncols=ncols, figsize=(16, 12)
+    )
+    relevant_cols = [
+        "acousticness",
+        "danceability",
+        "duration_ms",
+        "energy",
+        "instrumentalness",
+        "key",
+        "liveness",
+        "loudness",
+        "mode",
+        "speechiness",
+        "tempo",
+        "time_signature",
+    ]
+
+    for i, v in enumerate(relevant_cols):
+        sns.lineplot(
+            data=df,
+            x=df.index,
+            y=v,
+            ax=lineplots_axes[i % (ncols + 1)][i // nrows],
+            markers=True,
+            hue=None,
+        )
+        sns.histplot(
+            data=df,
+            x=v,
+            ax=distplots_axes[i % (ncols + 1)][i // nrows],
+            hue=None,
+        )
+
+    if fmt_title is None:
+        title = f"{playlist.metadata['name']}"
+    else:
+        title = fmt_title.format(name=playlist.metadata["name"])
+
+    lineplots_fig.suptitle(title)
+    lineplots_fig.tight_layout()
+
+    distplots_fig.suptitle(title)
+    distplots_fig.tight_layout()
@@ -0,0 +1,73 @@
+"""Process pool for the CPU heavy parts of simmering.
+
+Web workers spend most of their time waiting on Spotify, and are run with
+several threads each. Ordering a large playlist holds the GIL for seconds, so
+it is handed to a small pool of processes owned by each web worker instead.
+Its size is set by `SIMMER_CPU_WORKERS` (1 by default, see `gunicorn.conf.py`
+for deployments); with 0 the work runs in the calling thread.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from .engine import HEAVY_MODULES, warm_imports
+
+logger = logging.getLogger("SimmerTheToads")
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+
+
+def new_pool(size: int) -> ProcessPoolExecutor:
+    """Start a pool of `size` processes, with the heavy imports done.
+
+    Pool processes are forked from a fork server that has imported the
+    evaluators once, so that they share the imported modules copy-on-write
+    rather than each holding a copy. Without a fork server, every process is
+    spawned and imports them itself.
+    """
+    # Never fork a process that is already running threads.
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    context = multiprocessing.get_context(method)
+    if method == "forkserver":
+        # Only applies if this process has not started its fork server yet.
+        context.set_forkserver_preload(["SimmerTheToads.engine", *HEAVY_MODULES])
+    pool = ProcessPoolExecutor(
+        max_workers=size,
+        mp_context=context,
+        initializer=warm_imports,
+    )
+    logger.info("Started CPU pool of %d %s processes", size, method)
+    return pool
+
+
+def cpu_pool() -> Optional[ProcessPoolExecutor]:
+    """Get this process's CPU pool, or None if it is disabled."""
+    global _pool, _pool_pid
+
+    size = int(os.getenv("SIMMER_CPU_WORKERS", "1"))
+    if size <= 0:
+        return None
+
+    with _lock:
+        # A pool inherited over fork belongs to the parent.
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = new_pool(size)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown() -> None:
+    """Stop this process's CPU pool, if it has one."""
+    global _pool, _pool_pid
+
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(cancel_futures=True)
+        _pool = None
+        _pool_pid = None
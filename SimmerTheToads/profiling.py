@@ -0,0 +1,70 @@
+"""Opt-in profiling of individual simmer requests.
+
+Profiles are written with cProfile as pstats dumps, one per request, named
+after the request ID (any X-Request-ID, followed by a random suffix). Inspect
+them with `python -m pstats`, or render them as a flamegraph/icicle chart with
+tools such as snakeviz or flameprof:
+
+    $ snakeviz profiles/<request id>.pstats
+"""
+import cProfile
+import logging
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("SimmerTheToads")
+
+PROFILE_DIR = Path(os.getenv("SIMMER_PROFILE_DIR", "./profiles"))
+
+# Spotify user IDs allowed to request profiles from the web API.
+PROFILE_USERS = frozenset(
+    i.strip() for i in os.getenv("SIMMER_PROFILE_USERS", "").split(",") if i.strip()
+)
+
+# Names that are safe to use as file names.
+SAFE_NAME = re.compile(r"[A-Za-z0-9_.-]{1,128}")
+
+
+def request_id(candidate: Optional[str] = None) -> str:
+    """Get a unique, filesystem safe ID for a request.
+
+    :param candidate: Caller supplied ID, e.g. an X-Request-ID header. It is
+                      kept as the start of the ID if it is safe to use, and a
+                      random suffix added, so that a repeated ID never
+                      overwrites an earlier profile.
+    """
+    suffix = uuid.uuid4().hex
+    if candidate and re.fullmatch(r"[A-Za-z0-9_.-]{1,64}", candidate):
+        return f"{candidate}-{suffix[:12]}"
+    return suffix
+
+
+@contextmanager
+def profiled(name: str, directory: Path = PROFILE_DIR):
+    """Profile the enclosed block, saving the stats to `directory`/`name`.pstats.
+
+    If another profiler is already running in this thread, the block runs
+    unprofiled and None is yielded instead of the output path.
+    """
+    if not SAFE_NAME.fullmatch(name):
+        name = request_id()
+    path = Path(directory) / f"{name}.pstats"
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        logger.warning("Another profiler is active, not profiling %s", name)
+        yield None
+        return
+
+    try:
+        yield path
+    finally:
+        profiler.disable()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        logger.info("Saved profile to %s", path)
@@ -0,0 +1,207 @@
+"""Schedule Spotify WebAPI calls across every worker on a host.
+
+All workers draw from a single token bucket kept in a SqliteStore. Calls are
+split into two lanes; bulk calls (analysis, features, recommendations) may not
+drain the last few tokens, so interactive calls still go out promptly while a
+large playlist is being ingested. When Spotify does answer with 429, the
+`Retry-After` delay is shared through the store so that no worker keeps
+hammering the API in the meantime.
+"""
+import functools
+import logging
+import os
+import struct
+import time
+from typing import Optional
+
+from spotipy.client import Spotify
+from spotipy.exceptions import SpotifyException
+
+from .metrics import record_spotify_call
+from .store import SqliteStore, shared_store
+
+logger = logging.getLogger("SimmerTheToads")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Endpoints hit once per track (or per few tracks) while simmering.
+BULK_ENDPOINTS = (
+    "audio-analysis",
+    "audio-features",
+    "recommendations",
+)
+
+_STATE = struct.Struct("ddd")
+
+
+def lane_for(url: str) -> str:
+    """Get the scheduling lane of a WebAPI call."""
+    path = url.split("?", 1)[0]
+    if any(f"/{i}" in path or path.startswith(i) for i in BULK_ENDPOINTS):
+        return BULK
+    return INTERACTIVE
+
+
+def parse_retry_after(headers, default: float = 1.0) -> float:
+    """Get the delay requested by a 429 response in seconds."""
+    try:
+        return max(float(headers.get("Retry-After")), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Token bucket shared between processes through a SqliteStore.
+
+    :param store: Store holding the bucket state.
+    :param rate: Tokens added per second.
+    :param capacity: Maximum number of tokens, i.e. the allowed burst.
+    :param bulk_reserve: Fraction of the capacity that bulk calls leave
+                         available for interactive ones.
+    :param key: Name of the bucket within the store.
+    """
+
+    def __init__(
+        self,
+        store: SqliteStore,
+        rate: float = 10,
+        capacity: float = 20,
+        bulk_reserve: float = 0.25,
+        key: str = "ratelimit:spotify",
+    ):
+        self.store = store
+        self.rate = rate
+        self.capacity = capacity
+        self.bulk_reserve = bulk_reserve
+        self.key = key
+
+    def _load(self, now: float) -> (float, float):
+        raw = self.store.get(self.key)
+        if raw is None:
+            return self.capacity, 0.0
+
+        tokens, updated, blocked_until = _STATE.unpack(raw)
+        tokens = min(self.capacity, tokens + max(now - updated, 0) * self.rate)
+        return tokens, blocked_until
+
+    def _save(self, now: float, tokens: float, blocked_until: float) -> None:
+        self.store.set(
+            self.key,
+            _STATE.pack(tokens, now, blocked_until),
+            ttl=max(blocked_until - now, 0) + 3600,
+        )
+
+    def try_acquire(self, lane: str = INTERACTIVE) -> float:
+        """Attempt to take a single token.
+
+        :returns: 0 if a token was taken, otherwise the number of seconds to
+                  wait before trying again.
+        """
+        floor = self.capacity * self.bulk_reserve if lane == BULK else 0.0
+        with self.store.transaction():
+            now = time.time()
+            tokens, blocked_until = self._load(now)
+            if now < blocked_until:
+                return blocked_until - now
+            if tokens - 1 < floor:
+                return (floor + 1 - tokens) / self.rate
+
+            self._save(now, tokens - 1, blocked_until)
+            return 0.0
+
+    def acquire(self, lane: str = INTERACTIVE) -> float:
+        """Block until a token has been taken.
+
+        :returns: Total number of seconds spent waiting.
+        """
+        waited = 0.0
+        while delay := self.try_acquire(lane):
+            # Wake up periodically in case the bucket was reset meanwhile.
+            delay = min(delay, 1.0)
+            time.sleep(delay)
+            waited += delay
+        return waited
+
+    def block(self, seconds: float) -> None:
+        """Stop handing out tokens to anyone for a while."""
+        with self.store.transaction():
+            now = time.time()
+            tokens, blocked_until = self._load(now)
+            self._save(now, tokens, max(blocked_until, now + seconds))
+
+
+@functools.lru_cache(maxsize=None)
+def default_bucket() -> TokenBucket:
+    """Get the token bucket shared by every worker on this host."""
+    return TokenBucket(
+        shared_store("ratelimit"),
+        rate=float(os.getenv("SPOTIFY_RATE_LIMIT", 10)),
+        capacity=float(os.getenv("SPOTIFY_RATE_BURST", 20)),
+    )
+
+
+def _record_response(response, *args, **kwargs):
+    record_spotify_call(len(response.content))
+
+
+class RateLimitedSpotify(Spotify):
+    """Spotify client that goes through a shared TokenBucket.
+
+    Accepts every argument of spotipy.Spotify, plus:
+
+    :param bucket: Bucket to draw from, defaults to the host wide bucket.
+    :param max_429_retries: Number of times to retry a throttled call.
+    :param max_retry_after: Longest `Retry-After` delay to sit through. Calls
+                            asked to wait longer fail immediately instead.
+    """
+
+    def __init__(
+        self,
+        *args,
+        bucket: Optional[TokenBucket] = None,
+        max_429_retries: int = 5,
+        max_retry_after: float = 30,
+        **kwargs,
+    ):
+        # 429s are handled here, don't let urllib3 sleep on them.
+        kwargs.setdefault("status_forcelist", (500, 502, 503, 504))
+        super().__init__(*args, **kwargs)
+
+        self.bucket = default_bucket() if bucket is None else bucket
+        self.max_429_retries = max_429_retries
+        self.max_retry_after = max_retry_after
+
+    def _build_session(self):
+        super()._build_session()
+        self._session.hooks["response"].append(_record_response)
+        for adapter in self._session.adapters.values():
+            adapter.max_retries = adapter.max_retries.new(
+                respect_retry_after_header=False
+            )
+
+    def _internal_call(self, method, url, payload, params):
+        lane = lane_for(url)
+        attempt = 0
+        while True:
+            self.bucket.acquire(lane)
+            try:
+                # The parent pops keys from params, keep them for retries.
+                return super()._internal_call(method, url, payload, dict(params))
+            except SpotifyException as e:
+                if e.http_status != 429 or attempt >= self.max_429_retries:
+                    raise
+
+                delay = parse_retry_after(e.headers)
+                if delay > self.max_retry_after:
+                    raise
+
+                attempt += 1
+                logger.warning(
+                    "Throttled by Spotify on %s, retrying in %.1fs (%d/%d)",
+                    url,
+                    delay,
+                    attempt,
+                    self.max_429_retries,
+                )
+                self.bucket.block(delay)
@@ -0,0 +1,111 @@
+"""Compression and validation of API responses.
+
+JSON responses larger than `COMPRESS_MIN_BYTES` are compressed with brotli
+(if installed, `pip install .[brotli]`) or gzip, whichever the client prefers.
+
+Responses derived from a snapshot of a playlist carry a weak ETag made from
+that snapshot and whatever else they depend on (see `conditional`). A client
+that sends it back in `If-None-Match` gets an empty 304 instead, without the
+response being made at all.
+"""
+import gzip
+import hashlib
+import os
+from typing import Callable, Optional
+
+from flask import Request, Response, request
+
+from .version import __version__
+
+# Smallest response body worth compressing, in bytes.
+COMPRESS_MIN_BYTES = int(os.getenv("SIMMER_COMPRESS_MIN_BYTES", 1024))
+
+# Compression levels, trading a little size for much less CPU than the maximum.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def encodings() -> tuple:
+    """Get the content encodings this server can produce, preferred first."""
+    return ("br", "gzip") if _brotli() is not None else ("gzip",)
+
+
+def accepted_encoding(req: Request, offered=None) -> Optional[str]:
+    """Get the encoding to send a response in, if any.
+
+    :param req: Request to answer.
+    :param offered: Encodings available, preferred first. Defaults to every
+                    encoding this server can produce.
+    """
+    offered = encodings() if offered is None else offered
+    best = None
+    for encoding in offered:
+        quality = req.accept_encodings[encoding]
+        if quality and (best is None or quality > best[1]):
+            best = encoding, quality
+    return None if best is None else best[0]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a body with the given content encoding."""
+    if encoding == "br":
+        return _brotli().compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"Unsupported encoding {encoding}")
+
+
+def compress_response(response: Response) -> Response:
+    """Compress a response for the current request, if it is worth it."""
+    if (
+        response.direct_passthrough
+        or response.status_code != 200
+        or "Content-Encoding" in response.headers
+        or not response.mimetype.startswith(COMPRESSIBLE_TYPES)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if response.content_length is not None and (
+        response.content_length < COMPRESS_MIN_BYTES
+    ):
+        return response
+    encoding = accepted_encoding(request)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def etag(*parts) -> str:
+    """Make an ETag out of everything a response depends on."""
+    key = "\0".join(str(i) for i in (__version__, *parts))
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def conditional(tag: str, make: Callable[[], Response]) -> Response:
+    """Answer with 304 if the client already has the response tagged `tag`.
+
+    :param tag: ETag of the response, see `etag`.
+    :param make: Makes the response when the client does not have it.
+    """
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = make()
+    response.set_etag(tag, weak=True)
+    # The client may keep it, but must check that it is still current.
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
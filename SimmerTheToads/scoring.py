@@ -0,0 +1,83 @@
+"""Measures of how smoothly an ordering of a playlist flows."""
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+from .features import ARTIST_COLUMN, FeatureMatrix
+
+if TYPE_CHECKING:
+    from .engine import Playlist
+
+
+def transitions(features: np.ndarray, order: Sequence[int]) -> np.ndarray:
+    """Get the euclidean distance between every two consecutive tracks.
+
+    :param features: One row of features per track.
+    :param order: Rows of the tracks, in the order they are played.
+    """
+    walk = features[np.asarray(order, dtype=int)]
+    return np.linalg.norm(np.diff(walk, axis=0), axis=1)
+
+
+def tour_cost(features: np.ndarray, order: Sequence[int]) -> float:
+    """Get the total euclidean distance of a walk through the rows of features.
+
+    :param features: One row of features per track.
+    :param order: Rows of the tracks, in the order they are played.
+    """
+    return float(transitions(features, order).sum())
+
+
+def score(
+    playlist: "Playlist",
+    order: Optional[Sequence] = None,
+    n_jumps: int = 5,
+    features: Optional[FeatureMatrix] = None,
+) -> dict:
+    """Score how smoothly an ordering of a playlist flows.
+
+    Distances are taken between the min-max scaled features of consecutive
+    tracks, so orders made by different evaluators are scored alike. Lower is
+    smoother.
+
+    :param playlist: Playlist the order is of.
+    :param order: Frame index labels of the tracks, in the order they are
+                  played. Defaults to the current order of the frame.
+    :param n_jumps: Number of largest jumps to report.
+    :param features: FeatureMatrix to score in, the playlist's by default.
+    :returns: The total ("total") and mean ("mean") distance, the distance of
+              every transition ("transitions"), the largest jumps, largest
+              first ("largest_jumps", each with the "position" of the track
+              jumped from, the track IDs "from" and "to", and the "distance"),
+              and the share of transitions between tracks of the same artist
+              ("artist_repeat_rate").
+    """
+    if order is None:
+        order = playlist.df.index
+    if features is None:
+        features = playlist.features
+    order = list(order)
+    rows = features.positions(order)
+    distances = transitions(features.minmax, rows)
+
+    largest = np.argsort(-distances, kind="stable")[: max(n_jumps, 0)]
+
+    ids = playlist.df.loc[order, "id"].to_numpy()
+    artists = features.raw[rows, features.columns.index(ARTIST_COLUMN)]
+    repeats = artists[1:] == artists[:-1]
+
+    return {
+        "total": float(distances.sum()),
+        "mean": float(distances.mean()) if len(distances) else 0.0,
+        "transitions": distances.tolist(),
+        "largest_jumps": [
+            {
+                "position": int(i),
+                "from": ids[i],
+                "to": ids[i + 1],
+                "distance": float(distances[i]),
+            }
+            for i in largest
+        ],
+        "artist_repeat_rate": float(repeats.mean()) if len(repeats) else 0.0,
+    }
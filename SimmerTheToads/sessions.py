@@ -0,0 +1,106 @@
+"""Server side session backends."""
+import pickle
+
+from flask_session.sessions import ServerSideSession, SessionInterface
+from itsdangerous import BadSignature, want_bytes
+
+from .store import SqliteStore
+
+
+class SqliteSession(ServerSideSession):
+    """Session whose data lives in a SqliteStore."""
+
+
+class SqliteSessionInterface(SessionInterface):
+    """Use a SqliteStore as the session backend.
+
+    Mirrors the redis backend of flask-session, but only requires a local
+    file. Sessions expire after `app.permanent_session_lifetime` and are swept
+    from the store periodically, so the store stays bounded.
+
+    :param store: Store to keep the session data in.
+    :param key_prefix: A prefix that is added to all store keys.
+    :param use_signer: Whether to sign the session id cookie or not.
+    :param permanent: Whether to use permanent session or not.
+    """
+
+    serializer = pickle
+    session_class = SqliteSession
+
+    def __init__(
+        self,
+        store: SqliteStore,
+        key_prefix: str = "session:",
+        use_signer: bool = False,
+        permanent: bool = True,
+    ):
+        self.store = store
+        self.key_prefix = key_prefix
+        self.use_signer = use_signer
+        self.permanent = permanent
+
+    def open_session(self, app, request):
+        """Load the session referenced by the request's cookie."""
+        sid = request.cookies.get(app.config["SESSION_COOKIE_NAME"])
+        if not sid:
+            return self.session_class(
+                sid=self._generate_sid(), permanent=self.permanent
+            )
+
+        if self.use_signer:
+            signer = self._get_signer(app)
+            if signer is None:
+                return None
+            try:
+                sid = signer.unsign(sid).decode()
+            except BadSignature:
+                return self.session_class(
+                    sid=self._generate_sid(), permanent=self.permanent
+                )
+
+        value = self.store.get(self.key_prefix + sid)
+        if value is not None:
+            try:
+                return self.session_class(self.serializer.loads(value), sid=sid)
+            except (pickle.UnpicklingError, EOFError, AttributeError):
+                pass
+
+        return self.session_class(sid=sid, permanent=self.permanent)
+
+    def save_session(self, app, session, response):
+        """Persist the session and refresh the cookie."""
+        if not self.should_set_cookie(app, session):
+            return
+
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified:
+                self.store.delete(self.key_prefix + session.sid)
+                response.delete_cookie(
+                    app.config["SESSION_COOKIE_NAME"], domain=domain, path=path
+                )
+            return
+
+        if session.permanent:
+            self.store.set(
+                self.key_prefix + session.sid,
+                self.serializer.dumps(dict(session)),
+                ttl=app.permanent_session_lifetime.total_seconds(),
+            )
+
+        if self.use_signer:
+            session_id = self._get_signer(app).sign(want_bytes(session.sid))
+        else:
+            session_id = session.sid
+
+        response.set_cookie(
+            app.config["SESSION_COOKIE_NAME"],
+            session_id,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
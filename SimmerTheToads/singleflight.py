@@ -0,0 +1,121 @@
+"""Coalesce identical work that is asked for at the same time.
+
+The first caller for a key (the leader) runs the work; anyone else asking for
+the same key meanwhile (a follower) waits for the leader's result instead of
+running it again, whether within the same worker or in another one on the
+host. Followers in the same worker wait on the leader directly; across
+workers, the leader holds a lease on the key in a SqliteStore, and publishes
+its result there for followers to pick up.
+
+If a leader fails, followers in its worker get its exception, and followers
+in other workers race to take over the lease and run the work themselves.
+A leader that dies without releasing its lease holds it for `LEASE_TTL`.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+from .metrics import REGISTRY
+from .store import SqliteStore
+
+# Seconds a leader may run for before followers in other workers give up on it.
+LEASE_TTL = float(os.getenv("SIMMER_SINGLEFLIGHT_LEASE", 300))
+
+# Seconds a result is kept for after it is published, for followers to find.
+RESULT_TTL = float(os.getenv("SIMMER_SINGLEFLIGHT_RESULT_TTL", 10))
+
+# Seconds between checks for a result published by another worker.
+POLL_INTERVAL = 0.1
+
+# Work running in this worker, by store and key.
+_lock = threading.Lock()
+_flights: Dict[Tuple[str, str, str], Future] = {}
+
+
+class SingleFlight:
+    """Run work once per key at a time, across every worker sharing `store`.
+
+    Instances are cheap, and every instance for the same store shares the
+    work running in this worker.
+
+    :param store: Store holding the leases and results.
+    :param lease_ttl: See `LEASE_TTL`.
+    :param result_ttl: See `RESULT_TTL`.
+    :param poll_interval: See `POLL_INTERVAL`.
+    """
+
+    def __init__(
+        self,
+        store: SqliteStore,
+        lease_ttl: float = LEASE_TTL,
+        result_ttl: float = RESULT_TTL,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.store = store
+        self.lease_ttl = lease_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+
+    def do(self, key: str, func: Callable[[], bytes]) -> bytes:
+        """Get the result of `func`, running it only if no one else is.
+
+        :param key: Identifies the work; callers with equal keys get the same
+                    result.
+        :param func: The work, returning its result as bytes.
+        """
+        local_key = (self.store.path, self.store.table, key)
+        with _lock:
+            flight = _flights.get(local_key)
+            leader = flight is None
+            if leader:
+                flight = _flights[local_key] = Future()
+        if not leader:
+            REGISTRY.inc("singleflight_coalesced_total", "Requests coalesced")
+            return flight.result()
+
+        try:
+            result = self._lead(key, func)
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with _lock:
+                del _flights[local_key]
+
+    def _lead(self, key: str, func: Callable[[], bytes]) -> bytes:
+        """Run `func` under the lease of `key`, or wait for whoever holds it."""
+        token = uuid.uuid4().hex.encode()
+        while True:
+            result = self._acquire(key, token)
+            if result is not None:
+                REGISTRY.inc("singleflight_coalesced_total", "Requests coalesced")
+                return result
+            if self.store.get(f"lease:{key}") == token:
+                break
+            time.sleep(self.poll_interval)
+
+        try:
+            result = func()
+            self.store.set(f"result:{key}", result, self.result_ttl)
+            return result
+        finally:
+            with self.store.transaction():
+                if self.store.get(f"lease:{key}") == token:
+                    self.store.delete(f"lease:{key}")
+
+    def _acquire(self, key: str, token: bytes) -> Optional[bytes]:
+        """Take the lease of `key` if it is free.
+
+        :returns: The result of `key`, if another worker already published it.
+        """
+        with self.store.transaction():
+            result = self.store.get(f"result:{key}")
+            if result is None and self.store.get(f"lease:{key}") is None:
+                self.store.set(f"lease:{key}", token, self.lease_ttl)
+        return result
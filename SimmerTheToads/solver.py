@@ -0,0 +1,205 @@
+"""Heuristics for orderings of tracks over a distance matrix.
+
+Orders are open paths: every track is visited once, and the last track is not
+joined back to the first. The networkx solvers only minimize, and need a
+complete graph in memory; these work on the distance matrix directly.
+"""
+import os
+import time
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Seconds a local search may run for before returning the best order so far.
+TIME_BUDGET = float(os.getenv("SIMMER_SOLVER_BUDGET", 0.2))
+
+# Tracks on either side of a change that a local repair may reorder.
+REPAIR_RADIUS = 8
+
+
+def path_length(distances: np.ndarray, path: Sequence[int]) -> float:
+    """Get the total distance along a path through the rows of `distances`."""
+    path = np.asarray(path, dtype=int)
+    return float(distances[path[:-1], path[1:]].sum())
+
+
+def farthest_neighbour(distances: np.ndarray, start: Optional[int] = None) -> List[int]:
+    """Build a path by always moving to the farthest track not yet visited.
+
+    :param distances: Square matrix of the distance between every two tracks.
+    :param start: Track to start from. Defaults to the one farthest from all
+                  others, which would otherwise be left for last.
+    """
+    n = len(distances)
+    if n == 0:
+        return []
+    if start is None:
+        start = int(np.argmax(distances.sum(axis=1)))
+
+    visited = np.zeros(n, dtype=bool)
+    path = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, -np.inf, distances[path[-1]])
+        path.append(int(np.argmax(row)))
+        visited[path[-1]] = True
+    return path
+
+
+def two_opt(
+    distances: np.ndarray,
+    path: Sequence[int],
+    maximize: bool = False,
+    budget: Optional[float] = None,
+    max_passes: int = 50,
+    keep_first: bool = False,
+    keep_last: bool = False,
+) -> List[int]:
+    """Improve a path by reversing parts of it, until no reversal helps.
+
+    Each pass tries every start of a reversal, together with its best end, at
+    once with numpy, and applies it if it improves the path.
+
+    :param distances: Square matrix of the distance between every two tracks.
+    :param path: Path to improve.
+    :param maximize: Make the path as long as possible instead of as short.
+    :param budget: Seconds to stop after, `TIME_BUDGET` by default.
+    :param max_passes: Most passes over the path.
+    :param keep_first: Leave the first track of the path where it is.
+    :param keep_last: Leave the last track of the path where it is.
+    :returns: The improved path.
+    """
+    if budget is None:
+        budget = TIME_BUDGET
+    deadline = time.perf_counter() + budget
+    path = np.array(path, dtype=int)
+    n = len(path)
+    if n < 3:
+        return path.tolist()
+    sign = -1.0 if maximize else 1.0
+    last = n - 1 if keep_last else n
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(int(keep_first), last - 1):
+            # Reverse path[i : j + 1] for every j > i, replacing the edges
+            # (path[i - 1], path[i]) and (path[j], path[j + 1]).
+            ends = path[i + 1 : last]
+            after = np.append(path[i + 2 : last + 1], -1)[: len(ends)]
+            gain = np.zeros(len(ends))
+            if i > 0:
+                gain += distances[path[i - 1], path[i]] - distances[path[i - 1], ends]
+            inner = after >= 0
+            gain[inner] += (
+                distances[ends[inner], after[inner]] - distances[path[i], after[inner]]
+            )
+            gain *= sign
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-12:
+                j = i + 1 + best
+                path[i : j + 1] = path[i : j + 1][::-1]
+                improved = True
+            if time.perf_counter() > deadline:
+                return path.tolist()
+        if not improved:
+            break
+    return path.tolist()
+
+
+def max_dispersion(distances: np.ndarray, budget: Optional[float] = None) -> List[int]:
+    """Order tracks so that consecutive tracks are as far apart as possible.
+
+    Farthest neighbour construction, then 2-opt maximizing the path length.
+
+    :param distances: Square matrix of the distance between every two tracks.
+    :param budget: Seconds to spend improving the order, see `two_opt`.
+    """
+    return two_opt(
+        distances, farthest_neighbour(distances), maximize=True, budget=budget
+    )
+
+
+def cheapest_insertion(
+    features: np.ndarray,
+    path: Sequence[int],
+    rows: Iterable[int],
+    maximize: bool = False,
+) -> List[int]:
+    """Insert tracks into a path, each where it adds the least distance.
+
+    Only the distances from every inserted track to the tracks of the path are
+    computed, so inserting k tracks into a path of n takes O(k n).
+
+    :param features: One row of features per track.
+    :param path: Rows of the tracks, in order.
+    :param rows: Rows of the tracks to insert, in the order they are inserted.
+    :param maximize: Insert every track where it adds the most distance.
+    :returns: The path with the tracks inserted.
+    """
+    path = list(path)
+    # Distance between every two consecutive tracks of the path.
+    edges = list(np.linalg.norm(np.diff(features[path], axis=0), axis=1))
+    sign = -1.0 if maximize else 1.0
+    for row in rows:
+        if not path:
+            path.append(row)
+            continue
+        to = np.linalg.norm(features[path] - features[row], axis=1)
+        # Added distance when inserted before path[k], for k = 0 .. n.
+        added = np.empty(len(path) + 1)
+        added[0] = to[0]
+        added[-1] = to[-1]
+        added[1:-1] = to[:-1] + to[1:] - np.asarray(edges)
+        k = int(np.argmin(sign * added))
+        path.insert(k, row)
+        edges[max(k - 1, 0) : k] = [to[i] for i in (k - 1, k) if 0 <= i < len(to)]
+    return path
+
+
+def repair(
+    features: np.ndarray,
+    path: Sequence[int],
+    positions: Iterable[int],
+    maximize: bool = False,
+    radius: int = REPAIR_RADIUS,
+    budget: Optional[float] = None,
+) -> List[int]:
+    """Improve a path around the positions where it was changed.
+
+    Runs `two_opt` on the window of `radius` tracks around every change
+    (merging overlapping windows), leaving the rest of the path untouched.
+
+    :param features: One row of features per track.
+    :param path: Rows of the tracks, in order.
+    :param positions: Positions within the path that changed.
+    :param maximize: Make the path as long as possible instead of as short.
+    :param radius: Tracks on either side of a change that may move.
+    :param budget: Seconds to spend on every window, see `two_opt`.
+    :returns: The repaired path.
+    """
+    import scipy.spatial
+
+    path = list(path)
+    windows: List[List[int]] = []
+    for k in sorted(set(positions)):
+        start, stop = max(k - radius, 0), min(k + radius + 1, len(path))
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], stop)
+        else:
+            windows.append([start, stop])
+
+    for start, stop in windows:
+        # Take the tracks on either side along, but leave them in place.
+        lo, hi = max(start - 1, 0), min(stop + 1, len(path))
+        window = path[lo:hi]
+        points = features[window]
+        ordered = two_opt(
+            scipy.spatial.distance_matrix(points, points),
+            range(len(window)),
+            maximize=maximize,
+            budget=budget,
+            keep_first=lo < start,
+            keep_last=hi > stop,
+        )
+        path[lo:hi] = [window[i] for i in ordered]
+    return path
@@ -0,0 +1,113 @@
+"""Serving the frontend build, precompressed and cached by clients.
+
+Files are sent as the `.br` or `.gz` file next to them when there is one and
+the client accepts that encoding, so nothing is compressed while serving.
+Create them once per build:
+
+    $ python -m SimmerTheToads.static frontend/build
+
+The build names its assets after a hash of their contents (e.g.
+`static/js/main.3f1e2a9c.js`), so those never change and are cached by
+clients for a year without being checked again. Anything else, `index.html`
+which names the current assets above all, is checked with the server on every
+use, and is only sent again once it changed.
+"""
+import argparse
+import gzip
+import mimetypes
+import re
+import shutil
+from pathlib import Path
+from typing import Union
+
+from flask import Response, request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+from .responses import _brotli, accepted_encoding
+
+# Content hash within the name of an asset of the build, e.g. "main.3f1e2a9c.js".
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Encodings of the files next to each file, preferred first.
+SIBLINGS = {"br": ".br", "gzip": ".gz"}
+
+# Files worth compressing, the rest (images, fonts) already are.
+PRECOMPRESSED_SUFFIXES = (".html", ".js", ".css", ".json", ".map", ".svg", ".txt")
+
+
+def send_static(directory: Union[str, Path], filename: str) -> Response:
+    """Send a file of the build, see the module documentation.
+
+    :param directory: Directory to send from.
+    :param filename: Path of the file within `directory`.
+    """
+    path = safe_join(str(directory), filename)
+    if path is None or not Path(path).is_file():
+        raise NotFound()
+
+    available = [k for k, v in SIBLINGS.items() if Path(path + v).is_file()]
+    encoding = accepted_encoding(request, available)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    response = send_file(
+        path + SIBLINGS[encoding] if encoding else path,
+        mimetype=mimetype,
+        conditional=True,
+    )
+    if available:
+        response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+
+    response.headers.pop("Expires", None)
+    if HASHED_NAME.search(Path(filename).name):
+        response.headers["Cache-Control"] = IMMUTABLE
+    else:
+        response.headers["Cache-Control"] = REVALIDATE
+    return response
+
+
+def precompress(directory: Union[str, Path], min_bytes: int = 1024) -> int:
+    """Write the `.gz` (and `.br`, if brotli is installed) of every file.
+
+    Files that are up to date are left alone.
+
+    :param directory: Build to compress.
+    :param min_bytes: Smallest file worth compressing.
+    :returns: Number of files written.
+    """
+    brotli = _brotli()
+    written = 0
+    for path in Path(directory).rglob("*"):
+        if (
+            not path.is_file()
+            or path.suffix not in PRECOMPRESSED_SUFFIXES
+            or path.stat().st_size < min_bytes
+        ):
+            continue
+        mtime = path.stat().st_mtime
+        gz = path.with_name(path.name + ".gz")
+        if not gz.exists() or gz.stat().st_mtime < mtime:
+            with open(path, "rb") as src, gzip.open(gz, "wb", compresslevel=9) as dst:
+                shutil.copyfileobj(src, dst)
+            written += 1
+        br = path.with_name(path.name + ".br")
+        if brotli is not None and (not br.exists() or br.stat().st_mtime < mtime):
+            br.write_bytes(brotli.compress(path.read_bytes(), quality=11))
+            written += 1
+    return written
+
+
+def main(argv=None):
+    """Precompress the build given on the command line, see the module documentation."""
+    parser = argparse.ArgumentParser(description="Precompress a frontend build.")
+    parser.add_argument("directory", type=Path, nargs="?", default="frontend/build")
+    args = parser.parse_args(argv)
+    print(f"Wrote {precompress(args.directory)} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Small key-value stores shared between the workers of a single host."""
+import functools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+DEFAULT_STORE_PATH = Path("./.simmer_store.sqlite3")
+
+
+class SqliteStore:
+    """Key-value store with per-key expiry backed by a single SQLite file.
+
+    Every gunicorn worker (and every thread within a worker) opens its own
+    connection to the same file, so anything written by one worker is visible
+    to the others. Lookups are a single primary key probe, which keeps them
+    well under a millisecond.
+
+    Expired entries are swept every `sweep_interval` writes. If the store
+    still holds more than `max_entries` afterwards, the entries closest to
+    expiring are evicted, keeping the file bounded on long-running hosts.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_STORE_PATH,
+        table: str = "kv",
+        max_entries: int = 10_000,
+        sweep_interval: int = 100,
+    ):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+
+        self.path = str(path)
+        self.table = table
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Connections cannot be shared across threads, nor survive a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB, expires REAL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_expires "
+                f"ON {self.table} (expires)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get the value of a key, or None if it is missing or expired."""
+        row = self._conn.execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND expires > ?",
+            (key, time.time()),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store a value for `ttl` seconds."""
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires) "
+            "VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl),
+        )
+
+        self._writes += 1
+        if self._writes >= self.sweep_interval:
+            self.sweep()
+
+    def items(self, prefix: str = "") -> List[Tuple[str, bytes]]:
+        """Get every live key/value pair whose key starts with `prefix`."""
+        return self._conn.execute(
+            f"SELECT key, value FROM {self.table} "
+            "WHERE substr(key, 1, ?) = ? AND expires > ?",
+            (len(prefix), prefix, time.time()),
+        ).fetchall()
+
+    def delete(self, key: str) -> None:
+        """Remove a key from the store, if present."""
+        self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    @contextmanager
+    def transaction(self):
+        """Run several operations atomically with respect to other workers.
+
+        The write lock is taken immediately, so a read-modify-write within the
+        block cannot interleave with another worker doing the same.
+        """
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def sweep(self) -> int:
+        """Drop expired entries and enforce `max_entries`.
+
+        :returns: Number of entries removed.
+        """
+        self._writes = 0
+        conn = self._conn
+        removed = conn.execute(
+            f"DELETE FROM {self.table} WHERE expires <= ?",
+            (time.time(),),
+        ).rowcount
+
+        # Evict whatever would have expired first.
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            removed += conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY expires LIMIT ?)",
+                (overflow,),
+            ).rowcount
+
+        return removed
+
+    def __len__(self) -> int:
+        """Get the number of entries, including any not yet swept."""
+        row = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return row[0]
+
+
+@functools.lru_cache(maxsize=None)
+def shared_store(table: str, **options) -> SqliteStore:
+    """Get a store shared by every worker on this host.
+
+    :param table: Namespace within the store, one per use.
+    :param options: Other options of `SqliteStore`, the same for every use.
+    """
+    path = os.getenv("SIMMER_STORE_PATH", DEFAULT_STORE_PATH)
+    return SqliteStore(path, table=table, **options)
@@ -0,0 +1,24 @@
+import pytest
+
+from SimmerTheToads.engine import Playlist
+from SimmerTheToads.fake_spotify import FakeSpotify, FakeSpotifyBackend
+
+
+@pytest.fixture
+def synthetic_playlist(request):
+    """Fetch the first playlist of a synthetic backend, without any HTTP.
+
+    Call it with options for `FakeSpotifyBackend.synthetic`, on top of any the
+    fixture is parametrized with indirectly, to get a playlist of a backend of
+    its own. Call it with a backend instead to fetch that one's playlist again.
+    """
+
+    def build(backend: FakeSpotifyBackend = None, **options) -> Playlist:
+        if backend is None:
+            options = {**getattr(request, "param", {}), **options}
+            backend = FakeSpotifyBackend.synthetic(**options)
+        return Playlist(
+            FakeSpotify(backend), backend.playlist_ids[0], parallel_fetch=False
+        )
+
+    return build
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from SimmerTheToads.engine import (ClusteringEvaluator, Playlist, TSPEvaluator,
+                                   compare_evaluators, simmer_playlist)
+from SimmerTheToads.fake_spotify import FakeSpotify, FakeSpotifyBackend
+
+
+@pytest.fixture
+def backend():
+    return FakeSpotifyBackend.synthetic(n_tracks=30, n_catalog=20, seed=6)
+
+
+@pytest.fixture
+def playlist(synthetic_playlist, backend):
+    return synthetic_playlist(backend)
+
+
+def assert_same(a: Playlist, b: Playlist):
+    pd.testing.assert_frame_equal(a.df, b.df)
+    assert a.metadata == b.metadata
+    assert (a.remote_ids, a.snapshot_id) == (b.remote_ids, b.snapshot_id)
+    assert np.array_equal(a.features.raw, b.features.raw)
+    assert np.array_equal(a.features.minmax, b.features.minmax)
+    assert a.tracks.keys() == b.tracks.keys()
+    for x, y in zip(a.ordered_tracks(), b.ordered_tracks()):
+        assert x.metadata == y.metadata
+        assert bool(x.analysis) == bool(y.analysis)
+        if x.analysis:
+            for k, v in x.analysis_arrays().items():
+                assert np.array_equal(v, y.analysis_arrays()[k])
+
+
+def test_round_trip(playlist, tmp_path):
+    playlist.save(tmp_path / "p")
+    loaded = Playlist.load(tmp_path / "p")
+    assert_same(playlist, loaded)
+
+    # Memory mapped, not read up front.
+    assert isinstance(loaded.features.raw.base, np.memmap)
+    assert len(loaded.ordered_tracks()[0].analysis["sections"])
+
+    evaluators = {"tsp": TSPEvaluator, "clustering": ClusteringEvaluator}
+    a = compare_evaluators(playlist, evaluators)
+    b = compare_evaluators(loaded, evaluators)
+    assert {k: v["ids"] for k, v in a.items()} == {k: v["ids"] for k, v in b.items()}
+
+
+def test_round_trip_with_suggestions(backend, playlist, tmp_path):
+    simmer_playlist(playlist, TSPEvaluator)
+    assert len(playlist) > 30
+    playlist.save(tmp_path / "p")
+    assert_same(playlist, Playlist.load(tmp_path / "p", FakeSpotify(backend)))
+
+
+def test_load_makes_no_calls(backend, playlist, tmp_path):
+    playlist.save(tmp_path / "p")
+    calls = dict(backend.calls)
+    loaded = Playlist.load(tmp_path / "p", FakeSpotify(backend))
+    compare_evaluators(loaded, {"tsp": TSPEvaluator})
+    assert backend.calls == calls
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from SimmerTheToads.cli import main
+from SimmerTheToads.fake_spotify import FakeSpotifyBackend, serve
+
+
+def test_simmer_many(monkeypatch, tmp_path):
+    # Small, every call made through the client is rate limited.
+    backend = FakeSpotifyBackend.synthetic(n_tracks=10, n_playlists=2, n_catalog=0)
+    a, b = backend.playlist_ids
+    backend.playlists[b]["track_ids"] += backend.playlists[a]["track_ids"][:4]
+    server = serve(backend)
+    try:
+        monkeypatch.setenv("SPOTIFY_ACCESS_TOKEN", "fake")
+        monkeypatch.setenv(
+            "SPOTIFY_API_PREFIX", f"http://127.0.0.1:{server.server_port}/v1/"
+        )
+        ids_file = tmp_path / "playlists.txt"
+        ids_file.write_text(f"{b}  # Shares tracks with {a}\n\n")
+        main([a, "--ids-file", str(ids_file), "-o", str(tmp_path / "out")])
+        main(
+            [a, "--ids-file", str(ids_file), "-j", "2"]
+            + ["--evaluators", "tsp", "-o", str(tmp_path / "out")]
+            + ["--save", str(tmp_path / "saved")]
+        )
+    finally:
+        server.shutdown()
+
+    # Every track was fetched once per run, shared or not.
+    assert backend.calls["audio-analysis"] == 2 * 20
+
+    timings = json.loads((tmp_path / "out" / "timings.json").read_text())
+    assert timings["playlists"] == 2
+    assert (timings["tracks"], timings["unique_tracks"]) == (24, 20)
+    assert timings["failed"] == []
+    result = json.loads((tmp_path / "out" / f"{b}.json").read_text())
+    assert list(result["orderings"]) == ["tsp"]
+    assert sorted(result["orderings"]["tsp"]["ids"]) == sorted(
+        backend.playlists[b]["track_ids"]
+    )
+
+    # Saved playlists are simmered again without any calls.
+    calls = dict(backend.calls)
+    main([str(tmp_path / "saved" / a), "-o", str(tmp_path / "offline")])
+    assert backend.calls == calls
+    result = json.loads((tmp_path / "offline" / f"{a}.json").read_text())
+    assert set(result["orderings"]) == {"clustering", "tsp", "chaos"}
+
+
+def test_simmer_many_failed_fetch(monkeypatch, tmp_path):
+    backend = FakeSpotifyBackend.synthetic(n_tracks=10, n_playlists=2, n_catalog=0)
+    a, b = backend.playlist_ids
+    backend.playlists[b]["track_ids"] = []
+    server = serve(backend)
+    try:
+        monkeypatch.setenv("SPOTIFY_ACCESS_TOKEN", "fake")
+        monkeypatch.setenv(
+            "SPOTIFY_API_PREFIX", f"http://127.0.0.1:{server.server_port}/v1/"
+        )
+        with pytest.raises(SystemExit):
+            main([a, b, "missing", "-o", str(tmp_path / "out")])
+    finally:
+        server.shutdown()
+
+    # The missing and the empty playlists do not stop the others.
+    timings = json.loads((tmp_path / "out" / "timings.json").read_text())
+    assert timings["playlists"] == 1
+    assert sorted(timings["failed"]) == sorted([b, "missing"])
+    assert (tmp_path / "out" / f"{a}.json").exists()
+    assert not (tmp_path / "out" / f"{b}.json").exists()
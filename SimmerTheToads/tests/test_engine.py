@@ -1,9 +1,17 @@
+import subprocess
+import sys
 from copy import deepcopy
 
+import numpy as np
+import pandas as pd
 import pytest
 
-from SimmerTheToads.engine import (ClusteringEvaluator, Playlist, grouper,
-                                   simmer_playlist)
+from SimmerTheToads.engine import (ClusteringEvaluator, GrowingMatrix,
+                                   Playlist, Track, TSPEvaluator,
+                                   compare_evaluators, grouper,
+                                   simmer_playlist, split_means)
+from SimmerTheToads.fake_spotify import FakeSpotifyBackend
+from SimmerTheToads.solver import REPAIR_RADIUS
 
 AUDIO_ANALYSIS = {
     "meta": {
@@ -420,3 +428,106 @@ def test_simmer_playlist_clustering_single_track():
     spotify = SpotifyMock(PLAYLIST, n_tracks=1)
     p = Playlist(spotify, "some mock id")
     simmer_playlist(p, ClusteringEvaluator, to_spotify=False)
+
+
+def test_track_is_slim():
+    spotify = SpotifyMock(PLAYLIST)
+    metadata = TRACKS["items"][0]["track"]
+    track = Track(spotify, metadata, dict(AUDIO_FEATURES))
+
+    assert not hasattr(track, "__dict__")
+    assert "track" not in track.features
+    assert set(track.metadata) <= set(Track.METADATA_KEYS)
+    assert track.metadata["artists"] == [{"id": "string", "name": "string"}]
+    assert "available_markets" not in track.metadata["album"]
+
+    # Only the confident intervals, and no segments unless asked for.
+    confident = [i for i in AUDIO_ANALYSIS["sections"] if i["confidence"] > 0.7]
+    assert track.num_sections == len(confident)
+    assert track.num_segments == 0
+    assert list(track.analysis["sections"].columns) == Track.SECTION_COLUMNS
+
+    full = Track(spotify, metadata, dict(AUDIO_FEATURES), segments=True)
+    assert full.analysis["track"]["duration"] == AUDIO_ANALYSIS["track"]["duration"]
+    assert "codestring" not in full.analysis["track"]
+    assert "segments" in full.analysis
+    assert np.array_equal(
+        full.analysis_arrays()["sections"], track.analysis_arrays()["sections"]
+    )
+
+
+def test_engine_import_is_light():
+    code = (
+        "import sys, SimmerTheToads.engine; "
+        "heavy = {'matplotlib', 'seaborn', 'sklearn', 'networkx', 'joblib'}; "
+        "print(sorted(heavy & sys.modules.keys()))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_split_means_matches_pandas():
+    values = np.arange(23, dtype=float).reshape(-1, 1)
+    values[4] = np.nan
+    expected = [
+        split["x"].mean()
+        for split in np.array_split(pd.DataFrame(values, columns=["x"]), 5)
+    ]
+    assert np.allclose(split_means(values, 5).ravel(), expected)
+
+
+def test_growing_matrix():
+    matrix = GrowingMatrix(2, capacity=1)
+    for i in range(5):
+        matrix.append([i, -i])
+    assert len(matrix) == 5
+    assert matrix.array.tolist() == [[i, -i] for i in range(5)]
+
+
+def test_tracks_are_kept_out_of_the_frame():
+    p = Playlist(SpotifyMock(PLAYLIST), "some mock id")
+
+    assert not any(isinstance(v, Track) for v in p.df.to_numpy().ravel())
+    assert p.features.raw.dtype == float
+    tracks = p.ordered_tracks()
+    assert len(tracks) == len(p)
+    assert all(isinstance(t, Track) for t in tracks)
+
+
+def test_simmer_incrementally(synthetic_playlist):
+    backend = FakeSpotifyBackend.synthetic(n_tracks=80, n_catalog=10, seed=4)
+    id = backend.playlist_ids[0]
+    p = synthetic_playlist(backend)
+    previous = compare_evaluators(p, {"tsp": TSPEvaluator})["tsp"]["ids"]
+
+    # Unchanged, the order is kept as is.
+    p = synthetic_playlist(backend)
+    tracks = simmer_playlist(p, TSPEvaluator, previous=previous)
+    assert [i.id for i in tracks] == previous
+
+    track_ids = backend.playlists[id]["track_ids"]
+    removed = {previous[10], previous[50]}
+    added = [i for i in backend.tracks if i not in track_ids][:3]
+    backend.playlists[id]["track_ids"] = [
+        i for i in track_ids if i not in removed
+    ] + added
+    p = synthetic_playlist(backend)
+    calls = dict(backend.calls)
+    ids = [i.id for i in simmer_playlist(p, TSPEvaluator, previous=previous)]
+
+    assert sorted(ids) == sorted(backend.playlists[id]["track_ids"])
+    # Nothing is suggested.
+    assert backend.calls.get("recommendations") == calls.get("recommendations")
+    # Tracks away from the changes keep their order.
+    kept = [i for i in previous if i not in removed]
+    moved = sum(a != b for a, b in zip(kept, [i for i in ids if i in kept]))
+    assert moved <= 5 * (2 * REPAIR_RADIUS + 1)
+
+
+def test_clustering_is_not_incremental(synthetic_playlist):
+    p = synthetic_playlist(n_tracks=10, n_catalog=0)
+    # Its order is by cluster, which a path through the songs would replace.
+    with pytest.raises(NotImplementedError):
+        simmer_playlist(p, ClusteringEvaluator, previous=list(p.df["id"]))
@@ -0,0 +1,340 @@
+import re
+
+import pytest
+from spotipy import Spotify
+from spotipy.exceptions import SpotifyException
+
+from SimmerTheToads.engine import Playlist
+from SimmerTheToads.fake_spotify import FakeSpotify, FakeSpotifyBackend, serve
+
+
+@pytest.fixture
+def backend():
+    return FakeSpotifyBackend.synthetic(n_tracks=120, n_catalog=20, analysis_detail=0.1)
+
+
+@pytest.fixture
+def api(request, monkeypatch, tmp_path):
+    """Serve a synthetic backend, and get a client of the app logged in to it.
+
+    The backend is small, every call made through the API is rate limited.
+    Parametrize the fixture indirectly to pass other options to
+    `FakeSpotifyBackend.synthetic`. Each test has a store of its own.
+    """
+    from SimmerTheToads import app, views
+    from SimmerTheToads.store import shared_store
+
+    options = {"n_tracks": 20, "n_catalog": 0, **getattr(request, "param", {})}
+    backend = FakeSpotifyBackend.synthetic(**options)
+    monkeypatch.setenv("SIMMER_STORE_PATH", str(tmp_path / "store.sqlite3"))
+    shared_store.cache_clear()
+    server = serve(backend)
+    try:
+        prefix = f"http://127.0.0.1:{server.server_port}/v1/"
+        monkeypatch.setattr(views, "SPOTIFY_ACCESS_TOKEN", "fake")
+        monkeypatch.setattr(views, "SPOTIFY_API_PREFIX", prefix)
+        yield backend, app.test_client()
+    finally:
+        server.shutdown()
+        shared_store.cache_clear()
+
+
+def test_synthetic_is_deterministic():
+    a = FakeSpotifyBackend.synthetic(n_tracks=5, n_catalog=0, seed=3)
+    b = FakeSpotifyBackend.synthetic(n_tracks=5, n_catalog=0, seed=3)
+    assert a.playlist_ids == b.playlist_ids
+    assert a.features == b.features
+
+
+def test_playlist_against_fake(backend):
+    spotify = FakeSpotify(backend)
+    p = Playlist(spotify, backend.playlist_ids[0], parallel_fetch=False)
+    assert len(p) == 120
+    # Two pages, two feature batches and one analysis per track.
+    assert backend.calls["playlists/tracks"] == 2
+    assert backend.calls["audio-features"] == 2
+    assert backend.calls["audio-analysis"] == 120
+
+
+def test_write_back(backend):
+    spotify = FakeSpotify(backend)
+    id = backend.playlist_ids[0]
+    track_ids = list(backend.playlists[id]["track_ids"])
+
+    spotify.playlist_reorder_items(id, range_start=0, insert_before=3)
+    assert backend.playlists[id]["track_ids"][:3] == track_ids[1:3] + track_ids[:1]
+
+    spotify.playlist_replace_items(id, track_ids[:5])
+    assert backend.playlists[id]["track_ids"] == track_ids[:5]
+
+    spotify.playlist_add_items(id, track_ids[5:7], position=0)
+    assert backend.playlists[id]["track_ids"] == track_ids[5:7] + track_ids[:5]
+
+
+def test_throttle_injection(backend):
+    backend.throttle = 1.0
+    backend.retry_after = 7
+    with pytest.raises(SpotifyException) as e:
+        FakeSpotify(backend).me()
+    assert e.value.http_status == 429
+    assert e.value.headers["Retry-After"] == "7"
+
+
+@pytest.mark.parametrize(
+    "path", ["", "audio-analysis", "playlists/ID/tracks/more", "unknown"]
+)
+def test_unknown_paths(backend, path):
+    status, _, body = backend.handle("GET", path, {})
+    assert status == 404
+    assert body["error"]["status"] == 404
+
+
+def test_recommendations_exclude_seeds(backend):
+    spotify = FakeSpotify(backend)
+    seed = backend.playlists[backend.playlist_ids[0]]["track_ids"][0]
+    result = spotify.recommendations(seed_tracks=[seed], limit=3, target_energy=0.5)
+    assert len(result["tracks"]) == 3
+    assert seed not in [i["id"] for i in result["tracks"]]
+
+
+def test_save_and_load(backend, tmp_path):
+    backend.save(tmp_path / "recording.json.gz")
+    loaded = FakeSpotifyBackend.load(tmp_path / "recording.json.gz")
+    assert loaded.playlists == backend.playlists
+    assert loaded.features == backend.features
+
+
+def test_http_server(backend):
+    server = serve(backend)
+    try:
+        spotify = Spotify(auth="fake")
+        spotify.prefix = f"http://127.0.0.1:{server.server_port}/v1/"
+        p = Playlist(spotify, backend.playlist_ids[0], parallel_fetch=False)
+        assert len(p) == 120
+    finally:
+        server.shutdown()
+
+
+@pytest.mark.parametrize(
+    "api", [{"n_tracks": 120, "n_catalog": 20, "analysis_detail": 0.1}], indirect=True
+)
+def test_flask_api_against_fake(api):
+    backend, client = api
+    response = client.get(f"/api/playlist/{backend.playlist_ids[0]}/tracks")
+    assert response.status_code == 200
+    assert len(response.json) == 120
+    assert response.headers["Server-Timing"].startswith("playlist_fetch;dur=")
+
+    metrics = client.get("/api/metrics").data.decode()
+    assert 'stage="playlist_fetch"' in metrics
+
+
+def test_simmer_stages(api):
+    backend, client = api
+    id = backend.playlist_ids[0]
+    response = client.get(f"/api/simmered_playlist/{id}/tracks?evaluator=tsp")
+    assert response.status_code == 200
+
+    # Ingested concurrently, each kind of call is still timed on its own.
+    header = response.headers["Server-Timing"]
+    calls = dict(re.findall(r'(\w+);dur=[\d.]+;desc="(\d+) calls', header))
+    assert set(calls) >= {"playlist_fetch", "feature_fetch", "analysis"}
+    assert calls["analysis"] == "20"
+
+    metrics = client.get("/api/metrics").data.decode()
+    for name in ("playlist_fetch", "feature_fetch", "analysis"):
+        assert f'stage="{name}"' in metrics
+
+
+def test_token_needs_a_local_prefix(monkeypatch):
+    from SimmerTheToads import app, views
+
+    # Without a stand-in to send it to, the token must not log anyone in.
+    monkeypatch.setattr(views, "SPOTIFY_ACCESS_TOKEN", "fake")
+    monkeypatch.setattr(views, "SPOTIFY_API_PREFIX", None)
+    monkeypatch.setattr(views, "CLIENT_ID", "id")
+    monkeypatch.setattr(views, "CLIENT_SECRET", "secret")
+    monkeypatch.setattr(views, "REDIRECT_URI", "http://127.0.0.1/callback")
+    response = app.test_client().get("/api/playlists")
+    assert response.status_code == 401
+
+
+def test_compare_endpoint(api):
+    backend, client = api
+    id = backend.playlist_ids[0]
+
+    response = client.get(f"/api/simmered_playlist/{id}/compare?evaluators=tsp,nope")
+    assert response.status_code == 400
+
+    analyses = backend.calls.get("audio-analysis", 0)
+    response = client.get(f"/api/simmered_playlist/{id}/compare")
+    assert response.status_code == 200
+    # The playlist was only ingested once.
+    assert backend.calls["audio-analysis"] - analyses == 20
+
+    track_ids = backend.playlists[id]["track_ids"]
+    assert [i["id"] for i in response.json["tracks"]] == track_ids
+    orderings = response.json["orderings"]
+    assert set(orderings) == {"clustering", "tsp", "chaos"}
+    for v in orderings.values():
+        assert sorted(v["ids"]) == sorted(track_ids)
+        assert v["cost"] == v["score"]["total"] > 0
+        assert v["seconds"] >= 0
+    assert orderings["tsp"]["cost"] < orderings["chaos"]["cost"]
+
+    response = client.get(f"/api/simmered_playlist/{id}/tracks?score=1")
+    assert response.status_code == 200
+    assert len(response.json["tracks"]) >= 20
+    assert len(response.json["score"]["transitions"]) == 19
+
+
+def test_compare_endpoint_on_cpu_pool(api, monkeypatch):
+    from SimmerTheToads import pool
+
+    backend, client = api
+    monkeypatch.setenv("SIMMER_CPU_WORKERS", "3")
+    pool.shutdown()
+    try:
+        response = client.get(
+            f"/api/simmered_playlist/{backend.playlist_ids[0]}/compare"
+        )
+        assert response.status_code == 200
+        assert set(response.json["orderings"]) == {"clustering", "tsp", "chaos"}
+        # The evaluators were handed to the pool, all at once.
+        assert len(pool.cpu_pool()._processes) == 3
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.parametrize("api", [{"n_catalog": 5}], indirect=True)
+def test_update_playlist(api):
+    backend, client = api
+    id = backend.playlist_ids[0]
+    track_ids = list(backend.playlists[id]["track_ids"])
+    suggestion = next(i for i in backend.tracks if i not in track_ids)
+    new = track_ids[5:] + track_ids[:5] + [suggestion]
+
+    response = client.post(f"/api/update_playlist/{id}", json={"ids": "nope"})
+    assert response.status_code == 400
+
+    response = client.post(f"/api/update_playlist/{id}", json=new)
+    assert response.status_code == 200
+    assert backend.playlists[id]["track_ids"] == new
+    assert 0 < response.json["calls"] <= 2
+    snapshot_id = response.json["snapshot_id"]
+
+    # Retrying makes no changes, and only the snapshot is fetched again.
+    fetches = backend.calls["playlists"]
+    response = client.post(
+        f"/api/update_playlist/{id}", json={"ids": new, "snapshot_id": snapshot_id}
+    )
+    assert response.json == {"snapshot_id": snapshot_id, "calls": 0}
+    assert backend.calls["playlists"] == fetches + 1
+
+    # Edits made on Spotify since are planned against, not overwritten.
+    playlist = backend.playlists[id]
+    playlist["track_ids"] = new[1:]
+    playlist["version"] += 1
+    response = client.post(f"/api/update_playlist/{id}", json=new)
+    assert response.status_code == 200
+    assert response.json["calls"] > 0
+    assert backend.playlists[id]["track_ids"] == new
+    snapshot_id = response.json["snapshot_id"]
+
+    response = client.post(
+        f"/api/update_playlist/{id}", json={"ids": track_ids, "snapshot_id": "x"}
+    )
+    assert response.status_code == 409
+    assert backend.playlists[id]["track_ids"] == new
+
+
+@pytest.mark.parametrize("api", [{"n_catalog": 5}], indirect=True)
+def test_simmer_incrementally(api):
+    from SimmerTheToads import views
+
+    backend, client = api
+    id = backend.playlist_ids[0]
+    url = f"/api/simmered_playlist/{id}/tracks?evaluator=tsp&incremental=1"
+
+    # Nothing to start from, simmered in full.
+    response = client.get(url)
+    assert response.status_code == 200
+    first = [i["id"] for i in response.json]
+    assert views.remembered_order(id, "tsp") == first
+
+    playlist = backend.playlists[id]
+    added = [i for i in backend.tracks if i not in playlist["track_ids"]][:2]
+    playlist["track_ids"] = playlist["track_ids"][1:] + added
+    playlist["version"] = playlist.get("version", 0) + 1  # A new snapshot.
+    calls = dict(backend.calls)
+    response = client.get(url)
+    assert response.status_code == 200
+    ids = [i["id"] for i in response.json]
+    assert sorted(ids) == sorted(backend.playlists[id]["track_ids"])
+    assert backend.calls["recommendations"] == calls["recommendations"]
+    # Only the tracks added were fetched.
+    assert backend.calls["audio-analysis"] - calls["audio-analysis"] == len(added)
+    assert views.remembered_order(id, "tsp") == ids
+
+    # Responses depend on the order they start from, not only the snapshot.
+    response = client.get(url)
+    assert [i["id"] for i in response.json] == ids
+    etag = response.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    views.remember_order(id, "tsp", ids[::-1])
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    response = client.get(f"/api/simmered_playlist/{id}/tracks?incremental=1")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("api", [{"latency": 0.01}], indirect=True)
+def test_simmer_requests_are_coalesced(api):
+    from concurrent.futures import ThreadPoolExecutor
+
+    backend, client = api
+    url = f"/api/simmered_playlist/{backend.playlist_ids[0]}/tracks?evaluator=tsp"
+
+    def get(_):
+        return client.application.test_client().get(url)
+
+    with ThreadPoolExecutor(3) as executor:
+        responses = list(executor.map(get, range(3)))
+    assert [i.status_code for i in responses] == [200] * 3
+    assert responses[0].json == responses[1].json == responses[2].json
+    # Simmered once.
+    assert backend.calls["audio-analysis"] == 20
+
+    # Not simmered again for a client that has the response.
+    tag = responses[0].headers["ETag"]
+    response = client.get(url, headers={"If-None-Match": tag})
+    assert response.status_code == 304
+    assert backend.calls["audio-analysis"] == 20
+
+
+def test_responses_are_validated(api):
+    backend, client = api
+    id = backend.playlist_ids[0]
+    url = f"/api/playlist/{id}/tracks"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    tag = response.headers["ETag"]
+
+    pages = backend.calls["playlists/tracks"]
+    response = client.get(url, headers={"If-None-Match": tag})
+    assert response.status_code == 304
+    assert backend.calls["playlists/tracks"] == pages
+
+    # A new snapshot of the playlist, a new tag.
+    backend.playlists[id]["version"] = 1
+    response = client.get(url, headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
+
+    response = client.get("/api/playlists")
+    response = client.get(
+        "/api/playlists", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from SimmerTheToads.engine import (ChaosEvaluator, ClusteringEvaluator,
+                                   TSPEvaluator, simmer_playlist)
+from SimmerTheToads.features import FeatureMatrix
+
+
+@pytest.fixture
+def playlist(synthetic_playlist):
+    return synthetic_playlist(n_tracks=30, n_catalog=20, seed=4)
+
+
+def test_views_are_cached_and_read_only(playlist):
+    matrix = playlist.features
+    assert playlist.features is matrix
+    assert matrix.minmax is matrix.minmax
+    for view in (matrix.raw, matrix.minmax, matrix.robust, matrix.pca):
+        assert view.flags.c_contiguous
+        with pytest.raises(ValueError):
+            view[0, 0] = 1
+
+    assert matrix.columns[-1] == "artist_ord"
+    assert np.isclose(matrix.minmax.min(), 0)
+    assert np.isclose(matrix.minmax.max(), 1)
+
+
+def test_sort_columns_are_not_features():
+    df = pd.DataFrame({"a": [1.0, 2.0], "sort_1": [1, 0], "artist": ["x", "y"]})
+    matrix = FeatureMatrix(df)
+    assert matrix.columns == ("a", "artist_ord")
+    assert matrix.raw.tolist() == [[1, 0], [2, 1]]
+
+
+def test_evaluators_share_features(playlist):
+    df = playlist.df.copy()
+    matrix = playlist.features
+    for evaluator in (TSPEvaluator, ChaosEvaluator, ClusteringEvaluator):
+        playlist.df = df.copy()
+        simmer_playlist(playlist, evaluator)
+        assert "artist_ord" not in playlist.df.columns
+
+    # Suggestions were added since, which invalidates the matrix.
+    assert playlist.features is not matrix
+    assert len(playlist.features) == len(playlist.df)
+    rows = playlist.features.positions(matrix.index)
+    assert np.array_equal(playlist.features.raw[rows, :-1], matrix.raw[:, :-1])
+
+
+def test_shared_features_are_mapped(playlist, tmp_path, monkeypatch):
+    import pickle
+
+    from SimmerTheToads import features
+
+    monkeypatch.setattr(features, "SHARED_DIR", str(tmp_path))
+    matrix = playlist.features
+    with matrix.share(["minmax", "distances"]) as shared:
+        data = pickle.dumps(shared)
+        # Only where the arrays are is sent, along with the labels.
+        labels = pickle.dumps((matrix.columns, matrix.index))
+        assert len(data) < len(labels) + 1024
+        attached = pickle.loads(data)
+        assert isinstance(attached, FeatureMatrix)
+        assert attached.columns == matrix.columns
+        assert attached.index.equals(matrix.index)
+        for view in ("raw", "minmax", "distances"):
+            assert isinstance(getattr(attached, view).base, np.memmap)
+            assert np.array_equal(getattr(attached, view), getattr(matrix, view))
+        # Views that were not shared are computed by the worker.
+        assert np.allclose(attached.robust, matrix.robust)
+        del attached
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,60 @@
+import time
+
+import pandas as pd
+import pytest
+from spotipy import Spotify
+
+from SimmerTheToads.engine import Playlist, stream_tracks
+from SimmerTheToads.fake_spotify import FakeSpotify, FakeSpotifyBackend, serve
+
+
+@pytest.fixture
+def backend():
+    return FakeSpotifyBackend.synthetic(n_tracks=120, n_catalog=0, analysis_detail=0.1)
+
+
+def test_async_matches_sync(backend):
+    spotify = FakeSpotify(backend)
+    id = backend.playlist_ids[0]
+    sync = Playlist(spotify, id, parallel_fetch=False)
+    concurrent = Playlist(spotify, id, async_fetch=True)
+
+    assert concurrent.metadata == sync.metadata
+    pd.testing.assert_frame_equal(concurrent.df, sync.df)
+
+
+def test_async_calls_overlap(backend):
+    backend.latency = 0.2
+    start = time.perf_counter()
+    Playlist(FakeSpotify(backend), backend.playlist_ids[0], async_fetch=True)
+    elapsed = time.perf_counter() - start
+
+    # Two pages, two feature batches, 120 analyses and the metadata.
+    calls = sum(backend.calls.values())
+    assert calls == 125
+    assert elapsed < calls * backend.latency / 3
+
+
+def test_async_over_http(backend):
+    server = serve(backend)
+    try:
+        spotify = Spotify(auth="fake")
+        spotify.prefix = f"http://127.0.0.1:{server.server_port}/v1/"
+        p = Playlist(spotify, backend.playlist_ids[0], async_fetch=True)
+        track_ids = backend.playlists[backend.playlist_ids[0]]["track_ids"]
+        assert list(p.df["id"]) == track_ids
+        assert [t.id for t in p.ordered_tracks()] == track_ids
+    finally:
+        server.shutdown()
+
+
+def test_stream_tracks_is_lazy(backend):
+    tracks = stream_tracks(FakeSpotify(backend), backend.playlist_ids[0], False)
+    first = next(tracks)
+    assert first.id == backend.playlists[backend.playlist_ids[0]]["track_ids"][0]
+    # Only the first page, its features, and one analysis were fetched.
+    assert backend.calls == {
+        "playlists/tracks": 1,
+        "audio-features": 1,
+        "audio-analysis": 1,
+    }
@@ -0,0 +1,94 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from SimmerTheToads import metrics
+from SimmerTheToads.metrics import (Registry, Timings, in_stage,
+                                    record_spotify_call, render, stage)
+from SimmerTheToads.store import SqliteStore
+
+
+def test_stage_without_timings_is_noop():
+    with stage("anything"):
+        record_spotify_call(10)
+
+
+def test_nested_stages_are_exclusive():
+    timings = Timings()
+    token = timings.activate()
+    try:
+        with stage("outer"):
+            record_spotify_call(100)
+            with stage("inner"):
+                time.sleep(0.02)
+                record_spotify_call(50)
+                record_spotify_call(50)
+    finally:
+        Timings.deactivate(token)
+
+    assert timings.stages["inner"]["seconds"] >= 0.02
+    assert timings.stages["outer"]["seconds"] < timings.stages["inner"]["seconds"]
+    assert timings.stages["outer"]["calls"] == 1
+    assert timings.stages["inner"]["calls"] == 2
+    assert timings.stages["inner"]["bytes"] == 100
+
+    header = timings.server_timing()
+    assert "inner;dur=" in header
+    assert "outer;dur=" in header
+    assert '"2 calls, 100 bytes"' in header
+
+
+def test_worker_threads_name_their_stage():
+    timings = Timings()
+    token = timings.activate()
+    try:
+        with stage("ordering"), ThreadPoolExecutor(8) as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    in_stage,
+                    "analysis",
+                    record_spotify_call,
+                    10,
+                )
+                for _ in range(200)
+            ]
+            for f in futures:
+                f.result()
+    finally:
+        Timings.deactivate(token)
+
+    # Not credited to whatever the waiting thread was doing, and none lost.
+    assert timings.stages["analysis"]["calls"] == 200
+    assert timings.stages["analysis"]["bytes"] == 2000
+    assert timings.stages["ordering"]["calls"] == 0
+
+
+def test_publish_is_throttled(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "PUBLISH_INTERVAL", 60)
+    store = SqliteStore(tmp_path / "store.sqlite3", table="metrics")
+    registry = Registry()
+    registry.publish(store)
+    registry.inc("calls_total", "Calls")
+    registry.publish(store)
+    assert "calls_total" not in render(v for _, v in store.items())
+    registry.publish(store, force=True)
+    assert "calls_total" in render(v for _, v in store.items())
+
+
+def test_render_merges_workers():
+    a = Registry()
+    b = Registry()
+    for r in (a, b):
+        r.inc("calls_total", "Calls", 2, stage="analysis")
+        r.observe("latency_seconds", "Latency", 0.3, evaluator="tsp")
+    b.observe("latency_seconds", "Latency", 200, evaluator="tsp")
+
+    text = render([a.snapshot(), b.snapshot()])
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{stage="analysis"} 4.0' in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{evaluator="tsp",le="0.25"} 0' in text
+    assert 'latency_seconds_bucket{evaluator="tsp",le="0.5"} 2' in text
+    assert 'latency_seconds_bucket{evaluator="tsp",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{evaluator="tsp"} 3' in text
@@ -0,0 +1,59 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from SimmerTheToads import pool
+from SimmerTheToads.engine import (ChaosEvaluator, ClusteringEvaluator,
+                                   TSPEvaluator, compare_evaluators,
+                                   simmer_playlist)
+
+SYNTHETIC = {"n_tracks": 20, "n_catalog": 20}
+
+
+@pytest.mark.parametrize("synthetic_playlist", [SYNTHETIC], indirect=True)
+@pytest.mark.parametrize(
+    "evaluator", [TSPEvaluator, ClusteringEvaluator, ChaosEvaluator]
+)
+def test_executor_matches_inline(synthetic_playlist, evaluator):
+    def simmered_ids(executor=None):
+        p = synthetic_playlist(seed=1)
+        return [t.id for t in simmer_playlist(p, evaluator, executor=executor)]
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert simmered_ids(executor) == simmered_ids()
+
+
+@pytest.mark.parametrize("synthetic_playlist", [SYNTHETIC], indirect=True)
+def test_compare_evaluators_on_executor(synthetic_playlist):
+    p = synthetic_playlist(seed=2)
+    evaluators = {
+        "tsp": TSPEvaluator,
+        "chaos": ChaosEvaluator,
+        "clustering": ClusteringEvaluator,
+    }
+    inline = compare_evaluators(p, evaluators)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pooled = compare_evaluators(p, evaluators, executor)
+    for k in evaluators:
+        assert pooled[k]["ids"] == inline[k]["ids"]
+        assert pooled[k]["cost"] == pytest.approx(inline[k]["cost"])
+
+
+def test_cpu_pool_by_default(monkeypatch):
+    monkeypatch.delenv("SIMMER_CPU_WORKERS", raising=False)
+    try:
+        assert pool.cpu_pool()._max_workers == 1
+    finally:
+        pool.shutdown()
+    monkeypatch.setenv("SIMMER_CPU_WORKERS", "0")
+    assert pool.cpu_pool() is None
+
+
+def test_cpu_pool_is_reused(monkeypatch):
+    monkeypatch.setenv("SIMMER_CPU_WORKERS", "1")
+    try:
+        executor = pool.cpu_pool()
+        assert executor is not None
+        assert pool.cpu_pool() is executor
+    finally:
+        pool.shutdown()
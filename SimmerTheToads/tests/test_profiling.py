@@ -0,0 +1,20 @@
+import pstats
+
+from SimmerTheToads.profiling import profiled, request_id
+
+
+def test_request_id():
+    assert request_id("abc-123").startswith("abc-123-")
+    # A repeated ID must not overwrite an earlier profile.
+    assert request_id("abc-123") != request_id("abc-123")
+    assert "/" not in request_id("../../etc/passwd")
+    assert len(request_id(None)) == 32
+
+
+def test_profiled_writes_pstats(tmp_path):
+    with profiled("some-request", tmp_path) as path:
+        sum(range(1000))
+
+    assert path == tmp_path / "some-request.pstats"
+    stats = pstats.Stats(str(path))
+    assert stats.total_calls > 0
@@ -0,0 +1,102 @@
+import pytest
+from spotipy import Spotify
+from spotipy.exceptions import SpotifyException
+
+from SimmerTheToads import ratelimit
+from SimmerTheToads.ratelimit import (BULK, INTERACTIVE, RateLimitedSpotify,
+                                      TokenBucket, lane_for)
+from SimmerTheToads.store import SqliteStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "time", clock.time)
+    monkeypatch.setattr(ratelimit.time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def bucket(tmp_path, clock):
+    store = SqliteStore(tmp_path / "store.sqlite3")
+    return TokenBucket(store, rate=1, capacity=4, bulk_reserve=0.5)
+
+
+def test_lane_for():
+    assert lane_for("audio-analysis/abc") == BULK
+    assert lane_for("audio-features/?ids=a,b") == BULK
+    assert lane_for("https://api.spotify.com/v1/recommendations") == BULK
+    assert lane_for("me/") == INTERACTIVE
+    assert lane_for("https://api.spotify.com/v1/playlists/x/tracks") == INTERACTIVE
+
+
+def test_bucket_bulk_leaves_reserve(bucket):
+    assert bucket.try_acquire(BULK) == 0
+    assert bucket.try_acquire(BULK) == 0
+    assert bucket.try_acquire(BULK) > 0
+
+    # Interactive calls may use the reserve.
+    assert bucket.try_acquire(INTERACTIVE) == 0
+    assert bucket.try_acquire(INTERACTIVE) == 0
+    assert bucket.try_acquire(INTERACTIVE) > 0
+
+
+def test_bucket_is_shared_between_instances(bucket):
+    other = TokenBucket(
+        SqliteStore(bucket.store.path), rate=1, capacity=4, bulk_reserve=0.5
+    )
+    for _ in range(4):
+        assert bucket.try_acquire() == 0
+    assert other.try_acquire() > 0
+
+
+def test_bucket_block(bucket):
+    bucket.block(30)
+    assert bucket.try_acquire() == pytest.approx(30, abs=1)
+
+
+def test_bucket_refills(bucket, clock):
+    for _ in range(4):
+        assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(1)
+    assert bucket.acquire() == pytest.approx(1)
+
+
+def test_retry_after_is_honoured(bucket, clock, monkeypatch):
+    calls = []
+
+    def internal_call(self, method, url, payload, params):
+        calls.append(url)
+        if len(calls) < 3:
+            raise SpotifyException(429, -1, "slow down", headers={"Retry-After": "2"})
+        return {"ok": True}
+
+    monkeypatch.setattr(Spotify, "_internal_call", internal_call)
+
+    spotify = RateLimitedSpotify(auth="token", bucket=bucket)
+    assert spotify.audio_analysis("abc") == {"ok": True}
+    assert len(calls) == 3
+    assert sum(clock.sleeps) >= 4
+
+
+def test_long_retry_after_fails_fast(bucket, monkeypatch):
+    def internal_call(self, method, url, payload, params):
+        raise SpotifyException(429, -1, "slow down", headers={"Retry-After": "3600"})
+
+    monkeypatch.setattr(Spotify, "_internal_call", internal_call)
+    spotify = RateLimitedSpotify(auth="token", bucket=bucket)
+    with pytest.raises(SpotifyException):
+        spotify.me()
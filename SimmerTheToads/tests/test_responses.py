@@ -0,0 +1,65 @@
+import gzip
+
+from flask import Flask, Response, jsonify
+
+from SimmerTheToads import responses
+from SimmerTheToads.responses import (accepted_encoding, compress_response,
+                                      conditional, etag)
+
+app = Flask(__name__)
+
+
+def test_accepted_encoding():
+    with app.test_request_context(headers={"Accept-Encoding": "gzip;q=0.5, br"}):
+        from flask import request
+
+        assert accepted_encoding(request, ("br", "gzip")) == "br"
+        assert accepted_encoding(request, ("gzip",)) == "gzip"
+        assert accepted_encoding(request, ()) is None
+    with app.test_request_context(headers={"Accept-Encoding": "identity"}):
+        from flask import request
+
+        assert accepted_encoding(request, ("br", "gzip")) is None
+
+
+def test_compress_response(monkeypatch):
+    monkeypatch.setattr(responses, "_brotli", lambda: None)
+    body = {"tracks": [{"id": str(i), "name": "Track"} for i in range(200)]}
+    with app.test_request_context(headers={"Accept-Encoding": "br, gzip"}):
+        response = compress_response(jsonify(body))
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.vary
+        assert response.content_length < len(jsonify(body).get_data()) / 4
+        assert gzip.decompress(response.get_data()) == jsonify(body).get_data()
+
+        small = compress_response(jsonify({"id": 1}))
+        assert "Content-Encoding" not in small.headers
+        assert "Accept-Encoding" in small.vary
+        text = compress_response(Response(b"x" * 2048, mimetype="image/png"))
+        assert "Content-Encoding" not in text.headers
+
+    with app.test_request_context():
+        assert "Content-Encoding" not in compress_response(jsonify(body)).headers
+
+
+def test_conditional():
+    tag = etag("tracks", "playlist", "snapshot")
+    assert tag == etag("tracks", "playlist", "snapshot")
+    assert tag != etag("tracks", "playlist", "other snapshot")
+
+    made = []
+
+    def make():
+        made.append(1)
+        return jsonify([1, 2, 3])
+
+    with app.test_request_context():
+        response = conditional(tag, make)
+        assert response.status_code == 200
+        assert response.headers["ETag"] == f'W/"{tag}"'
+        assert response.headers["Cache-Control"] == "private, no-cache"
+    with app.test_request_context(headers={"If-None-Match": f'W/"{tag}"'}):
+        response = conditional(tag, make)
+        assert response.status_code == 304
+        assert response.get_data() == b""
+    assert len(made) == 1
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from SimmerTheToads.engine import (ChaosEvaluator, ClusteringEvaluator,
+                                   TSPEvaluator, compare_evaluators)
+from SimmerTheToads.scoring import score, tour_cost
+
+
+@pytest.fixture
+def playlist(synthetic_playlist):
+    return synthetic_playlist(n_tracks=40, n_catalog=0, seed=5)
+
+
+def test_score(playlist):
+    order = playlist.df.index[::-1]
+    scored = score(playlist, order, n_jumps=3)
+
+    distances = np.array(scored["transitions"])
+    assert len(distances) == len(playlist) - 1
+    assert scored["total"] == pytest.approx(distances.sum())
+    assert scored["total"] == pytest.approx(
+        tour_cost(playlist.features.minmax, playlist.features.positions(order))
+    )
+
+    jumps = scored["largest_jumps"]
+    assert [i["distance"] for i in jumps] == sorted(distances, reverse=True)[:3]
+    ids = playlist.df.loc[order, "id"].tolist()
+    for i in jumps:
+        assert (i["from"], i["to"]) == tuple(ids[i["position"] : i["position"] + 2])
+
+    artists = playlist.df.loc[order, "artist"].tolist()
+    repeats = [a == b for a, b in zip(artists, artists[1:])]
+    assert scored["artist_repeat_rate"] == pytest.approx(np.mean(repeats))
+
+
+def test_score_single_track(playlist):
+    scored = score(playlist, playlist.df.index[:1])
+    assert scored["total"] == 0
+    assert scored["largest_jumps"] == []
+    assert scored["artist_repeat_rate"] == 0
+
+
+def test_orders_beat_the_original(playlist):
+    original = score(playlist)["total"]
+    orderings = compare_evaluators(
+        playlist,
+        {
+            "tsp": TSPEvaluator,
+            "clustering": ClusteringEvaluator,
+            "chaos": ChaosEvaluator,
+        },
+    )
+    assert orderings["tsp"]["cost"] < original
+    assert orderings["clustering"]["cost"] < original
+    assert orderings["chaos"]["cost"] > original
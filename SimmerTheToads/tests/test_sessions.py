@@ -0,0 +1,97 @@
+from time import time as _now
+
+import pytest
+from flask import Flask, session
+from flask_session import Session
+
+from SimmerTheToads.sessions import SqliteSessionInterface
+from SimmerTheToads.store import SqliteStore
+
+
+class RedisStandIn:
+    """Speak just enough of the redis client API for flask-session."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        value, expires = self.data.get(name, (None, 0))
+        return value if expires > _now() else None
+
+    def setex(self, name, time, value):
+        self.data[name] = (value, _now() + time)
+
+    def delete(self, name):
+        self.data.pop(name, None)
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY="test", **config)
+
+    @app.route("/set/<value>")
+    def set_value(value):
+        session["value"] = value
+        return "ok"
+
+    @app.route("/get")
+    def get_value():
+        return session.get("value", "")
+
+    return app
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SqliteStore(tmp_path / "store.sqlite3")
+
+
+def test_store_set_get_delete(store):
+    store.set("a", b"1", ttl=60)
+    assert store.get("a") == b"1"
+    store.delete("a")
+    assert store.get("a") is None
+
+
+def test_store_expired_keys_are_hidden_and_swept(store):
+    store.set("a", b"1", ttl=-1)
+    assert store.get("a") is None
+    assert len(store) == 1
+    assert store.sweep() == 1
+    assert len(store) == 0
+
+
+def test_store_stays_bounded(tmp_path):
+    store = SqliteStore(tmp_path / "store.sqlite3", max_entries=5, sweep_interval=5)
+    for i in range(25):
+        store.set(str(i), b"x", ttl=60 + i)
+
+    assert len(store) <= 5
+    # The entries expiring last survive.
+    assert store.get("24") == b"x"
+    assert store.get("0") is None
+
+
+def test_sqlite_session_roundtrip(store):
+    app = make_app(SESSION_TYPE="custom")
+    app.session_interface = SqliteSessionInterface(store)
+    Session(app)
+
+    client = app.test_client()
+    client.get("/set/toad")
+    assert client.get("/get").data == b"toad"
+    assert len(store) == 1
+
+    # A fresh client has no session.
+    assert app.test_client().get("/get").data == b""
+
+
+def test_redis_session_roundtrip():
+    redis = RedisStandIn()
+    app = make_app(SESSION_TYPE="redis", SESSION_REDIS=redis)
+    Session(app)
+
+    client = app.test_client()
+    client.get("/set/toad")
+    assert client.get("/get").data == b"toad"
+    assert len(redis.data) == 1
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from SimmerTheToads.singleflight import SingleFlight
+from SimmerTheToads.store import SqliteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SqliteStore(tmp_path / "store.sqlite3", table="singleflight")
+
+
+def test_coalesces_within_worker(store):
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b"result"
+
+    # One thread each for the leader, its followers and the other key.
+    with ThreadPoolExecutor(5) as executor:
+        leader = executor.submit(SingleFlight(store).do, "a", work)
+        started.wait(5)
+        followers = [
+            executor.submit(SingleFlight(store).do, "a", work) for _ in range(3)
+        ]
+        other = executor.submit(SingleFlight(store).do, "b", lambda: b"other")
+        assert other.result(5) == b"other"
+        release.set()
+        assert [f.result(5) for f in [leader, *followers]] == [b"result"] * 4
+    assert len(calls) == 1
+
+
+def test_leader_failure_reaches_followers(store):
+    started = threading.Event()
+
+    def work():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError("failed")
+
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(SingleFlight(store).do, "a", work)
+        started.wait(5)
+        follower = executor.submit(SingleFlight(store).do, "a", work)
+        for f in (leader, follower):
+            with pytest.raises(RuntimeError):
+                f.result(5)
+
+    # The lease is released, the next caller runs the work.
+    assert SingleFlight(store).do("a", lambda: b"again") == b"again"
+
+
+def test_coalesces_across_workers(store):
+    # Another worker is running the work.
+    store.set("lease:a", b"someone else", 60)
+    flight = SingleFlight(store, poll_interval=0.01)
+
+    def publish():
+        time.sleep(0.1)
+        store.set("result:a", b"theirs", 10)
+        store.delete("lease:a")
+
+    threading.Thread(target=publish).start()
+    assert flight.do("a", lambda: b"mine") == b"theirs"
+
+
+def test_takes_over_expired_lease(store):
+    store.set("lease:a", b"crashed", 0.1)
+    flight = SingleFlight(store, poll_interval=0.01)
+    assert flight.do("a", lambda: b"mine") == b"mine"
+    assert store.get("lease:a") is None
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import scipy.spatial
+
+from SimmerTheToads.solver import (cheapest_insertion, farthest_neighbour,
+                                   max_dispersion, path_length, repair,
+                                   two_opt)
+
+
+@pytest.fixture
+def points():
+    return np.random.default_rng(0).random((60, 5))
+
+
+@pytest.fixture
+def distances(points):
+    return scipy.spatial.distance_matrix(points, points)
+
+
+def test_farthest_neighbour(distances):
+    path = farthest_neighbour(distances)
+    assert sorted(path) == list(range(len(distances)))
+    for a, b in zip(path, path[1:]):
+        assert distances[a, b] == max(
+            distances[a, i] for i in path[path.index(a) + 1 :]
+        )
+    assert farthest_neighbour(np.zeros((0, 0))) == []
+
+
+@pytest.mark.parametrize("maximize", [False, True])
+def test_two_opt(distances, maximize):
+    start = list(range(len(distances)))
+    path = two_opt(distances, start, maximize=maximize, budget=10)
+    assert sorted(path) == start
+    before, after = path_length(distances, start), path_length(distances, path)
+    assert after > before if maximize else after < before
+
+    # A local optimum: no single reversal improves it further.
+    assert two_opt(distances, path, maximize=maximize, budget=10) == path
+
+
+def test_max_dispersion(distances):
+    path = max_dispersion(distances, budget=10)
+    assert sorted(path) == list(range(len(distances)))
+    assert path_length(distances, path) >= path_length(
+        distances, farthest_neighbour(distances)
+    )
+    assert max_dispersion(distances[:1, :1]) == [0]
+    assert max_dispersion(distances[:2, :2]) in ([0, 1], [1, 0])
+
+
+@pytest.mark.parametrize("maximize", [False, True])
+def test_cheapest_insertion(points, distances, maximize):
+    path = list(range(50))
+    for row in range(50, 60):
+        inserted = cheapest_insertion(points, path, [row], maximize=maximize)
+        candidates = [path[:k] + [row] + path[k:] for k in range(len(path) + 1)]
+        lengths = [path_length(distances, i) for i in candidates]
+        best = max(lengths) if maximize else min(lengths)
+        assert path_length(distances, inserted) == pytest.approx(best)
+        path = inserted
+    assert cheapest_insertion(points, [], [3, 4]) in ([3, 4], [4, 3])
+
+
+def test_repair(points, distances):
+    path = list(range(60))
+    repaired = repair(points, path, [30], radius=5, budget=10)
+    assert repaired[:25] == path[:25] and repaired[36:] == path[36:]
+    assert sorted(repaired) == path
+    assert path_length(distances, repaired) < path_length(distances, path)
+    assert repair(points, path, []) == path
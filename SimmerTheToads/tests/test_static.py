@@ -0,0 +1,70 @@
+import gzip
+
+import pytest
+
+from SimmerTheToads.static import IMMUTABLE, REVALIDATE, precompress
+
+SCRIPT = b"console.log('simmer');\n" * 200
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    from SimmerTheToads import views
+
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "index.html").write_text("<html>" + " " * 2000 + "</html>")
+    (tmp_path / "robots.txt").write_text("User-agent: *\n")
+    (tmp_path / "static" / "js" / "main.3f1e2a9c.js").write_bytes(SCRIPT)
+    (tmp_path / "static" / "logo.png").write_bytes(b"\x89PNG" * 1000)
+    monkeypatch.setattr(views, "template_dir", tmp_path)
+    monkeypatch.setattr(views, "static_dir", tmp_path / "static")
+    return tmp_path
+
+
+def test_precompress(build):
+    assert precompress(build) >= 2
+    assert (build / "static" / "js" / "main.3f1e2a9c.js.gz").exists()
+    assert (build / "index.html.gz").exists()
+    # Too small, or already compressed.
+    assert not (build / "robots.txt.gz").exists()
+    assert not (build / "static" / "logo.png.gz").exists()
+    # Up to date.
+    assert precompress(build) == 0
+
+
+def test_assets_are_immutable(build):
+    from SimmerTheToads import app
+
+    precompress(build)
+    client = app.test_client()
+    url = "/static/js/main.3f1e2a9c.js"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == IMMUTABLE
+    assert "Accept-Encoding" in response.vary
+    assert response.mimetype in ("application/javascript", "text/javascript")
+    assert gzip.decompress(response.get_data()) == SCRIPT
+
+    response = client.get(url)
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data() == SCRIPT
+
+    assert client.get("/static/logo.png").headers["Cache-Control"] == REVALIDATE
+    assert client.get("/static/missing.js").status_code == 404
+    assert client.get("/static/../index.html").status_code == 404
+
+
+def test_index_is_revalidated(build):
+    from SimmerTheToads import app
+
+    client = app.test_client()
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == REVALIDATE
+    response = client.get("/", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+
+    response = client.get("/robots.txt")
+    assert response.get_data() == b"User-agent: *\n"
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from SimmerTheToads.engine import Playlist
+from SimmerTheToads.fake_spotify import FakeSpotify, FakeSpotifyBackend
+from SimmerTheToads.writeback import (longest_increasing_subsequence, plan,
+                                      write_back)
+
+
+@pytest.fixture
+def backend():
+    return FakeSpotifyBackend.synthetic(n_tracks=250, n_catalog=50, seed=2)
+
+
+def writes(backend):
+    return backend.calls.get("playlists/tracks", 0)
+
+
+def test_longest_increasing_subsequence():
+    values = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5]
+    positions = longest_increasing_subsequence(values)
+    assert len(positions) == 4
+    subsequence = [values[i] for i in positions]
+    assert subsequence == sorted(set(subsequence))
+    assert longest_increasing_subsequence([]) == []
+
+
+def test_moving_one_track_is_one_call():
+    old = [str(i) for i in range(300)]
+    new = old[:10] + old[11:250] + old[10:11] + old[250:]
+    assert plan(old, new) == [
+        {"op": "reorder", "range_start": 10, "range_length": 1, "insert_before": 250}
+    ]
+    assert plan(old, old) == []
+
+
+def test_moved_runs_are_one_call():
+    old = [str(i) for i in range(300)]
+    new = old[200:260] + old[:200] + old[260:]
+    assert len(plan(old, new)) == 1
+
+
+def test_shuffle_is_rewritten():
+    old = [str(i) for i in range(1000)]
+    new = random.Random(0).sample(old, len(old))
+    operations = plan(old, new)
+    assert [i["op"] for i in operations] == ["replace"] + ["add"] * 9
+    assert sum((i["items"] for i in operations), []) == new
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_write_back_matches(backend, seed):
+    rng = random.Random(seed)
+    id = backend.playlist_ids[0]
+    spotify = FakeSpotify(backend)
+    catalog = list(backend.tracks)
+
+    old = list(backend.playlists[id]["track_ids"])
+    old[5] = old[7]  # A repeated track.
+    backend.playlists[id]["track_ids"] = list(old)
+    new = rng.sample(old, rng.randint(1, len(old)))
+    for _ in range(rng.randint(0, 150)):
+        new.insert(rng.randint(0, len(new)), rng.choice(catalog))
+    if seed % 2:
+        # Mostly in order, as a simmered playlist with suggestions.
+        new = sorted(new, key=lambda i: old.index(i) if i in old else rng.random())
+
+    snapshot = spotify.playlist(id)["snapshot_id"]
+    result = write_back(spotify, id, old, new, snapshot)
+    assert backend.playlists[id]["track_ids"] == new
+    assert result == spotify.playlist(id)["snapshot_id"]
+
+
+def test_playlist_to_spotify(backend):
+    id = backend.playlist_ids[0]
+    spotify = FakeSpotify(backend)
+    p = Playlist(spotify, id, parallel_fetch=False)
+    track_ids = list(backend.playlists[id]["track_ids"])
+
+    p.df = p.df.iloc[::-1]
+    calls = writes(backend)
+    p.to_spotify()
+    assert backend.playlists[id]["track_ids"] == track_ids[::-1]
+    # Rewritten, in fewer calls than moving every track.
+    assert writes(backend) - calls == 3
+
+    # Later writes are made against the new order and snapshot.
+    p.df = p.df.iloc[::-1]
+    p.to_spotify()
+    assert backend.playlists[id]["track_ids"] == track_ids
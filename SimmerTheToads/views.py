@@ -1,16 +1,33 @@
 """Contains all the 'views' that the flask application itself uses."""
+import asyncio
+import contextlib
 import functools
+import hashlib
+import json
 import os
+import pickle
+import time
 
 import spotipy
-from flask import (Blueprint, jsonify, redirect, render_template, request,
-                   send_from_directory, session)
+from flask import Blueprint, Response, g, jsonify, redirect, request, session
 from spotipy.oauth2 import SpotifyOAuth
 
 from . import static_dir, template_dir
 from .engine import (ChaosEvaluator, ClusteringEvaluator, Playlist,
-                     TSPEvaluator, batched, simmer_playlist)
+                     TSPEvaluator, batched, compare_evaluators,
+                     simmer_playlist)
+from .ingest import ingest_playlists
+from .metrics import REGISTRY, Timings, render, stage
+from .pool import cpu_pool
+from .profiling import PROFILE_USERS, profiled, request_id
+from .ratelimit import RateLimitedSpotify
+from .responses import compress_response, conditional, etag
+from .scoring import score
+from .singleflight import SingleFlight
+from .static import send_static
+from .store import shared_store
 from .version import __version__
+from .writeback import apply, forget, plan, remember, remembered, remote_state
 
 # Retrieve these values from the spotify developer dashboard:
 #   https://developer.spotify.com/dashboard/applications
@@ -20,6 +37,29 @@ CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 REDIRECT_URI = os.getenv("REDIRECT_URI")
 
+# Only for benchmarks and load tests against a local stand-in of the WebAPI,
+# see fake_spotify.py. Every request is then made on behalf of the same token,
+# logged in or not, so the token is ignored unless the prefix is set too.
+SPOTIFY_API_PREFIX = os.getenv("SPOTIFY_API_PREFIX")
+SPOTIFY_ACCESS_TOKEN = os.getenv("SPOTIFY_ACCESS_TOKEN")
+
+EVALUATORS = {
+    "clustering": ClusteringEvaluator,
+    "tsp": TSPEvaluator,
+    "chaos": ChaosEvaluator,
+}
+
+# Most tracks a Spotify playlist can hold.
+MAX_PLAYLIST_TRACKS = 10_000
+
+# Seconds the order a playlist was simmered in is kept for, to re-simmer it
+# incrementally (see `get_simmered_playlist`).
+ORDER_TTL = float(os.getenv("SIMMER_ORDER_TTL", 30 * 24 * 3600))
+
+# Most playlists whose tracks are kept for the same purpose, a few megabytes
+# each (see `remember_tracks`).
+TRACKS_MAX_PLAYLISTS = int(os.getenv("SIMMER_TRACKS_MAX_PLAYLISTS", 200))
+
 # This needs to be set in your spotify dashboard!
 OAUTH_SCOPES = [
     "playlist-read-private",
@@ -33,7 +73,6 @@ frontend_bp = Blueprint(
     "frontend_bp",
     __name__,
     template_folder=str(template_dir.absolute()),
-    static_folder=str(static_dir.absolute()),
 )
 api_bp = Blueprint(
     "api_bp",
@@ -49,14 +88,19 @@ CLOSE_IF_CHILD_JS = r"""<script>
 @frontend_bp.route("/")
 def frontend_index():
     """Return anything the frontend needs."""
-    return render_template("index.html")
+    return send_static(template_dir, "index.html")
 
 
 @frontend_bp.route("/robots.txt")
 def robots():
     """Return robots.txt."""
-    print(frontend_bp.static_folder)
-    return send_from_directory(frontend_bp.template_folder, "robots.txt")
+    return send_static(template_dir, "robots.txt")
+
+
+@frontend_bp.route("/static/<path:filename>")
+def frontend_static(filename):
+    """Return an asset of the frontend build."""
+    return send_static(static_dir, filename)
 
 
 def logged_in(func):
@@ -65,7 +109,8 @@ def logged_in(func):
     When used as a decarator, this function will automatically reject requests
     with error 401 if there is no cached user login available. If there is a
     user logged in, the request is passed transparently to the function, along
-    with an authenticated spotipy.Client.Spotify object.
+    with an authenticated spotipy.Client.Spotify object. Every call made with
+    that object is throttled by the host wide Spotify rate limiter.
 
     :param func: Function to guard against unauthenticate usage
     :returns: func
@@ -80,6 +125,11 @@ def logged_in(func):
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        if SPOTIFY_ACCESS_TOKEN and SPOTIFY_API_PREFIX:
+            spotify = RateLimitedSpotify(auth=SPOTIFY_ACCESS_TOKEN)
+            spotify.prefix = SPOTIFY_API_PREFIX
+            return func(*args, **kwargs, spotify=spotify)
+
         cache_handler = spotipy.cache_handler.FlaskSessionCacheHandler(session)
         auth_manager = SpotifyOAuth(
             cache_handler=cache_handler,
@@ -91,12 +141,73 @@ def logged_in(func):
         if not auth_manager.validate_token(cache_handler.get_cached_token()):
             return jsonify({"message": "Access denied"}), 401
 
-        spotify = spotipy.Spotify(auth_manager=auth_manager)
+        spotify = RateLimitedSpotify(auth_manager=auth_manager)
+        if SPOTIFY_API_PREFIX:
+            spotify.prefix = SPOTIFY_API_PREFIX
         return func(*args, **kwargs, spotify=spotify)
 
     return wrapper
 
 
+@api_bp.before_request
+def start_timings():
+    """Record the time spent in each stage of the request."""
+    g.start = time.perf_counter()
+    g.timings = Timings()
+    g.timings_token = g.timings.activate()
+
+
+@api_bp.after_request
+def add_server_timing(response):
+    """Report the stages of the request with a Server-Timing header."""
+    timings = g.get("timings")
+    if timings is None or request.endpoint == "api_bp.metrics":
+        return response
+
+    labels = {"endpoint": request.endpoint}
+    if "evaluator" in g:
+        labels["evaluator"] = g.evaluator
+
+    REGISTRY.observe(
+        "api_request_seconds",
+        "Time to answer API requests",
+        time.perf_counter() - g.start,
+        **labels,
+    )
+    if timings.stages:
+        response.headers["Server-Timing"] = timings.server_timing()
+        REGISTRY.observe_timings(timings, **labels)
+    REGISTRY.publish(shared_store("metrics"))
+
+    return response
+
+
+@api_bp.after_request
+def compress(response):
+    """Compress large responses, see `responses`."""
+    return compress_response(response)
+
+
+@api_bp.teardown_request
+def stop_timings(exc):
+    """Deactivate the Timings of the request."""
+    token = g.pop("timings_token", None)
+    if token is not None:
+        Timings.deactivate(token)
+
+
+@api_bp.get("/metrics")
+def metrics():
+    """Get the metrics of every worker in Prometheus text format.
+
+    Other workers publish theirs every few seconds, this one is up to date.
+    """
+    store = shared_store("metrics")
+    REGISTRY.publish(store, force=True)
+    snapshots = [v for _, v in store.items("metrics:")]
+    return Response(render(snapshots), mimetype="text/plain; version=0.0.4")
+
+
 @api_bp.route("/")
 def api_index():
     """Template response."""
@@ -184,36 +295,48 @@ def playlists(spotify):
     items = [i for i in items if i["owner"]["id"] == my_id]
     playlists["items"] = items
 
-    return jsonify(playlists)
+    tag = etag("playlists", my_id, *(f"{i['id']}:{i['snapshot_id']}" for i in items))
+    return conditional(tag, lambda: jsonify(playlists))
 
 
 @api_bp.get("/playlist/<id>/tracks")
 @logged_in
 def get_playlist_tracks(spotify, id):
-    """Get all the tracks of the playlist."""
-    # Validate the playlist ID
-    track_items = []
-    result = spotify.user_playlist_tracks(playlist_id=id)
-    track_items.extend(result["items"])
-    while result["next"]:
-        result = spotify.next(result)
-        track_items.extend(result["items"])
+    """Get all the tracks of the playlist.
+
+    Tagged with the snapshot of the playlist, the tracks are only fetched if
+    the client does not have them already.
+    """
+    with stage("playlist_fetch"):
+        snapshot_id = spotify.playlist(id, fields="snapshot_id")["snapshot_id"]
+
+    def tracks():
+        track_items = []
+        with stage("playlist_fetch"):
+            result = spotify.user_playlist_tracks(playlist_id=id)
+            track_items.extend(result["items"])
+            while result["next"]:
+                result = spotify.next(result)
+                track_items.extend(result["items"])
 
-    # Remove redundant information from responses
-    track_items = [i["track"] for i in track_items]
+        # Remove redundant information from responses
+        track_items = [i["track"] for i in track_items]
 
-    for i in track_items:
-        del i["available_markets"]
-        del i["album"]["available_markets"]
+        for i in track_items:
+            del i["available_markets"]
+            del i["album"]["available_markets"]
 
-    return jsonify(track_items)
+        return jsonify(track_items)
+
+    return conditional(etag("tracks", id, snapshot_id), tracks)
 
 
 def ids_to_tracks(spotify, ids):
     """Convert a list of IDs to spotify track metadata."""
     result = []
-    for batch in batched(ids, 50):
-        result.extend(spotify.tracks(list(batch))["tracks"])
+    with stage("track_metadata"):
+        for batch in batched(ids, 50):
+            result.extend(spotify.tracks(list(batch))["tracks"])
 
     for i, v in enumerate(result):
         del v["available_markets"]
@@ -223,35 +346,251 @@ def ids_to_tracks(spotify, ids):
     return result
 
 
+def remember_order(id, evaluator, ids):
+    """Remember the order a playlist was simmered in by an evaluator."""
+    value = json.dumps(list(ids)).encode()
+    shared_store("orders").set(f"order:{id}:{evaluator}", value, ORDER_TTL)
+
+
+def remembered_order(id, evaluator):
+    """Get the order a playlist was last simmered in by an evaluator, if any."""
+    value = shared_store("orders").get(f"order:{id}:{evaluator}")
+    return None if value is None else json.loads(value)
+
+
+def _tracks_store():
+    # Two entries per playlist, swept often since they are large.
+    return shared_store(
+        "tracks", max_entries=2 * TRACKS_MAX_PLAYLISTS, sweep_interval=10
+    )
+
+
+def remember_tracks(p: Playlist) -> None:
+    """Remember the tracks of a playlist, with their analysis, by its snapshot.
+
+    Only the tracks of the last snapshot remembered are kept, and they are
+    only saved again once the snapshot changes. See `fetch_changes`.
+    """
+    store = _tracks_store()
+    snapshot = str(p.snapshot_id)
+    last = store.get(f"tracks:{p.id}")
+    if last is not None and last.decode() == snapshot:
+        return
+
+    tracks = {i: p.tracks[i] for i in p.remote_ids}
+    # The snapshot first, so that it is evicted before its tracks are.
+    store.set(f"tracks:{p.id}", snapshot.encode(), ORDER_TTL)
+    store.set(f"tracks:{p.id}:{snapshot}", pickle.dumps(tracks), ORDER_TTL)
+    if last is not None:
+        store.delete(f"tracks:{p.id}:{last.decode()}")
+
+
+def fetch_changes(spotify, id) -> Playlist:
+    """Fetch a playlist, fetching only the tracks it gained since remembered.
+
+    The items of the playlist are fetched again, but the features and analysis
+    of the tracks remembered with `remember_tracks` are not.
+    """
+    store = _tracks_store()
+    known = {}
+    last = store.get(f"tracks:{id}")
+    if last is not None:
+        value = store.get(f"tracks:{id}:{last.decode()}")
+        if value is not None:
+            known = pickle.loads(value)
+
+    with stage("ingest"):
+        [(metadata, items)], tracks = asyncio.run(
+            ingest_playlists(spotify, [id], known=known)
+        )
+    ids = [i["track"]["id"] for i in items]
+    return Playlist.from_tracks(spotify, id, metadata, [tracks[i] for i in ids])
+
+
 @api_bp.get("/simmered_playlist/<id>/tracks")
 @logged_in
 def get_simmered_playlist(spotify, id):
-    """Reorder a playlist and return the metadata."""
-    evaluators = {
-        "clustering": ClusteringEvaluator,
-        "tsp": TSPEvaluator,
-        "chaos": ChaosEvaluator,
-    }
-    # TODO: Parallel fetching doesn't currently work, child threads cannot use
-    # the request context used by the token session management of Spotipy.
-    # As a result, this is kinda slow...
+    """Reorder a playlist and return the metadata.
+
+    With `score=1`, an object is returned instead of the list of tracks, with
+    the tracks ("tracks") and the score of the new order of the playlist's own
+    tracks, leaving suggestions out ("score", see `scoring.score`).
+
+    With `incremental=1`, a playlist simmered before with the same evaluator
+    keeps that order: only the songs added or removed since are placed, and
+    no songs are suggested. Only the songs added are fetched, the others are
+    remembered from then. Only the evaluators that order by distance (tsp and
+    chaos) can do so, others answer 400.
+
+    Identical requests for the same snapshot of a playlist made while one is
+    running, by any worker, wait for its response rather than simmering the
+    playlist again (see `singleflight`). Unless written back, responses are
+    tagged with that snapshot, the evaluator and the options, and are not
+    simmered again for a client that already has them.
+    """
     eval_key = request.args.get("evaluator", "clustering").lower()
-    e = evaluators[eval_key]
+    e = EVALUATORS[eval_key]
+    g.evaluator = eval_key
+
+    to_spotify = request.args.get("to_spotify", "") in ("1", "true")
+    scored = request.args.get("score", "") in ("1", "true")
+    incremental = request.args.get("incremental", "") in ("1", "true")
+    if incremental and not e.incremental:
+        message = f"The {eval_key} evaluator cannot simmer incrementally"
+        return jsonify({"message": message}), 400
+
+    profile = contextlib.nullcontext()
+    if request.args.get("profile") and PROFILE_USERS:
+        if spotify.me().get("id") in PROFILE_USERS:
+            g.request_id = request_id(request.headers.get("X-Request-ID"))
+            profile = profiled(g.request_id)
+
+    previous = remembered_order(id, eval_key) if incremental else None
+
+    def simmer():
+        with profile:
+            # Ingestion threads run in a copy of the request context, so the
+            # token in the session is available to them.
+            if previous is not None:
+                p = fetch_changes(spotify, id)
+            else:
+                p = Playlist(spotify, id, async_fetch=True)
+            if e.incremental:
+                remember_tracks(p)
+            # Suggested tracks have no analysis, score without them.
+            features = p.features if scored else None
+            tracks = simmer_playlist(
+                p,
+                evaluator=e,
+                to_spotify=to_spotify,
+                executor=cpu_pool(),
+                previous=previous,
+            )
+        new_track_ids = [i.id for i in tracks]
+        remember(shared_store("snapshots"), p.id, p.snapshot_id, p.remote_ids)
+        remember_order(p.id, eval_key, new_track_ids)
+
+        body = ids_to_tracks(spotify, new_track_ids)
+        if scored:
+            order = p.df.index[p.df.index.isin(features.index)]
+            body = {"tracks": body, "score": score(p, order, features=features)}
+        return jsonify(body).get_data()
+
+    if "request_id" in g:
+        # Profiles are of a simmer of their own.
+        response = Response(simmer(), mimetype="application/json")
+        response.headers["X-Profile-Id"] = g.request_id
+        return response
+
+    with stage("playlist_fetch"):
+        snapshot_id = spotify.playlist(id, fields="snapshot_id")["snapshot_id"]
+    key = f"simmer:{id}:{snapshot_id}:{eval_key}:{scored:d}{incremental:d}"
+    if previous is not None:
+        # The result depends on the order it starts from too.
+        key += ":" + hashlib.sha1(json.dumps(previous).encode()).hexdigest()
+    if to_spotify:
+        # Only ever written back on behalf of the user asking.
+        key += f":write:{spotify.me()['id']}"
+
+    def make():
+        data = SingleFlight(shared_store("singleflight")).do(key, simmer)
+        return Response(data, mimetype="application/json")
+
+    if to_spotify:
+        return make()
+    return conditional(etag(key), make)
+
+
+@api_bp.get("/simmered_playlist/<id>/compare")
+@logged_in
+def compare_simmered_playlist(spotify, id):
+    """Reorder a playlist with several evaluators, fetching it only once.
 
-    to_spotify = request.args.get("to_spotify", False)
-    p = Playlist(spotify, id, parallel_fetch=False)
+    The evaluators run at once on the CPU pool of the worker (see `pool`).
 
-    tracks = simmer_playlist(p, evaluator=e, to_spotify=to_spotify)
-    new_track_ids = [i.id for i in tracks]
+    Query parameters:
+        evaluators: Comma separated evaluators to compare (default: all).
 
-    return jsonify(ids_to_tracks(spotify, new_track_ids))
+    Returns the tracks of the playlist in their current order, and for each
+    evaluator the track IDs in its order, the cost of that order, and the
+    seconds it took. No tracks are suggested, and nothing is written back.
+    """
+    names = request.args.get("evaluators", ",".join(EVALUATORS)).lower().split(",")
+    unknown = [i for i in names if i not in EVALUATORS]
+    if unknown:
+        return jsonify({"message": f"Unknown evaluators: {', '.join(unknown)}"}), 400
+    g.evaluator = "compare"
+
+    p = Playlist(spotify, id, async_fetch=True)
+    remember(shared_store("snapshots"), p.id, p.snapshot_id, p.remote_ids)
+    with stage("ordering"):
+        orderings = compare_evaluators(
+            p, {i: EVALUATORS[i] for i in names}, executor=cpu_pool()
+        )
+
+    tracks = []
+    for i, track in enumerate(p.ordered_tracks()):
+        metadata = dict(track.metadata)
+        metadata["index"] = i
+        tracks.append(metadata)
+
+    return jsonify({"tracks": tracks, "orderings": orderings})
 
 
 @api_bp.post("/update_playlist/<id>")
 @logged_in
 def update_playlist(spotify, id):
-    """Update a playlist on spotify with a list of given track IDs."""
-    raise NotImplementedError
+    """Update a playlist on spotify with a list of given track IDs.
+
+    The body is the track IDs in their new order, or an object with them
+    ("ids") and the snapshot of the playlist they were ordered from
+    ("snapshot_id"). Changes are planned against the order remembered when
+    the playlist was last fetched or written, which is only fetched again if
+    it was forgotten or the playlist changed on Spotify since (its snapshot is
+    checked first), and written with as few calls as possible. Saving the
+    same order again makes no write calls.
+
+    Returns the new snapshot of the playlist ("snapshot_id") and the number of
+    write calls made ("calls"). Answers 409 if the given snapshot is not the
+    remembered one.
+    """
+    body = request.get_json(silent=True)
+    snapshot_id = None
+    if isinstance(body, dict):
+        snapshot_id = body.get("snapshot_id")
+        body = body.get("ids")
+    if not isinstance(body, list) or not all(isinstance(i, str) and i for i in body):
+        return jsonify({"message": "Expected a list of track IDs"}), 400
+    if len(body) > MAX_PLAYLIST_TRACKS:
+        return (
+            jsonify({"message": f"At most {MAX_PLAYLIST_TRACKS} tracks are allowed"}),
+            400,
+        )
+
+    store = shared_store("snapshots")
+    state = remembered(store, id)
+    if state is not None:
+        # The playlist may have been edited on Spotify since.
+        with stage("playlist_fetch"):
+            current = spotify.playlist(id, fields="snapshot_id")["snapshot_id"]
+        if current != state[0]:
+            state = None
+    if state is None:
+        with stage("playlist_fetch"):
+            state = remote_state(spotify, id)
+    if snapshot_id is not None and snapshot_id != state[0]:
+        return jsonify({"message": "The playlist has changed since"}), 409
+
+    operations = plan(state[1], body)
+    try:
+        with stage("write_back"):
+            snapshot_id = apply(spotify, id, operations, state[0])
+    except Exception:
+        # Part of the changes may have been made, start over from Spotify.
+        forget(store, id)
+        raise
+    remember(store, id, snapshot_id, body)
+    return jsonify({"snapshot_id": snapshot_id, "calls": len(operations)})
 
 
 @api_bp.get("/me")
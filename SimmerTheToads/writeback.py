@@ -0,0 +1,280 @@
+"""Write a new order of a playlist back to Spotify with as few changes as possible.
+
+Rather than replacing every track, which is limited to 100 tracks per call,
+the difference between the order on Spotify and the new one is planned as:
+
+1. Removals of the tracks that are no longer wanted.
+2. Moves of ranges of tracks. Tracks on a longest increasing subsequence of
+   the new order stay where they are; runs of the others are moved together.
+3. Additions of the new tracks, in batches of up to 100.
+
+When that would take more calls than rewriting the playlist, say after a
+shuffle, the playlist is rewritten instead: its first 100 tracks replaced,
+then the rest added in batches.
+
+Removals and moves are pinned to the snapshot of the playlist they were
+planned against, chaining the snapshot returned by every call. Spotify does
+not take a snapshot for additions or rewrites.
+"""
+import json
+import logging
+import os
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from spotipy import Spotify
+
+from .engine import batched
+from .store import SqliteStore
+
+logger = logging.getLogger("SimmerTheToads")
+
+# Most items Spotify accepts in a single addition or removal.
+BATCH_SIZE = 100
+
+# Seconds the order of a playlist on Spotify is remembered for after it was
+# fetched or written, see `remember`.
+SNAPSHOT_TTL = float(os.getenv("SIMMER_SNAPSHOT_TTL", 900))
+
+Token = Tuple[str, int]
+
+
+def _tokens(ids: Sequence[str]) -> List[Token]:
+    """Tell apart repeated tracks, by numbering every occurrence of an ID."""
+    seen: Dict[str, int] = {}
+    tokens = []
+    for i in ids:
+        seen[i] = seen.get(i, -1) + 1
+        tokens.append((i, seen[i]))
+    return tokens
+
+
+def longest_increasing_subsequence(values: Sequence[int]) -> List[int]:
+    """Get the positions of a longest strictly increasing subsequence.
+
+    Patience sorting, O(n log n).
+    """
+    tails: List[int] = []  # Last value of the best subsequence of each length.
+    tail_positions: List[int] = []
+    previous = [-1] * len(values)
+    for i, v in enumerate(values):
+        length = bisect_left(tails, v)
+        if length == len(tails):
+            tails.append(v)
+            tail_positions.append(i)
+        else:
+            tails[length] = v
+            tail_positions[length] = i
+        previous[i] = tail_positions[length - 1] if length else -1
+
+    result = []
+    i = tail_positions[-1] if tail_positions else -1
+    while i >= 0:
+        result.append(i)
+        i = previous[i]
+    return result[::-1]
+
+
+def plan(old: Sequence[str], new: Sequence[str]) -> List[dict]:
+    """Plan the changes turning the order `old` into `new`.
+
+    :param old: Track IDs in the order they are on Spotify.
+    :param new: Track IDs in the order wanted.
+    :returns: Operations to apply in order, each a dict with an "op" of
+              "remove" (with "items", the "uri" and "positions" of the
+              tracks), "reorder" (with "range_start", "range_length" and
+              "insert_before"), "add" (with "items" and "position") or
+              "replace" (with "items").
+              Positions are within the playlist as left by the operations
+              before.
+    """
+    current = _tokens(old)
+    target = _tokens(new)
+    operations = []
+    rewrite = _rewrite(new)
+
+    wanted = set(target)
+    removed = [(k, t) for k, t in enumerate(current) if t not in wanted]
+    # Last first, so that the positions of the others do not change.
+    for chunk in batched(removed[::-1], BATCH_SIZE):
+        operations.append(
+            {
+                "op": "remove",
+                "items": [{"uri": t[0], "positions": [k]} for k, t in chunk],
+            }
+        )
+    current = [t for t in current if t in wanted]
+
+    kept = set(current)
+    order = [t for t in target if t in kept]
+    rank = {t: k for k, t in enumerate(order)}
+    stay = {
+        current[k] for k in longest_increasing_subsequence([rank[t] for t in current])
+    }
+
+    # Place every other track right after the one before it in the new order,
+    # together with the run of tracks following it in both orders.
+    k = 0
+    while k < len(order):
+        if order[k] in stay:
+            k += 1
+            continue
+        start = current.index(order[k])
+        length = 1
+        while (
+            k + length < len(order)
+            and start + length < len(current)
+            and order[k + length] not in stay
+            and current[start + length] == order[k + length]
+        ):
+            length += 1
+        before = current.index(order[k - 1]) + 1 if k else 0
+        if before != start:
+            operations.append(
+                {
+                    "op": "reorder",
+                    "range_start": start,
+                    "range_length": length,
+                    "insert_before": before,
+                }
+            )
+            moved = current[start : start + length]
+            del current[start : start + length]
+            if before > start:
+                before -= length
+            current[before:before] = moved
+        k += length
+        if len(operations) > len(rewrite):
+            return rewrite
+
+    added = [(k, t) for k, t in enumerate(target) if t not in kept]
+    runs: List[List[Tuple[int, Token]]] = []
+    for k, t in added:
+        if runs and runs[-1][-1][0] == k - 1:
+            runs[-1].append((k, t))
+        else:
+            runs.append([(k, t)])
+    for run in runs:
+        for chunk in batched(run, BATCH_SIZE):
+            operations.append(
+                {
+                    "op": "add",
+                    "items": [t[0] for _, t in chunk],
+                    "position": chunk[0][0],
+                }
+            )
+
+    if len(operations) > len(rewrite):
+        return rewrite
+    return operations
+
+
+def _rewrite(new: Sequence[str]) -> List[dict]:
+    """Plan replacing every track of a playlist with `new`."""
+    chunks = list(batched(new, BATCH_SIZE)) or [()]
+    operations = [{"op": "replace", "items": list(chunks[0])}]
+    for k, chunk in enumerate(chunks[1:], 1):
+        operations.append(
+            {"op": "add", "items": list(chunk), "position": k * BATCH_SIZE}
+        )
+    return operations
+
+
+def apply(
+    spotify: Spotify,
+    id: str,
+    operations: Sequence[dict],
+    snapshot_id: Optional[str] = None,
+) -> Optional[str]:
+    """Make planned changes to a playlist.
+
+    :param spotify: Client to make the changes with.
+    :param id: Spotify ID of the playlist.
+    :param operations: Changes, see `plan`.
+    :param snapshot_id: Snapshot of the playlist the changes were planned
+                        against.
+    :returns: The snapshot of the playlist after the changes.
+    """
+    for operation in operations:
+        op = operation["op"]
+        if op == "remove":
+            result = spotify.playlist_remove_specific_occurrences_of_items(
+                id, operation["items"], snapshot_id=snapshot_id
+            )
+        elif op == "reorder":
+            result = spotify.playlist_reorder_items(
+                id,
+                range_start=operation["range_start"],
+                insert_before=operation["insert_before"],
+                range_length=operation["range_length"],
+                snapshot_id=snapshot_id,
+            )
+        elif op == "replace":
+            result = spotify.playlist_replace_items(id, operation["items"])
+        elif op == "add":
+            result = spotify.playlist_add_items(
+                id, operation["items"], position=operation["position"]
+            )
+        else:
+            raise ValueError(f"Unknown operation {op}")
+        snapshot_id = result.get("snapshot_id", snapshot_id)
+    return snapshot_id
+
+
+def write_back(
+    spotify: Spotify,
+    id: str,
+    old: Sequence[str],
+    new: Sequence[str],
+    snapshot_id: Optional[str] = None,
+) -> Optional[str]:
+    """Change the order of a playlist on Spotify from `old` to `new`.
+
+    :returns: The snapshot of the playlist after the changes.
+    """
+    operations = plan(old, new)
+    logger.info(
+        "Writing back playlist %s (%d tracks) in %d calls",
+        id,
+        len(new),
+        len(operations),
+    )
+    return apply(spotify, id, operations, snapshot_id)
+
+
+def remote_state(spotify: Spotify, id: str) -> Tuple[Optional[str], List[str]]:
+    """Fetch the snapshot and track IDs of a playlist, without any features."""
+    result = spotify.playlist(id)
+    snapshot_id = result.get("snapshot_id")
+    page = result["tracks"]
+    ids = [i["track"]["id"] for i in page["items"]]
+    while page["next"]:
+        page = spotify.next(page)
+        ids.extend(i["track"]["id"] for i in page["items"])
+    return snapshot_id, ids
+
+
+def remember(
+    store: SqliteStore, id: str, snapshot_id: Optional[str], ids: Sequence[str]
+) -> None:
+    """Remember the order of a playlist on Spotify, and its snapshot."""
+    value = json.dumps({"snapshot_id": snapshot_id, "ids": list(ids)})
+    store.set(f"snapshot:{id}", value.encode(), SNAPSHOT_TTL)
+
+
+def remembered(store: SqliteStore, id: str) -> Optional[Tuple[Optional[str], list]]:
+    """Get the remembered snapshot and order of a playlist, if any.
+
+    The playlist may have been edited on Spotify since, check that its
+    snapshot is still the same before planning against the order.
+    """
+    value = store.get(f"snapshot:{id}")
+    if value is None:
+        return None
+    value = json.loads(value)
+    return value["snapshot_id"], value["ids"]
+
+
+def forget(store: SqliteStore, id: str) -> None:
+    """Forget the order of a playlist, e.g. after a failed write."""
+    store.delete(f"snapshot:{id}")
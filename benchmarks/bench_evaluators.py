@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Benchmark the playlist evaluators across playlist sizes.
+
+Synthetic playlists are served by the local Spotify stand-in, so no network
+access or credentials are needed. Every stage of a simmer is timed separately,
+as recorded by the evaluators themselves (see `metrics.stage`), along with the
+peak (traced) memory of ordering and suggesting, and the score of the
+resulting order. Results are written as JSON, and can be compared against an
+earlier run:
+
+    $ python benchmarks/bench_evaluators.py --sizes 10,100,1000 -o new.json
+    $ python benchmarks/bench_evaluators.py --compare old.json new.json
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from SimmerTheToads import metrics
+from SimmerTheToads.engine import (ChaosEvaluator, ClusteringEvaluator,
+                                   Playlist, TSPEvaluator)
+from SimmerTheToads.fake_spotify import FakeSpotify, FakeSpotifyBackend
+from SimmerTheToads.features import FeatureMatrix
+from SimmerTheToads.scoring import score
+
+EVALUATORS = {
+    "clustering": ClusteringEvaluator,
+    "tsp": TSPEvaluator,
+    "chaos": ChaosEvaluator,
+}
+
+# Largest playlist each evaluator is run on by default. The networkx TSP
+# solver holds a complete graph in memory, which stops being practical
+# somewhere past a few thousand tracks; chaos only needs the distance matrix.
+DEFAULT_LIMITS = {
+    "clustering": 10_000,
+    "tsp": 1_000,
+    "chaos": 5_000,
+}
+
+# Stages each evaluator must record, besides "ordering" and "suggestion". The
+# clusters are only ordered by their distances when there are several.
+STAGES = {
+    "clustering": ("preprocess", "clustering"),
+    "tsp": ("distance",),
+    "chaos": ("distance",),
+}
+
+
+@contextmanager
+def stage(results: dict, name: str):
+    """Record the wall time and peak traced memory of a stage."""
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    results[name] = {"seconds": seconds, "peak_bytes": peak}
+
+
+# Measures of the quality of an order, lower is better for all of them.
+QUALITY = ("tour_cost", "max_jump", "artist_repeat_rate")
+
+# Evaluators that make orders flow as badly as possible, for which a higher
+# tour cost is better.
+MAXIMIZING = {"chaos": ("tour_cost",)}
+
+
+def quality(p: Playlist, order, reference: FeatureMatrix) -> dict:
+    scored = score(p, order, n_jumps=1, features=reference)
+    jumps = scored["largest_jumps"]
+    return {
+        "tour_cost": scored["total"],
+        "max_jump": jumps[0]["distance"] if jumps else 0.0,
+        "artist_repeat_rate": scored["artist_repeat_rate"],
+    }
+
+
+def build_playlist(size: int, seed: int, detail: float) -> (Playlist, dict):
+    backend = FakeSpotifyBackend.synthetic(
+        n_tracks=size,
+        n_catalog=max(size // 4, 20),
+        seed=seed,
+        analysis_detail=detail,
+    )
+    stages = {}
+    with stage(stages, "features"):
+        p = Playlist(
+            FakeSpotify(backend), backend.playlist_ids[0], parallel_fetch=False
+        )
+    return p, stages
+
+
+def run_evaluator(
+    p: Playlist, evaluator, reference: FeatureMatrix, suggest: bool
+) -> dict:
+    """Order a playlist, timing the stages the evaluator runs.
+
+    Stages within ordering (e.g. "distance" and "clustering") are timed by
+    the evaluator itself, and the time of "ordering" excludes them, so that
+    the stages add up to the whole. The peak memory of "ordering" is that of
+    all of them.
+    """
+    e = evaluator(p)
+    p.df["sort_1"] = 0
+    p.df["sort_2"] = 0
+    peaks = {}
+    timings = metrics.Timings()
+    token = timings.activate()
+    try:
+        tracemalloc.reset_peak()
+        with metrics.stage("ordering"):
+            e.reorder()
+        peaks["ordering"] = tracemalloc.get_traced_memory()[1]
+
+        sort_columns = [i for i in p.df.columns if i.startswith("sort_")]
+        order = p.df.sort_values(by=sort_columns).index
+        result = {
+            **quality(p, order, reference),
+            "baseline_cost": quality(p, reference.index, reference)["tour_cost"],
+        }
+
+        if suggest and len(p) > 1:
+            tracemalloc.reset_peak()
+            with metrics.stage("suggestion"):
+                e.suggest()
+            peaks["suggestion"] = tracemalloc.get_traced_memory()[1]
+            result["suggestions"] = len(p.df) - len(order)
+    finally:
+        metrics.Timings.deactivate(token)
+
+    result["stages"] = {
+        k: {"seconds": v["seconds"], **({"peak_bytes": peaks[k]} if k in peaks else {})}
+        for k, v in timings.stages.items()
+    }
+    return result
+
+
+def run(args) -> dict:
+    results = []
+    for size in args.sizes:
+        p, feature_stages = build_playlist(size, args.seed, args.analysis_detail)
+        df = p.df.copy()
+        # Score every evaluator in the same space, whatever it optimizes in.
+        reference = FeatureMatrix(df)
+        logging.info(
+            "Built %d track playlist in %.2fs",
+            size,
+            feature_stages["features"]["seconds"],
+        )
+
+        for name in args.evaluators:
+            limit = args.limits.get(name, DEFAULT_LIMITS[name])
+            entry = {"evaluator": name, "size": size}
+            if size > limit:
+                entry["skipped"] = f"size exceeds limit of {limit}"
+                results.append(entry)
+                continue
+
+            p.df = df.copy()
+            entry.update(run_evaluator(p, EVALUATORS[name], reference, args.suggest))
+            missing = [k for k in STAGES[name] if k not in entry["stages"]]
+            if missing:
+                raise RuntimeError(f"{name} did not record: {', '.join(missing)}")
+            entry["stages"] = {**feature_stages, **entry["stages"]}
+            results.append(entry)
+            logging.info(
+                "%s @ %d: %s",
+                name,
+                size,
+                ", ".join(
+                    f"{k}={v['seconds']:.3f}s" for k, v in entry["stages"].items()
+                ),
+            )
+
+    return {"meta": metadata(args), "results": results}
+
+
+def metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "analysis_detail": args.analysis_detail,
+    }
+
+
+def compare(old_path: Path, new_path: Path, tolerance: float) -> bool:
+    """Print the change of every stage and measure of quality between two runs.
+
+    :returns: Whether the quality of any order got worse by more than
+              `tolerance`, relative to the old run.
+    """
+
+    def index(path):
+        data = json.loads(path.read_text())
+        return {(i["evaluator"], i["size"]): i for i in data["results"]}
+
+    old = index(old_path)
+    new = index(new_path)
+    print(
+        f"{'evaluator':<12}{'size':>7}  {'stage':<20}"
+        f"{'old':>10}{'new':>10}{'ratio':>8}"
+    )
+    worse = False
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        if "skipped" in a or "skipped" in b:
+            continue
+        rows = [
+            (k, a["stages"][k]["seconds"], b["stages"][k]["seconds"])
+            for k in a["stages"]
+            if k in b["stages"]
+        ]
+        rows.extend((k, a[k], b[k]) for k in QUALITY if k in a and k in b)
+        for name, x, y in rows:
+            ratio = y / x if x else float("nan")
+            flag = ""
+            if name in QUALITY:
+                loss = y - x
+                if name in MAXIMIZING.get(key[0], ()):
+                    loss = -loss
+                if loss > tolerance * abs(x):
+                    flag = "  worse"
+                    worse = True
+            print(
+                f"{key[0]:<12}{key[1]:>7}  {name:<20}"
+                f"{x:>10.3f}{y:>10.3f}{ratio:>8.2f}{flag}"
+            )
+    return worse
+
+
+def parse_limits(values) -> dict:
+    limits = {}
+    for i in values or []:
+        name, _, limit = i.partition("=")
+        limits[name] = int(limit)
+    return limits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="10,100,1000",
+        type=lambda x: [int(i) for i in x.split(",")],
+        help="Comma separated playlist sizes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--evaluators",
+        default=",".join(EVALUATORS),
+        type=lambda x: x.split(","),
+        help="Comma separated evaluators (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--limit",
+        dest="limits",
+        action="append",
+        metavar="EVALUATOR=SIZE",
+        help="Largest playlist to run an evaluator on",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--analysis-detail",
+        type=float,
+        default=0.25,
+        help="Scale of the synthetic audio analysis (default: %(default)s)",
+    )
+    parser.add_argument("--no-suggest", dest="suggest", action="store_false")
+    parser.add_argument("-o", "--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        type=Path,
+        metavar=("OLD", "NEW"),
+        help="Compare two result files instead of running",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.01,
+        help="Relative loss of quality allowed when comparing (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        if compare(*args.compare, args.tolerance):
+            sys.exit(1)
+        return
+
+    args.limits = parse_limits(args.limits)
+    logging.getLogger("SimmerTheToads").setLevel(logging.WARNING)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+
+    tracemalloc.start()
+    results = run(args)
+    tracemalloc.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
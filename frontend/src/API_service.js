@@ -65,4 +65,11 @@ export default class APIService {
       },
     });
   }
+
+  static updatePlaylist(playlist_id, track_ids, snapshot_id = null) {
+    return this.axiosInstance.post(`update_playlist/${playlist_id}`, {
+      ids: track_ids,
+      snapshot_id: snapshot_id,
+    });
+  }
 }
@@ -1,2 +1,47 @@
-bind = "0.0.0.0:5000"
-workers = 2
+"""Gunicorn configuration.
+
+The app is preloaded in the master, along with everything the evaluators
+import, so workers share those pages copy-on-write instead of each importing
+the scientific stack. Workers run several threads, since most requests are
+spent waiting on Spotify, and hand the CPU heavy ordering to a small process
+pool of their own (see SimmerTheToads/pool.py). By default the pools have one
+process per CPU between them, and the workers twice as many threads (at least
+4 each).
+
+Every setting can be overridden from the environment:
+
+    GUNICORN_BIND, GUNICORN_WORKERS, GUNICORN_THREADS, GUNICORN_WORKER_CLASS,
+    GUNICORN_PRELOAD, SIMMER_CPU_WORKERS
+"""
+import gc
+import os
+
+cpus = os.cpu_count() or 1
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("GUNICORN_WORKERS", max(2, cpus // 2)))
+threads = int(os.getenv("GUNICORN_THREADS", max(4, 2 * cpus // workers)))
+os.environ.setdefault("SIMMER_CPU_WORKERS", str(max(1, cpus // workers)))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") not in ("0", "false", "no")
+timeout = 120
+
+
+def on_starting(server):
+    """Import the evaluators in the master, to be shared by every worker."""
+    if not preload_app:
+        return
+
+    from SimmerTheToads.engine import warm_imports
+
+    warm_imports()
+    # Keep the garbage collector from touching (and so copying) every object
+    # inherited from the master.
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    """Stop the CPU pool of the worker, if it started one."""
+    from SimmerTheToads.pool import shutdown
+
+    shutdown()